@@ -0,0 +1,94 @@
+"""
+Memory benchmark: list of result dicts vs core.results.ResultStore, and
+the memory of an external sort merge (util.exporter.ExternalSorter).
+
+Usage:
+    python benchmarks/bench_memory.py [--files 1000000] [--buffer-rows 50000] [--max-merge-mb 64]
+
+Records are synthetic (no disk access), shaped like real scan results:
+a few thousand directories, a handful of extensions, tagged duplicates.
+The merge of a sort spilled to many runs must stay bounded by the run
+buffers, whatever the number of rows: the exit status is 1 when its peak
+exceeds --max-merge-mb.
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.results import ResultStore  # noqa: E402
+from util.exporter import ExternalSorter  # noqa: E402
+
+EXTENSIONS = ["mp4", "mkv", "jpg", "png"]
+
+
+def make_records(n, dirs=5000):
+    for i in range(n):
+        d = f"/mnt/media/share/library_{i % dirs // 100:03d}/season_{i % dirs:05d}"
+        name = f"IMG_{i % (n // 2 or 1):07d}.{EXTENSIONS[i % len(EXTENSIONS)]}"
+        yield {
+            "name": name,
+            "ext": EXTENSIONS[i % len(EXTENSIONS)],
+            "path": os.path.join(d, name),
+            "is_duplicate": i % 3 == 0,
+            "duplicate_count": 2 if i % 3 == 0 else 0,
+        }
+
+
+def measure(build, n):
+    tracemalloc.start()
+    container = build(make_records(n))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return container, current
+
+
+def measure_merge(n, buffer_rows):
+    """(peak while adding, peak while merging) of an ExternalSorter of n rows, in bytes."""
+    sorter = ExternalSorter(buffer_rows=buffer_rows)
+    tracemalloc.start()
+    for record in make_records(n):
+        sorter.add((record["name"], record["path"], record["ext"]))
+    add_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    rows = 0
+    for _ in sorter:
+        rows += 1
+    merge_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert rows == n
+    return add_peak, merge_peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=1_000_000)
+    parser.add_argument("--buffer-rows", type=int, default=50_000)
+    parser.add_argument("--max-merge-mb", type=float, default=64)
+    args = parser.parse_args()
+
+    def as_dicts(records):
+        results = list(records)
+        # IdentifyTab used to keep this third copy of the names
+        scanned_items = [r["name"] for r in results]
+        return results, scanned_items
+
+    _, old = measure(as_dicts, args.files)
+    print(f"list of dicts: {old / 1e6:10.1f} MB  {old / args.files:7.1f} B/file")
+    _, new = measure(ResultStore, args.files)
+    print(f"ResultStore  : {new / 1e6:10.1f} MB  {new / args.files:7.1f} B/file")
+    print(f"ratio        : {old / new:.2f}x smaller")
+
+    add_peak, merge_peak = measure_merge(args.files, args.buffer_rows)
+    print(f"sort, adding : {add_peak / 1e6:10.1f} MB peak ({args.buffer_rows} rows per run)")
+    print(f"sort, merging: {merge_peak / 1e6:10.1f} MB peak")
+    if merge_peak > args.max_merge_mb * 1e6:
+        print(f"merge peak above {args.max_merge_mb:.0f} MB: rows are retained")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
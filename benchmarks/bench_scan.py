@@ -0,0 +1,116 @@
+"""
+Benchmark core.scanner.scan_files against the previous os.walk implementation.
+
+Usage:
+    python benchmarks/bench_scan.py [--files 1000000] [--fanout 20] [--workers 16] [--keep DIR]
+
+The synthetic tree is built once in a temp dir (or in --keep DIR, which is
+reused on later runs so the 1M file tree only has to be created once).
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.scanner import scan_files  # noqa: E402
+
+EXTENSIONS = ["mp4", "mkv", "jpg", "png", "txt", "nfo"]
+
+
+def legacy_scan_files(base_path, extensions, max_depth, debug_cb=None, filename_filter=None):
+    """The original single-threaded os.walk scanner, kept here for comparison."""
+    results = []
+    base_depth = base_path.rstrip(os.sep).count(os.sep)
+
+    for root, dirs, files in os.walk(base_path):
+        depth = root.count(os.sep) - base_depth
+        if depth > max_depth:
+            dirs[:] = []
+            continue
+
+        for file in files:
+            ext = os.path.splitext(file)[1].lower().replace(".", "")
+            if not extensions or ext in extensions:
+                if filename_filter and filename_filter.lower() not in file.lower():
+                    continue
+                results.append({
+                    "name": file,
+                    "ext": ext if ext else "N/A",
+                    "path": os.path.join(root, file)
+                })
+                if debug_cb and len(results) % 10 == 0:
+                    debug_cb(f"Found {len(results)} items...")
+
+    return results
+
+
+def build_tree(base, total_files, fanout, files_per_dir):
+    """Create nested dirs (fanout subdirs per level) holding empty files."""
+    created = 0
+    level = [base]
+    while created < total_files:
+        next_level = []
+        for d in level:
+            for i in range(fanout):
+                sub = os.path.join(d, f"dir_{i:03d}")
+                os.makedirs(sub, exist_ok=True)
+                next_level.append(sub)
+                for j in range(files_per_dir):
+                    if created >= total_files:
+                        break
+                    ext = EXTENSIONS[(created + j) % len(EXTENSIONS)]
+                    open(os.path.join(sub, f"file_{created:07d}.{ext}"), "w").close()
+                    created += 1
+                if created >= total_files:
+                    return created
+        level = next_level
+    return created
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=1_000_000)
+    parser.add_argument("--fanout", type=int, default=20)
+    parser.add_argument("--files-per-dir", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--keep", help="Directory to build (or reuse) the tree in")
+    args = parser.parse_args()
+
+    base = args.keep or tempfile.mkdtemp(prefix="pyfile_bench_")
+    marker = os.path.join(base, ".bench_tree")
+    try:
+        if not os.path.exists(marker):
+            print(f"Building {args.files} files under {base} ...")
+            t, n = timed(build_tree, base, args.files, args.fanout, args.files_per_dir)
+            open(marker, "w").close()
+            print(f"  built {n} files in {t:.1f}s")
+
+        depth = 64
+        exts = ["mp4", "mkv", "jpg", "png"]
+
+        t_old, old = timed(legacy_scan_files, base, exts, depth)
+        print(f"os.walk     : {len(old):>9} items  {t_old:8.2f}s  {len(old) / t_old:12.0f} items/s")
+
+        t_new, new = timed(scan_files, base, exts, depth, workers=args.workers)
+        print(f"scandir pool: {len(new):>9} items  {t_new:8.2f}s  {len(new) / t_new:12.0f} items/s")
+
+        if sorted(r["path"] for r in old) != sorted(r["path"] for r in new):
+            print("WARNING: result sets differ")
+        print(f"speedup     : {t_old / t_new:.2f}x")
+    finally:
+        if not args.keep:
+            shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Import cost of the GUI startup path, from python -X importtime.
+
+Usage:
+    python benchmarks/bench_startup.py [--modules gui.app,tabs.identipy] [--runs 5]
+        [--top 10] [--max-ms 0]
+
+Each module is imported in a fresh interpreter, --runs times; the best run
+is reported with its heaviest imports (cumulative, including what they
+import). gui.app is what has to load before the window appears,
+tabs.identipy is the first tab. With --max-ms, the exit status is 1 when
+any module takes longer, so regressions fail a CI job. Times of the
+milestones after the imports (window shown, tabs built, index loaded) are
+printed by the app itself with PYFILE_STARTUP_REPORT=1 python main.py.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(module=None):
+    """
+    {module: (self us, cumulative us)} of one fresh import of module
+    (None: only what the interpreter imports on its own).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}" if module else "pass"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if own.strip().isdigit():
+            times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", default="gui.app,tabs.identipy")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=0, help="Fail when an import takes longer")
+    args = parser.parse_args()
+
+    interpreter = set(import_times())
+    failed = False
+    for module in args.modules.split(","):
+        best = None
+        for _ in range(args.runs):
+            times = import_times(module)
+            if best is None or times[module][1] < best[module][1]:
+                best = times
+        total = best[module][1] / 1000
+        print(f"{module}: {total:.1f} ms, {len(set(best) - interpreter)} modules")
+        heaviest = sorted(((name, t) for name, t in best.items() if name not in interpreter),
+                          key=lambda item: item[1][1], reverse=True)
+        for name, (own, cumulative) in heaviest[1:args.top + 1]:
+            print(f"  {cumulative / 1000:8.1f} ms  {own / 1000:6.1f} ms self  {name}")
+        if args.max_ms and total > args.max_ms:
+            print(f"  slower than {args.max_ms:.0f} ms")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""
+Benchmark suite: scanning, duplicate detection, view paging and export on
+synthetic trees (see treegen.py), with a stored baseline to catch
+regressions.
+
+Usage:
+    python benchmarks/bench_suite.py [--scales 10k,100k,1m] [--fanout 8] [--depth 3]
+        [--collisions 0.1] [--min-size 0] [--max-size 4096] [--cases scan_files,tag_name]
+        [--cache-dir DIR] [--no-memory] [--repeat 5] [--output run.json]
+        [--baseline FILE] [--save-baseline] [--threshold 1.25] [--time-floor 0.05]
+
+Trees are built once per spec under --cache-dir and reused. Each case is
+timed --repeat times and its best run kept (the median is stored too);
+with memory tracking on (the default) it runs once more under tracemalloc
+for the peak. Compared with the baseline, a case is a regression when its
+time or peak memory grows by more than --threshold, and for time also by
+more than --time-floor seconds, so sub-millisecond cases cannot fail on
+noise; the exit status is then 1.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.enricher import MetadataCache, enrich_results  # noqa: E402
+from core.hasher import HashCache  # noqa: E402
+from core.pipeline import VIEWS, build_views  # noqa: E402
+from core.search import NameIndex  # noqa: E402
+from core.usage import scan_usage  # noqa: E402
+from core.scanner import detect_duplicates, scan_files, scan_root_folders, tag_duplicates  # noqa: E402
+from util.file_utils import export_scan_results, format_size  # noqa: E402
+
+from treegen import TreeSpec, ensure_tree  # noqa: E402
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "pyfile_bench_trees")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Rows per screen when paging a view, like the IdentifyTab tree
+PAGE_ROWS = 50
+
+
+def row_values(item):
+    """Same row as IdentifyTab.row_values, without tkinter."""
+    if item["ext"] == "FOLDER":
+        return ("FOLDER", "-", "", item["name"])
+    if "is_duplicate" not in item:
+        status = "-"
+    else:
+        status = "[DUPLICATE]" if item["is_duplicate"] else "UNIQUE"
+    size = item.get("size")
+    return (item["ext"].upper(), status, format_size(size) if size is not None else "", item["path"])
+
+
+# Each case takes the context dict and returns the number of items handled
+
+def case_scan_files(ctx):
+    ctx["results"] = scan_files(ctx["base"], [], ctx["depth"])
+    return len(ctx["results"])
+
+
+def case_scan_root_folders(ctx):
+    return len(scan_root_folders(ctx["base"]))
+
+
+def case_detect_duplicates(ctx):
+    detect_duplicates(ctx["results"])
+    return len(ctx["results"])
+
+
+def case_tag_name(ctx):
+    tag_duplicates(ctx["results"], "name")
+    return len(ctx["results"])
+
+
+def case_tag_content(ctx):
+    # Fresh in-memory cache: measure hashing, not cache hits
+    cache = HashCache(":memory:")
+    try:
+        tag_duplicates(ctx["results"], "content", cache=cache)
+    finally:
+        cache.close()
+    return len(ctx["results"])
+
+
+def case_enrich(ctx):
+    cache = MetadataCache(":memory:")
+    try:
+        enrich_results(ctx["results"], cache=cache)
+    finally:
+        cache.close()
+    return len(ctx["results"])
+
+
+def case_usage(ctx):
+    report = scan_usage(ctx["base"])
+    return report.root.files
+
+
+def case_views_paging(ctx):
+    """Headless IdentifyTab filtering: build the views, then page through each."""
+    results = ctx["results"]
+    views = build_views(results)
+    rows = 0
+    for view in VIEWS:
+        rows_of = views[view]
+        total = len(results) if rows_of is None else len(rows_of)
+        for first in range(0, total, PAGE_ROWS):
+            for i in range(first, min(first + PAGE_ROWS, total)):
+                row_values(results[i if rows_of is None else rows_of[i]])
+                rows += 1
+    return rows
+
+
+def case_search(ctx):
+    """Build the name index, then a substring, a folder, a glob and a fuzzy query."""
+    index = NameIndex(ctx["results"])
+    index.update()
+    for query, fuzzy in (("file_00012", False), ("dir_001/", False), ("*.mkv", False), ("fiel_0001", True)):
+        index.search(query, fuzzy=fuzzy)
+    return len(ctx["results"])
+
+
+def case_export_txt(ctx):
+    export_scan_results(ctx["base"], ctx["results"], {"scan_type": "FILES", "depth": ctx["depth"]},
+                        ctx["export_dir"], fmt="txt")
+    return len(ctx["results"])
+
+
+def case_export_csv(ctx):
+    export_scan_results(ctx["base"], ctx["results"], None, ctx["export_dir"], fmt="csv")
+    return len(ctx["results"])
+
+
+# In run order; later cases use the results of scan_files
+CASES = {
+    "scan_files": case_scan_files,
+    "scan_root_folders": case_scan_root_folders,
+    "usage": case_usage,
+    "detect_duplicates": case_detect_duplicates,
+    "tag_name": case_tag_name,
+    "views_paging": case_views_paging,
+    "search": case_search,
+    "tag_content": case_tag_content,
+    "enrich": case_enrich,
+    "export_txt": case_export_txt,
+    "export_csv": case_export_csv,
+}
+
+
+def measure(fn, ctx, memory, repeat=1):
+    """Best of repeat timed runs, then one run under tracemalloc if memory."""
+    times = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        items = fn(ctx)
+        times.append(time.perf_counter() - start)
+    seconds = min(times)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn(ctx)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {
+        "seconds": seconds,
+        "median_seconds": statistics.median(times),
+        "runs": len(times),
+        "items": items,
+        "items_per_s": items / seconds if seconds else 0.0,
+        "peak_bytes": peak,
+    }
+
+
+def compare(current, baseline, threshold, time_floor=0.0):
+    """
+    Lines comparing current with baseline results; returns (lines, regressions).
+    A case is only slower when it also lost more than time_floor seconds.
+    """
+    lines = []
+    regressions = 0
+    for key, cur in current.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        notes = []
+        time_ratio = cur["seconds"] / base["seconds"] if base["seconds"] else 1.0
+        if time_ratio > threshold and cur["seconds"] - base["seconds"] > time_floor:
+            notes.append("SLOWER")
+        if cur["peak_bytes"] and base.get("peak_bytes"):
+            mem_ratio = cur["peak_bytes"] / base["peak_bytes"]
+            if mem_ratio > threshold:
+                notes.append("MORE MEMORY")
+            mem = f"{mem_ratio:5.2f}x mem"
+        else:
+            mem = ""
+        regressions += bool(notes)
+        lines.append(f"{key:<24} {time_ratio:5.2f}x time {mem}  {' '.join(notes) or 'ok'}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="10k,100k", help=f"Comma separated, of {', '.join(SCALES)}")
+    parser.add_argument("--fanout", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--collisions", type=float, default=0.1, help="Name collision rate, 0..1")
+    parser.add_argument("--min-size", type=int, default=0)
+    parser.add_argument("--max-size", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cases", help=f"Comma separated subset of: {', '.join(CASES)}")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Where synthetic trees are kept")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak memory pass")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case, the best one counts")
+    parser.add_argument("--output", help="Write this run's results to a JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Allowed slowdown ratio")
+    parser.add_argument("--time-floor", type=float, default=0.05,
+                        help="Seconds a case must lose before it counts as slower")
+    args = parser.parse_args()
+
+    scales = [s.strip().lower() for s in args.scales.split(",") if s.strip()]
+    unknown = [s for s in scales if s not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(unknown)}")
+    cases = [c.strip() for c in args.cases.split(",")] if args.cases else list(CASES)
+    if "scan_files" not in cases:
+        cases.insert(0, "scan_files")  # everything else works on its results
+
+    run = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": {},
+    }
+
+    for scale in scales:
+        spec = TreeSpec(SCALES[scale], args.fanout, args.depth, args.collisions,
+                        args.min_size, args.max_size, args.seed)
+        start = time.perf_counter()
+        base = ensure_tree(spec, args.cache_dir)
+        print(f"== {scale}: {base} (ready in {time.perf_counter() - start:.1f}s)")
+
+        export_dir = tempfile.mkdtemp(prefix="pyfile_bench_export_")
+        ctx = {"base": base, "depth": args.depth, "export_dir": export_dir}
+        try:
+            for name in cases:
+                result = measure(CASES[name], ctx, memory=not args.no_memory, repeat=args.repeat)
+                run["results"][f"{scale}/{name}"] = result
+                peak = f"{result['peak_bytes'] / 1e6:9.1f} MB" if result["peak_bytes"] is not None else ""
+                print(f"  {name:<20} {result['items']:>9} items {result['seconds']:8.3f}s "
+                      f"{result['items_per_s']:12.0f} items/s {peak}")
+        finally:
+            shutil.rmtree(export_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run, f, indent=2)
+
+    status = 0
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(run["results"], baseline["results"], args.threshold, args.time_floor)
+        print(f"== compared with {args.baseline}")
+        for line in lines:
+            print("  " + line)
+        if regressions:
+            print(f"{regressions} regression(s)")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
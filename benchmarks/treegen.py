@@ -0,0 +1,112 @@
+"""
+Reproducible synthetic directory trees for the benchmarks.
+
+    from treegen import TreeSpec, ensure_tree
+    base = ensure_tree(TreeSpec(files=100_000, fanout=8, depth=3), "/tmp/bench_trees")
+
+The same spec and seed always give the same names, sizes and contents, so
+timings of different runs (and of the stored baseline) are comparable.
+Trees are built once per spec under the cache dir and reused.
+"""
+import hashlib
+import json
+import os
+import random
+import shutil
+
+EXTENSIONS = ["mp4", "mkv", "jpg", "png", "txt", "nfo"]
+
+# Contents are slices of one random block, prefixed with a unique header
+_BLOCK_SIZE = 1024 * 1024
+
+
+class TreeSpec:
+    """
+    Shape of a synthetic tree.
+
+    files           total number of files
+    fanout          subdirectories per directory
+    depth           levels of subdirectories below the root
+    collision_rate  share of files (0..1) reusing the name (and contents)
+                    of an earlier file in another directory
+    min_size/max_size
+                    file sizes in bytes, uniformly distributed
+    seed            random seed
+    """
+
+    def __init__(self, files=10_000, fanout=8, depth=3, collision_rate=0.1,
+                 min_size=0, max_size=4096, seed=1):
+        self.files = files
+        self.fanout = fanout
+        self.depth = depth
+        self.collision_rate = collision_rate
+        self.min_size = min_size
+        self.max_size = max_size
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    def key(self):
+        """Short stable id, used as the tree's folder name."""
+        data = json.dumps(self.to_dict(), sort_keys=True).encode()
+        return f"tree_{self.files}_{hashlib.sha1(data).hexdigest()[:10]}"
+
+
+def _directories(base, fanout, depth):
+    """All directories of the tree, breadth first, root included."""
+    dirs = [base]
+    level = [base]
+    for _ in range(depth):
+        level = [os.path.join(d, f"dir_{i:03d}") for d in level for i in range(fanout)]
+        dirs.extend(level)
+    return dirs
+
+
+def build_tree(base, spec):
+    """Create the tree described by spec under base. Returns the file count."""
+    rng = random.Random(spec.seed)
+    block = rng.randbytes(_BLOCK_SIZE)
+    dirs = _directories(base, spec.fanout, spec.depth)
+    for d in dirs:
+        os.makedirs(d, exist_ok=True)
+
+    per_dir, extra = divmod(spec.files, len(dirs))
+    originals = []  # (name, data) of files whose names may be reused
+    created = 0
+    for n, d in enumerate(dirs):
+        used = set()
+        for _ in range(per_dir + (1 if n < extra else 0)):
+            if originals and rng.random() < spec.collision_rate:
+                name, data = originals[rng.randrange(len(originals))]
+                if name in used:
+                    continue
+            else:
+                ext = EXTENSIONS[created % len(EXTENSIONS)]
+                name = f"file_{created:07d}.{ext}"
+                size = rng.randint(spec.min_size, spec.max_size)
+                header = name.encode() + b"\n"
+                start = rng.randrange(_BLOCK_SIZE)
+                body = (block[start:] + block)[:max(0, size - len(header))]
+                data = (header + body)[:size]
+                originals.append((name, data))
+            used.add(name)
+            with open(os.path.join(d, name), "wb") as f:
+                f.write(data)
+            created += 1
+    return created
+
+
+def ensure_tree(spec, cache_dir):
+    """Path of the tree for spec inside cache_dir, building it if needed."""
+    base = os.path.join(cache_dir, spec.key())
+    # Kept next to the tree, not inside, so scans do not see it
+    marker = base + ".json"
+    if os.path.exists(marker) and os.path.isdir(base):
+        return base
+    shutil.rmtree(base, ignore_errors=True)
+    os.makedirs(base)
+    count = build_tree(base, spec)
+    with open(marker, "w") as f:
+        json.dump(dict(spec.to_dict(), created=count), f)
+    return base
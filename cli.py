@@ -0,0 +1,286 @@
+import argparse
+import sys
+import time
+from contextlib import nullcontext
+
+from util.constants import DUPLICATE_MODES, EXPORT_FORMATS, HASH_METHODS, VIEWS
+
+# Keep this module's imports minimal: the CLI runs from cron on batch hosts,
+# so anything heavier is imported inside the command that needs it.
+
+
+def add_throttle_args(parser):
+    group = parser.add_argument_group("I/O throttling (shared storage)")
+    group.add_argument("--max-ops", type=float, metavar="N", help="At most N directory listings / reads per second")
+    group.add_argument("--max-mbps", type=float, metavar="MB", help="At most MB megabytes per second read + written")
+    group.add_argument("--max-io", type=int, metavar="N", help="At most N I/O operations in flight")
+    group.add_argument("--adaptive", action="store_true",
+                       help="Shrink the operations in flight when storage latency rises (AIMD)")
+    group.add_argument("--io-profile", metavar="JSON",
+                       help='Time-of-day limits, e.g. [{"from": "08:00", "to": "18:00", "mb_per_s": 20}]')
+
+
+def make_scheduler(args):
+    """util.throttle.Scheduler for the throttling options, None when none is given."""
+    if not (args.max_ops or args.max_mbps or args.max_io or args.adaptive or args.io_profile):
+        return None
+    from util.throttle import Scheduler, load_profile
+
+    profile = load_profile(args.io_profile) if args.io_profile else None
+    return Scheduler(args.max_ops, args.max_mbps, args.max_io, adaptive=args.adaptive, profile=profile)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="pyfile_mnger",
+        description="Headless file scanning, duplicate detection and export."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan = commands.add_parser("scan", help="Scan a folder and export the results")
+    scan.add_argument("path", help="Folder to scan")
+    scan.add_argument("more_paths", nargs="*", metavar="PATH",
+                      help="More folders (other drives, shares) scanned into the same duplicate analysis")
+    scan.add_argument("-e", "--ext", action="append", default=[],
+                      help="File extension to include (repeat or comma separate); default: all files")
+    scan.add_argument("-d", "--depth", type=int, default=2, help="Subfolder depth (0 = top folder only)")
+    scan.add_argument("-f", "--filter", dest="filename_filter", help="Only names containing this text")
+    scan.add_argument("--include", action="append", default=[],
+                      help="Only names matching this glob (or re:REGEX); repeat or comma separate")
+    scan.add_argument("--exclude", action="append", default=[],
+                      help="Skip names matching this glob (or re:REGEX); repeat or comma separate")
+    scan.add_argument("--min-size", help="Only files at least this big, e.g. 500K, 10M")
+    scan.add_argument("--max-size", help="Only files at most this big")
+    scan.add_argument("--modified-within", type=float, metavar="DAYS",
+                      help="Only files modified in the last DAYS days")
+    scan.add_argument("--prune", action="append", default=[],
+                      help="Do not descend into folders with this name or glob; repeat or comma separate")
+    scan.add_argument("--prune-common", action="store_true",
+                      help="Skip .git, node_modules, snapshot folders and the like")
+    scan.add_argument("--enrich", action="store_true",
+                      help="Add size, mtime, ctime, inode and image size / video duration columns")
+    scan.add_argument("--folders-only", action="store_true", help="List top-level folders only")
+    scan.add_argument("--usage", action="store_true",
+                      help="Folder sizes (du): size, file count and newest file per folder down to --depth, "
+                           "plus the largest files and folders; implies --folders-only")
+    scan.add_argument("--duplicates", choices=DUPLICATE_MODES, default="name",
+                      help="Match duplicates by file name, by content or by image/video similarity")
+    scan.add_argument("--similarity", type=int, default=4, metavar="BITS",
+                      help="With --duplicates similar: max differing hash bits (of 64)")
+    scan.add_argument("--hash", choices=HASH_METHODS, default="dhash",
+                      help="With --duplicates similar: perceptual hash to use")
+    scan.add_argument("--view", choices=VIEWS, default="all", help="Which results to export")
+    scan.add_argument("-w", "--workers", type=int, help="Worker threads for listing and hashing")
+    scan.add_argument("--index", action="store_true", help="Use the persistent scan index (incremental)")
+    scan.add_argument("--format", choices=EXPORT_FORMATS, default="txt", help="Export format")
+    scan.add_argument("--gzip", action="store_true", help="gzip the export")
+    scan.add_argument("-o", "--output-dir", default="exports", help="Directory for the export file")
+    scan.add_argument("--snapshot", metavar="FILE",
+                      help="Also write a snapshot of the scanned files, for the diff command")
+    scan.add_argument("--snapshot-hashes", action="store_true",
+                      help="With --snapshot: store content hashes (exact change and move detection)")
+    scan.add_argument("-q", "--quiet", action="store_true", help="No progress output")
+    scan.add_argument("--profile", metavar="JSON",
+                      help="Record per-phase timings, directory and syscall counts to this file")
+    scan.add_argument("--profile-python", action="store_true",
+                      help="With --profile: add cProfile and tracemalloc captures (slower)")
+    add_throttle_args(scan)
+
+    diff = commands.add_parser("diff", help="Compare two snapshots (scan --snapshot) and export the changes")
+    diff.add_argument("old", help="Earlier snapshot file")
+    diff.add_argument("new", help="Later snapshot file")
+    diff.add_argument("--format", choices=EXPORT_FORMATS, default="txt", help="Export format")
+    diff.add_argument("--gzip", action="store_true", help="gzip the export")
+    diff.add_argument("-o", "--output-dir", default="exports", help="Directory for the export file")
+    diff.add_argument("-q", "--quiet", action="store_true", help="No summary output")
+
+    dedup = commands.add_parser("dedup", help="Replace content duplicates by hard links or reflinks")
+    dedup.add_argument("path", nargs="?", help="Folder to scan for duplicates")
+    dedup.add_argument("more_paths", nargs="*", metavar="PATH", help="More folders in the same analysis")
+    dedup.add_argument("-e", "--ext", action="append", default=[],
+                       help="File extension to include (repeat or comma separate); default: all files")
+    dedup.add_argument("-d", "--depth", type=int, default=2, help="Subfolder depth (0 = top folder only)")
+    dedup.add_argument("--method", choices=("hardlink", "reflink"), default="hardlink",
+                       help="hardlink: duplicates share the kept file's inode and metadata; "
+                            "reflink: copy-on-write clones (btrfs, XFS), metadata kept")
+    dedup.add_argument("--keep", choices=("oldest", "newest", "first"), default="oldest",
+                       help="Which file of each group stays as it is")
+    dedup.add_argument("--dry-run", action="store_true", help="Only show what would be replaced")
+    dedup.add_argument("--undo", nargs="?", const="", metavar="JOURNAL",
+                       help="Turn the links of the last (or the given) dedup run back into copies")
+    dedup.add_argument("-w", "--workers", type=int, help="Worker threads for listing and hashing")
+    dedup.add_argument("-q", "--quiet", action="store_true", help="No progress output")
+    add_throttle_args(dedup)
+    return parser
+
+
+def cmd_scan(args):
+    from core.filters import DEFAULT_PRUNE, parse_size, split_patterns
+    from core.pipeline import build_scan_metadata, filter_results, run_scan
+    from util.file_utils import export_scan_results
+    from util.validators import validate_folder_path
+
+    for path in [args.path] + args.more_paths:
+        if not validate_folder_path(path):
+            print(f"Not a folder: {path}", file=sys.stderr)
+            return 2
+
+    extensions = [e.strip().lower().lstrip(".") for arg in args.ext for e in arg.split(",") if e.strip()]
+    log = None if args.quiet else (lambda msg: print(msg, file=sys.stderr))
+
+    try:
+        filters = {
+            "include": split_patterns(args.include),
+            "exclude": split_patterns(args.exclude),
+            "min_size": parse_size(args.min_size),
+            "max_size": parse_size(args.max_size),
+            "prune": split_patterns(args.prune) + (list(DEFAULT_PRUNE) if args.prune_common else []),
+        }
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if args.modified_within is not None:
+        filters["newer_than"] = time.time() - args.modified_within * 86400
+    if args.duplicates == "similar":
+        from core.similarity import have_ffmpeg, have_pillow
+        # Fail before the scan rather than after it
+        if not (have_pillow() or have_ffmpeg()):
+            print("--duplicates similar needs Pillow (images) and/or ffmpeg (videos)", file=sys.stderr)
+            return 2
+
+    scan_metadata = build_scan_metadata(
+        args.path, extensions, args.depth, args.filename_filter, args.duplicates,
+        args.folders_only or args.usage, filters, args.enrich,
+        {"threshold": args.similarity, "method": args.hash}, args.more_paths, args.usage
+    )
+    if args.profile:
+        from util.profiler import Profiler
+        session = Profiler(args.path, python_profile=args.profile_python, trace_memory=args.profile_python)
+    else:
+        session = nullcontext()
+
+    with session as stats:
+        results = run_scan(scan_metadata, use_index=args.index, workers=args.workers, debug_cb=log)
+        if log and not args.usage:
+            duplicates = sum(1 for r in results if r.get("is_duplicate", False))
+            log(f"{len(results)} items, {duplicates} duplicates.")
+
+        if args.snapshot and not args.usage:
+            from core.snapshot import write_snapshot
+
+            count = write_snapshot(args.snapshot, args.path, results, scan_metadata,
+                                   hashes=args.snapshot_hashes, workers=args.workers)
+            if log:
+                log(f"Snapshot: {count} files written to {args.snapshot}")
+
+        exported = filter_results(results, args.view)
+        filepath = export_scan_results(args.path, exported, scan_metadata, args.output_dir,
+                                       fmt=args.format, compress=args.gzip)
+    if stats is not None:
+        stats.dump_json(args.profile)
+        if log:
+            for line in stats.summary():
+                log(line)
+    print(filepath)
+    return 0
+
+
+def cmd_diff(args):
+    from collections import Counter
+
+    from core.results import ResultStore
+    from core.snapshot import CHANGES, SnapshotError, diff_metadata, diff_records
+    from util.file_utils import export_scan_results
+
+    try:
+        scan_metadata = diff_metadata(args.old, args.new)
+        results = ResultStore(diff_records(args.old, args.new))
+    except (OSError, SnapshotError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    if not args.quiet:
+        counts = Counter(results.get_field(i, "change") for i in range(len(results)))
+        print(", ".join(f"{counts[c]} {c}" for c in CHANGES), file=sys.stderr)
+    filepath = export_scan_results(scan_metadata["folder_path"], results, scan_metadata, args.output_dir,
+                                   fmt=args.format, compress=args.gzip)
+    print(filepath)
+    return 0
+
+
+def cmd_dedup(args):
+    from core.dedup import Deduper, DedupError, plan_dedup, plan_summary
+    from core.pipeline import build_scan_metadata, run_scan
+    from util.file_utils import format_size
+    from util.validators import validate_folder_path
+
+    log = None if args.quiet else (lambda msg: print(msg, file=sys.stderr))
+    deduper = Deduper(args.method)
+    if args.undo is not None:
+        try:
+            restored = deduper.undo(args.undo or None)
+        except (OSError, DedupError) as e:
+            print(e, file=sys.stderr)
+            return 2
+        print(f"{restored} files restored as independent copies")
+        return 0
+
+    paths = [args.path] + args.more_paths if args.path else []
+    if not paths:
+        print("A folder is required (or --undo)", file=sys.stderr)
+        return 2
+    for path in paths:
+        if not validate_folder_path(path):
+            print(f"Not a folder: {path}", file=sys.stderr)
+            return 2
+    extensions = [e.strip().lower().lstrip(".") for arg in args.ext for e in arg.split(",") if e.strip()]
+    scan_metadata = build_scan_metadata(args.path, extensions, args.depth, duplicate_mode="content",
+                                        extra_roots=args.more_paths)
+    results = run_scan(scan_metadata, workers=args.workers, debug_cb=log)
+
+    plan = plan_dedup(results, args.method, args.keep)
+    summary = plan_summary(plan)
+    if log:
+        for op in plan:
+            if op["status"] != "ok":
+                log(f"skip ({op['status']}): {op['path']}")
+            elif args.dry_run:
+                log(f"{op['path']} -> {op['keep']}")
+    stats = deduper.apply(plan, dry_run=args.dry_run)
+    for error in stats["errors"]:
+        print(error, file=sys.stderr)
+    verb = "would be" if args.dry_run else "were"
+    print(f"{stats['files_done']} duplicates in {summary['groups']} groups {verb} replaced by "
+          f"{args.method}s, {format_size(stats['bytes_reclaimed'])} {verb} reclaimed")
+    if stats["journal"]:
+        print(f"Undo journal: {stats['journal']}")
+    return 1 if stats["failed"] else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "diff":
+        return cmd_diff(args)
+
+    try:
+        scheduler = make_scheduler(args)
+    except (OSError, ValueError) as e:
+        print(f"Bad --io-profile: {e}", file=sys.stderr)
+        return 2
+    if scheduler is not None:
+        from util import throttle
+        throttle.set_active(scheduler)
+    try:
+        if args.command == "scan":
+            return cmd_scan(args)
+        if args.command == "dedup":
+            return cmd_dedup(args)
+    finally:
+        if scheduler is not None:
+            throttle.set_active(None)
+            if not args.quiet:
+                print(scheduler.summary(), file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,334 @@
+import errno
+import filecmp
+import glob
+import json
+import os
+import shutil
+import stat
+from datetime import datetime
+
+from core.hasher import PARTIAL_SIZE, HashCache, full_hash
+
+# Space reclaiming for content duplicates: every extra copy in a group is
+# replaced by a hard link to (or a reflink clone of) the file that is kept.
+#
+# Each replacement is atomic: the link is created under a temporary name in
+# the duplicate's folder and renamed over it, so a crash leaves either the
+# old file or the link, never neither. Every replacement is journaled (and
+# synced) before it is made; undo() turns links back into independent
+# copies and skips journaled files that were never replaced.
+
+DEDUP_JOURNAL_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "dedup_journals"
+)
+
+# hardlink: one inode, metadata (mode, times, owner) shared with the kept file
+# reflink: own inode and metadata, data extents shared (btrfs, XFS, APFS...)
+METHODS = ("hardlink", "reflink")
+
+# Which file of a group is kept
+KEEP_RULES = ("oldest", "newest", "first")
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+TEMP_SUFFIX = ".dedup-tmp"
+COPY_BUFFER = 8 * 1024 * 1024
+
+
+class DedupError(Exception):
+    pass
+
+
+def reflink(src, dst):
+    """Create dst as a copy-on-write clone of src (FICLONE ioctl, Linux)."""
+    try:
+        import fcntl
+    except ImportError:
+        raise DedupError("Reflinks are not supported on this platform")
+    with open(src, "rb") as fsrc, open(dst, "xb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError as e:
+            if e.errno in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EXDEV):
+                raise DedupError(f"File system does not support reflinks: {dst}")
+            raise
+
+
+def _copy_bytes(src, dst):
+    """Plain read/write copy: the result shares nothing with src (no kernel copy, no reflink)."""
+    buf = bytearray(COPY_BUFFER)
+    view = memoryview(buf)
+    with open(src, "rb", buffering=0) as fsrc, open(dst, "xb") as fdst:
+        while True:
+            n = fsrc.readinto(buf)
+            if not n:
+                break
+            fdst.write(view[:n])
+
+
+def _temp_name(path):
+    return f"{path}{TEMP_SUFFIX}{os.getpid()}"
+
+
+def _never_replaced(step):
+    """
+    True when a journaled file still has its own inode: the journal line
+    was written but the link or clone never took its place.
+    """
+    inode = step.get("inode")
+    if inode is None:
+        return False  # older journals only list replaced files
+    return os.stat(step["path"], follow_symlinks=False).st_ino == inode
+
+
+def _stat_entry(path):
+    st = os.stat(path, follow_symlinks=False)
+    return {"path": path, "size": st.st_size, "mtime": st.st_mtime_ns, "inode": st.st_ino,
+            "dev": st.st_dev, "links": st.st_nlink, "mode": st.st_mode}
+
+
+def _content_hash(entry, cache):
+    partial, full = cache.get(entry["path"], entry["size"], entry["mtime"], entry["inode"])
+    if full is None and partial is not None and entry["size"] <= 2 * PARTIAL_SIZE:
+        full = partial  # small files are hashed completely in the partial stage
+    if full is None:
+        full = full_hash(entry["path"])
+        cache.put(entry["path"], entry["size"], entry["mtime"], entry["inode"], full=full)
+    return full
+
+
+def plan_dedup(records, method="hardlink", keep="oldest", cache=None):
+    """
+    Work out the replacements for content duplicate groups (records tagged
+    by tag_duplicates in "content" mode), without touching any file.
+
+    Members are re-hashed through the hash cache (free for unchanged files)
+    and split by device: links cannot cross file systems, so each device
+    keeps one copy chosen by keep (see KEEP_RULES). Returns a list of op
+    dicts {"group", "keep", "path", "size", "status"}; status is "ok",
+    "linked" (already the same inode), "changed" (content differs now),
+    or "error: ...". "reclaim" is the size freed by an ok op: 0 when the
+    duplicate has other hard links that keep its data alive.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown dedup method: {method}")
+    if keep not in KEEP_RULES:
+        raise ValueError(f"Unknown keep rule: {keep}")
+
+    groups = {}
+    for item in records:
+        if item.get("is_duplicate") and item.get("duplicate_group"):
+            groups.setdefault(item["duplicate_group"], []).append(item["path"])
+
+    own_cache = cache is None
+    if own_cache:
+        cache = HashCache()
+    plan = []
+    try:
+        for group_id in sorted(groups):
+            entries = []
+            for path in groups[group_id]:
+                try:
+                    entry = _stat_entry(path)
+                    if not stat.S_ISREG(entry["mode"]):
+                        continue
+                    entry["hash"] = _content_hash(entry, cache)
+                except OSError as e:
+                    plan.append({"group": group_id, "keep": None, "path": path, "size": 0,
+                                 "reclaim": 0, "status": f"error: {e.strerror or e}"})
+                    continue
+                entries.append(entry)
+
+            by_device = {}
+            for entry in entries:
+                by_device.setdefault(entry["dev"], []).append(entry)
+            for members in by_device.values():
+                if keep == "oldest":
+                    members.sort(key=lambda e: (e["mtime"], e["path"]))
+                elif keep == "newest":
+                    members.sort(key=lambda e: (-e["mtime"], e["path"]))
+                kept = members[0]
+                for entry in members[1:]:
+                    if entry["inode"] == kept["inode"]:
+                        status = "linked"
+                    elif entry["hash"] != kept["hash"] or entry["size"] != kept["size"]:
+                        status = "changed"
+                    else:
+                        status = "ok"
+                    plan.append({
+                        "group": group_id, "keep": kept["path"], "path": entry["path"],
+                        "size": entry["size"],
+                        "reclaim": entry["size"] if status == "ok" and entry["links"] == 1 else 0,
+                        "status": status, "mtime": entry["mtime"], "inode": entry["inode"],
+                    })
+    finally:
+        if own_cache:
+            cache.close()
+        else:
+            cache.commit()
+    return plan
+
+
+def plan_summary(plan):
+    """Counts per status and total reclaimable bytes of a plan."""
+    counts = {}
+    for op in plan:
+        status = op["status"].split(":", 1)[0]
+        counts[status] = counts.get(status, 0) + 1
+    return {"files": counts.get("ok", 0), "reclaim": sum(op["reclaim"] for op in plan),
+            "groups": len(set(op["group"] for op in plan if op["status"] == "ok")), "counts": counts}
+
+
+class Deduper:
+    """
+    Runs the "ok" operations of a plan from plan_dedup, group by group.
+    Before a group is touched, every member is checked to be unchanged
+    since planning (size, mtime, inode) and, with verify, byte-compared
+    with the kept file; a group failing the check is skipped entirely.
+    """
+
+    def __init__(self, method="hardlink", verify=True, journal_dir=DEDUP_JOURNAL_DIR):
+        if method not in METHODS:
+            raise ValueError(f"Unknown dedup method: {method}")
+        self.method = method
+        self.verify = verify
+        self.journal_dir = journal_dir
+
+    def _check(self, op):
+        st = os.stat(op["path"], follow_symlinks=False)
+        if (st.st_size, st.st_mtime_ns, st.st_ino) != (op["size"], op["mtime"], op["inode"]):
+            raise DedupError(f"Changed since planning: {op['path']}")
+        if self.verify and not filecmp.cmp(op["keep"], op["path"], shallow=False):
+            raise DedupError(f"Content differs: {op['path']}")
+
+    def _replace(self, op):
+        path = op["path"]
+        temp = _temp_name(path)
+        if os.path.lexists(temp):
+            os.remove(temp)  # left over from an interrupted run
+        try:
+            if self.method == "hardlink":
+                os.link(op["keep"], temp)
+            else:
+                # A clone is a file of its own: give it the duplicate's metadata
+                reflink(op["keep"], temp)
+                shutil.copystat(path, temp)
+            os.replace(temp, path)
+        except BaseException:
+            if os.path.lexists(temp):
+                os.remove(temp)
+            raise
+
+    def apply(self, plan, dry_run=False, progress_cb=None, cancel_event=None):
+        """
+        Execute the plan. With dry_run nothing is changed and no journal is
+        written, the stats show what would happen. progress_cb(stats) is
+        called after every group. Returns stats: files done, bytes
+        reclaimed, groups, failed, errors and the journal path.
+        """
+        groups = {}
+        for op in plan:
+            if op["status"] == "ok":
+                groups.setdefault(op["group"], []).append(op)
+
+        stats = {"files_total": sum(len(ops) for ops in groups.values()), "files_done": 0,
+                 "bytes_reclaimed": 0, "groups_done": 0, "failed": 0, "errors": [],
+                 "journal": None, "dry_run": dry_run}
+        if dry_run:
+            stats["files_done"] = stats["files_total"]
+            stats["bytes_reclaimed"] = sum(op["reclaim"] for ops in groups.values() for op in ops)
+            stats["groups_done"] = len(groups)
+            return stats
+        if not groups:
+            return stats
+
+        os.makedirs(self.journal_dir, exist_ok=True)
+        journal_path = os.path.join(self.journal_dir, datetime.now().strftime("dedup_%Y%m%d_%H%M%S_%f.jsonl"))
+        stats["journal"] = journal_path
+        with open(journal_path, "w", encoding="utf-8") as journal:
+            self._run_groups(groups, journal, stats, progress_cb, cancel_event)
+        if not stats["files_done"]:
+            os.remove(journal_path)
+            stats["journal"] = None
+        return stats
+
+    def _run_groups(self, groups, journal, stats, progress_cb, cancel_event):
+        for group_id, ops in groups.items():
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            try:
+                for op in ops:
+                    self._check(op)
+            except (OSError, DedupError) as e:
+                stats["failed"] += len(ops)
+                stats["errors"].append(f"group {group_id}: {e}")
+                continue
+            for op in ops:
+                try:
+                    st = os.stat(op["path"])
+                    # What undo needs to give the file back its own identity,
+                    # on disk before the file is touched
+                    journal.write(json.dumps({
+                        "group": group_id, "keep": op["keep"], "path": op["path"], "method": self.method,
+                        "inode": st.st_ino, "mode": st.st_mode, "atime": st.st_atime_ns,
+                        "mtime": st.st_mtime_ns, "uid": st.st_uid, "gid": st.st_gid,
+                    }) + "\n")
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                    self._replace(op)
+                except DedupError as e:
+                    # No reflink support: every other op would fail the same way
+                    stats["errors"].append(str(e))
+                    stats["failed"] += stats["files_total"] - stats["files_done"] - stats["failed"]
+                    return
+                except OSError as e:
+                    stats["failed"] += 1
+                    stats["errors"].append(f"{op['path']}: {e}")
+                    continue
+                stats["files_done"] += 1
+                stats["bytes_reclaimed"] += op["reclaim"]
+            stats["groups_done"] += 1
+            if progress_cb:
+                progress_cb(stats)
+
+    def undo(self, journal_path=None):
+        """
+        Turn the links of a dedup run (the latest one by default) back into
+        independent files with their old mode, owner and times. Files still
+        on their own inode were never replaced (failed, or a crash right
+        after journaling) and are left alone. Returns the number of files
+        restored.
+        """
+        if journal_path is None:
+            journals = sorted(glob.glob(os.path.join(self.journal_dir, "dedup_*.jsonl")))
+            if not journals:
+                raise DedupError("Nothing to undo")
+            journal_path = journals[-1]
+        with open(journal_path, encoding="utf-8") as f:
+            steps = []
+            for line in f:
+                try:
+                    steps.append(json.loads(line))
+                except ValueError:
+                    continue  # torn last line after a crash
+        restored = 0
+        for step in reversed(steps):
+            path = step["path"]
+            if _never_replaced(step):
+                continue
+            temp = _temp_name(path)
+            if os.path.lexists(temp):
+                os.remove(temp)
+            _copy_bytes(path, temp)
+            os.chmod(temp, step["mode"] & 0o7777)
+            if hasattr(os, "chown"):
+                try:
+                    os.chown(temp, step["uid"], step["gid"])
+                except OSError:
+                    pass  # not ours to give away; contents and times still restored
+            os.utime(temp, ns=(step["atime"], step["mtime"]))
+            os.replace(temp, path)
+            restored += 1
+        os.replace(journal_path, journal_path + ".undone")
+        return restored
@@ -0,0 +1,127 @@
+import os
+
+from util.file_utils import get_drive_name
+
+# Grouping of scan roots by the device they live on.
+#
+# Roots on the same disk or share are walked by one thread pool, sized by
+# the kind of device: a spinning disk gets few threads (parallel listings
+# only make it seek), SSDs and network shares (latency bound) get many.
+# Pools of different devices run side by side.
+
+# Directory listing threads per device kind (capped by the caller's workers)
+DEVICE_WORKERS = {
+    "hdd": 2,
+    "ssd": 16,
+    "network": 16,
+    "unknown": 16,
+}
+
+# File system types of network mounts (/proc/mounts)
+NETWORK_FS = frozenset((
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "afs", "9p", "ncpfs",
+    "fuse.sshfs", "fuse.rclone", "davfs", "fuse.davfs2",
+))
+
+
+def is_unc(path):
+    return path.startswith("//") or path.startswith("\\\\")
+
+
+def _mounts():
+    """(mount point, fs type) pairs, longest mount point first (Linux only)."""
+    try:
+        with open("/proc/mounts") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return []
+    # Mount points escape spaces as \040
+    mounts = [(m.replace("\\040", " "), fs) for m, fs in mounts]
+    mounts.sort(key=lambda m: len(m[0]), reverse=True)
+    return mounts
+
+
+def _mount_of(path, mounts):
+    for mount, fs_type in mounts:
+        if path == mount or path.startswith(mount.rstrip("/") + "/"):
+            return mount, fs_type
+    return None, None
+
+
+def _is_rotational(st_dev):
+    """True/False from sysfs for the block device of st_dev, None if unknown."""
+    major, minor = os.major(st_dev), os.minor(st_dev)
+    if major == 0:
+        return None  # virtual device (tmpfs, btrfs subvolume, overlay, ...)
+    block = os.path.realpath(f"/sys/dev/block/{major}:{minor}")
+    # Partitions have no queue/ of their own, their parent disk has
+    for d in (block, os.path.dirname(block)):
+        try:
+            with open(os.path.join(d, "queue", "rotational")) as f:
+                return f.read().strip() == "1"
+        except OSError:
+            continue
+    return None
+
+
+def device_of(path, mounts=None):
+    """
+    (key, kind, label) of the device holding path. key is equal for paths
+    on the same disk or share; kind is one of DEVICE_WORKERS.
+    """
+    if is_unc(path):
+        share = get_drive_name(path)
+        return ("share", share), "network", share
+    try:
+        st_dev = os.stat(path).st_dev
+    except OSError:
+        # Walked like before and found empty; keep it out of other groups
+        return ("path", path), "unknown", get_drive_name(path)
+    if os.name == "nt":
+        return ("dev", st_dev), "unknown", get_drive_name(path)
+
+    if mounts is None:
+        mounts = _mounts()
+    mount, fs_type = _mount_of(os.path.realpath(path), mounts)
+    label = mount or get_drive_name(path)
+    if fs_type in NETWORK_FS:
+        kind = "network"
+    else:
+        rotational = _is_rotational(st_dev)
+        kind = "unknown" if rotational is None else ("hdd" if rotational else "ssd")
+    return ("dev", st_dev), kind, label
+
+
+def normalize_roots(roots):
+    """
+    Distinct roots in the given order (as given, compared normalized),
+    without roots that lie inside another one: those are scanned as part of
+    it, down to its depth.
+    """
+    normed = {}
+    for root in roots:
+        normed.setdefault(os.path.normcase(os.path.normpath(root)), root)
+    kept = []
+    for norm, root in normed.items():
+        inside = any(other != norm and norm.startswith(other.rstrip(os.sep) + os.sep)
+                     for other in normed)
+        if not inside:
+            kept.append(root)
+    return kept
+
+
+def plan_roots(roots, workers=None):
+    """
+    Group roots by device. Returns (label, kind, roots, workers) tuples, one
+    per device, in order of first appearance; workers is the device's
+    DEVICE_WORKERS budget, capped by the workers argument if given.
+    """
+    mounts = None if os.name == "nt" else _mounts()
+    groups = {}
+    for root in normalize_roots(roots):
+        key, kind, label = device_of(root, mounts)
+        if key not in groups:
+            budget = DEVICE_WORKERS[kind]
+            groups[key] = [label, kind, [], min(budget, workers) if workers else budget]
+        groups[key][2].append(root)
+    return [tuple(g) for g in groups.values()]
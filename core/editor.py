@@ -1,10 +1,210 @@
 import os
+import re
+import json
+import glob
+from datetime import datetime
+from util.validators import validate_file_name
+
+RENAME_JOURNAL_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "rename_journals"
+)
+
+# Fields available in rename templates
+TEMPLATE_HELP = "{name} {ext} {counter} {date} {parent}"
+
+
+class RenameError(Exception):
+    pass
+
+
+def _render(item, index, pattern, replacement, template, new_ext, start, step, pad):
+    """New file name for one record, following the rules of build_rename_plan."""
+    name = item["name"]
+    stem, ext = os.path.splitext(name)
+    if pattern is not None:
+        stem = pattern.sub(replacement or "", stem)
+    if new_ext is not None:
+        ext = "." + new_ext.lstrip(".") if new_ext else ""
+    if not template:
+        return stem + ext
+
+    fields = {
+        "name": stem,
+        "ext": ext,
+        "counter": str(start + index * step).zfill(pad),
+        "parent": os.path.basename(os.path.dirname(item["path"])),
+    }
+    if "{date" in template:
+        try:
+            mtime = item.get("mtime") or os.stat(item["path"]).st_mtime_ns
+            fields["date"] = datetime.fromtimestamp(mtime / 1e9).strftime("%Y%m%d")
+        except OSError:
+            fields["date"] = "nodate"
+    try:
+        result = template.format(**fields)
+    except (KeyError, IndexError, ValueError) as e:
+        raise RenameError(f"Bad template {template!r}: {e}")
+    # Add the extension unless the template placed it itself
+    return result if "{ext}" in template else result + ext
+
+
+def build_rename_plan(records, pattern=None, replacement="", template=None, new_ext=None,
+                      start=1, step=1, pad=3):
+    """
+    Work out new names for many files in one pass.
+
+    Rules, applied in order to each record:
+      pattern/replacement: regex substitution on the name without extension
+      new_ext: replace the extension ("" removes it)
+      template: e.g. "{parent}_{counter}_{date}" with fields TEMPLATE_HELP;
+                {counter} starts at start, grows by step, zero-padded to pad
+    Returns a list of {"src", "dst", "name", "status"} where status is "ok",
+    "unchanged", "invalid" or "collision". Collisions are detected in memory:
+    two files getting the same target, or a target that already exists on
+    disk and is not itself being renamed away.
+    """
+    if pattern:
+        try:
+            pattern = re.compile(pattern)
+        except re.error as e:
+            raise RenameError(f"Bad pattern: {e}")
+    else:
+        pattern = None
+
+    plan = []
+    for index, item in enumerate(records):
+        src = item["path"]
+        new_name = _render(item, index, pattern, replacement, template, new_ext, start, step, pad)
+        dst = os.path.join(os.path.dirname(src), new_name)
+        if not new_name or os.sep in new_name or (os.altsep and os.altsep in new_name) \
+                or not validate_file_name(new_name):
+            status = "invalid"
+        elif dst == src:
+            status = "unchanged"
+        else:
+            status = "ok"
+        plan.append({"src": src, "dst": dst, "name": new_name, "status": status})
+
+    # One directory listing per folder instead of a stat per target
+    listings = {}
+    for op in plan:
+        folder = os.path.dirname(op["dst"])
+        if op["status"] == "ok" and folder not in listings:
+            try:
+                listings[folder] = set(os.listdir(folder))
+            except OSError:
+                listings[folder] = set()
+
+    # A file that ends up not being renamed keeps its place, which can in
+    # turn block another target, so repeat until nothing changes
+    changed = True
+    while changed:
+        changed = False
+        moving = set(op["src"] for op in plan if op["status"] == "ok")
+        targets = set()
+        for op in plan:
+            if op["status"] != "ok":
+                continue
+            dst = op["dst"]
+            on_disk = op["name"] in listings[os.path.dirname(dst)] and dst not in moving
+            if dst in targets or on_disk:
+                op["status"] = "collision"
+                changed = True
+            targets.add(dst)
+    return plan
+
+
+def _order_renames(ops):
+    """
+    Order renames so no target is overwritten before it has moved away.
+    Cycles (a->b, b->a) are broken through a temporary name.
+    Returns a list of (src, dst) steps.
+    """
+    pending = {op["src"]: op["dst"] for op in ops}
+    steps = []
+    while pending:
+        progressed = False
+        for src in list(pending):
+            dst = pending[src]
+            if dst not in pending:
+                steps.append((src, dst))
+                del pending[src]
+                progressed = True
+        if progressed:
+            continue
+        # Only cycles left: park one source under a temp name
+        src = next(iter(pending))
+        temp = f"{src}.renaming-{os.getpid()}"
+        n = 0
+        while os.path.lexists(temp):
+            n += 1
+            temp = f"{src}.renaming-{os.getpid()}-{n}"
+        steps.append((src, temp))
+        pending[temp] = pending.pop(src)
+    return steps
+
 
 class Editor:
     def rename_file(self, old_path, new_name):
-        # Logic to rename file
-        pass
+        """Rename one file inside its folder; new_name is a file name, not a path."""
+        if not new_name or os.sep in new_name or not validate_file_name(new_name):
+            raise RenameError(f"Invalid file name: {new_name}")
+        new_path = os.path.join(os.path.dirname(old_path), new_name)
+        if os.path.lexists(new_path):
+            raise RenameError(f"Already exists: {new_path}")
+        os.rename(old_path, new_path)
+        return new_path
+
+    def apply_renames(self, plan, journal_dir=RENAME_JOURNAL_DIR):
+        """
+        Execute the "ok" entries of a plan from build_rename_plan.
+        Every step is journaled (and synced) before it runs, so undo() can
+        roll back even a partially applied batch, temporary names of
+        broken cycles included. Returns (journal path, number of files
+        renamed).
+        """
+        ops = [op for op in plan if op["status"] == "ok"]
+        if not ops:
+            return None, 0
+        os.makedirs(journal_dir, exist_ok=True)
+        journal_path = os.path.join(journal_dir, datetime.now().strftime("rename_%Y%m%d_%H%M%S_%f.jsonl"))
+        with open(journal_path, "w", encoding="utf-8") as journal:
+            for src, dst in _order_renames(ops):
+                if os.path.lexists(dst):
+                    raise RenameError(f"Target appeared on disk, stopping: {dst}")
+                journal.write(json.dumps({"src": src, "dst": dst}) + "\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+                os.rename(src, dst)
+        return journal_path, len(ops)
+
+    def undo(self, journal_path=None, journal_dir=RENAME_JOURNAL_DIR):
+        """
+        Reverse a rename batch (the latest one by default). A step whose
+        dst does not exist was journaled but never ran, and is skipped.
+        Returns steps undone.
+        """
+        if journal_path is None:
+            journals = sorted(glob.glob(os.path.join(journal_dir, "rename_*.jsonl")))
+            if not journals:
+                raise RenameError("Nothing to undo")
+            journal_path = journals[-1]
+        steps = []
+        with open(journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    steps.append(json.loads(line))
+                except ValueError:
+                    continue  # torn last line after a crash
+        undone = 0
+        for step in reversed(steps):
+            if not os.path.lexists(step["dst"]):
+                continue
+            os.rename(step["dst"], step["src"])
+            undone += 1
+        os.replace(journal_path, journal_path + ".undone")
+        return undone
 
     def edit_metadata(self, file_path, metadata):
         # Logic to edit file metadata
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,375 @@
+import multiprocessing
+import os
+import sqlite3
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from util import profiler
+
+# Files per task sent to a worker process; large enough that pickling and
+# scheduling do not dominate, small enough to keep all workers busy
+CHUNK_SIZE = 256
+
+DEFAULT_ENRICH_WORKERS = min(8, os.cpu_count() or 1)
+
+# Threads for the stat() pass (I/O bound, see core.scanner)
+STAT_WORKERS = 16
+
+DEFAULT_META_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "metadata_cache.db"
+)
+
+# Fields added to scan records; times are in nanoseconds like the scan index
+STAT_FIELDS = ("size", "mtime", "ctime", "inode")
+MEDIA_FIELDS = ("width", "height", "duration")
+ENRICH_FIELDS = STAT_FIELDS + MEDIA_FIELDS
+
+# Never read more than this much of a file while looking for a header
+MAX_HEADER_SCAN = 1024 * 1024
+
+
+# ---------------- Header parsers ---------------- #
+# Each takes an open binary file and returns a dict of MEDIA_FIELDS, or {}
+# when the header is not recognised.
+
+def png_info(f):
+    head = f.read(24)
+    if len(head) < 24 or head[:8] != b"\x89PNG\r\n\x1a\n" or head[12:16] != b"IHDR":
+        return {}
+    width, height = struct.unpack(">II", head[16:24])
+    return {"width": width, "height": height}
+
+
+# SOFn markers carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) do not
+_JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_info(f):
+    if f.read(2) != b"\xff\xd8":
+        return {}
+    while f.tell() < MAX_HEADER_SCAN:
+        byte = f.read(1)
+        if not byte:
+            return {}
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":  # fill bytes
+            marker = f.read(1)
+        if not marker:
+            return {}
+        code = marker[0]
+        if code == 0xD8 or 0xD0 <= code <= 0xD7 or code == 0x01:
+            continue  # no length field
+        if code == 0xD9 or code == 0xDA:
+            return {}  # end of image / start of scan before any frame header
+        raw = f.read(2)
+        if len(raw) < 2:
+            return {}
+        length = struct.unpack(">H", raw)[0]
+        if code in _JPEG_SOF:
+            data = f.read(5)
+            if len(data) < 5:
+                return {}
+            height, width = struct.unpack(">HH", data[1:5])
+            return {"width": width, "height": height}
+        f.seek(length - 2, os.SEEK_CUR)
+    return {}
+
+
+def _mp4_boxes(f, start, end):
+    """(type, payload offset, payload end) of the ISO-BMFF boxes in [start, end)."""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        head = f.read(8)
+        if len(head) < 8:
+            return
+        size, kind = struct.unpack(">I4s", head)
+        header = 8
+        if size == 1:
+            large = f.read(8)
+            if len(large) < 8:
+                return
+            size = struct.unpack(">Q", large)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield kind, offset + header, min(offset + size, end)
+        offset += size
+
+
+def mp4_info(f):
+    """Duration from moov/mvhd; top-level boxes are skipped by seeking."""
+    end = os.fstat(f.fileno()).st_size
+    for kind, start, stop in _mp4_boxes(f, 0, end):
+        if kind != b"moov":
+            continue
+        for child, payload, _ in _mp4_boxes(f, start, stop):
+            if child != b"mvhd":
+                continue
+            f.seek(payload)
+            data = f.read(32)
+            if not data:
+                return {}
+            if data[0] == 1:
+                timescale, duration = struct.unpack(">IQ", data[20:32])
+            else:
+                timescale, duration = struct.unpack(">II", data[12:20])
+            if not timescale:
+                return {}
+            return {"duration": duration / timescale}
+        return {}
+    return {}
+
+
+def _ebml_vint(data, pos, keep_marker):
+    """EBML variable length integer at pos: (value, next pos), or (None, pos)."""
+    if pos >= len(data):
+        return None, pos
+    first = data[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8 or pos + length > len(data):
+        return None, pos
+    value = first if keep_marker else first & (mask - 1)
+    for b in data[pos + 1:pos + length]:
+        value = (value << 8) | b
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        value = -1  # unknown size
+    return value, pos + length
+
+
+_EBML_HEADER = 0x1A45DFA3
+_MKV_SEGMENT = 0x18538067
+_MKV_INFO = 0x1549A966
+_MKV_TIMECODE_SCALE = 0x2AD7B1
+_MKV_DURATION = 0x4489
+
+
+def mkv_info(f):
+    """Duration from Segment/Info, which muxers write near the start."""
+    data = f.read(64 * 1024)
+    element, pos = _ebml_vint(data, 0, True)
+    if element != _EBML_HEADER:
+        return {}
+    size, pos = _ebml_vint(data, pos, False)
+    pos += size
+    element, pos = _ebml_vint(data, pos, True)
+    if element != _MKV_SEGMENT:
+        return {}
+    _, pos = _ebml_vint(data, pos, False)
+    # Segment children: skip until Info (SeekHead, Void, ... come first)
+    while pos < len(data):
+        element, pos = _ebml_vint(data, pos, True)
+        size, pos = _ebml_vint(data, pos, False)
+        if element is None or size is None or size < 0:
+            return {}
+        if element != _MKV_INFO:
+            pos += size
+            continue
+        scale = 1_000_000
+        duration = None
+        end = min(pos + size, len(data))
+        while pos < end:
+            child, pos = _ebml_vint(data, pos, True)
+            length, pos = _ebml_vint(data, pos, False)
+            if child is None or length is None or length < 0:
+                break
+            value = data[pos:pos + length]
+            if child == _MKV_TIMECODE_SCALE:
+                scale = int.from_bytes(value, "big")
+            elif child == _MKV_DURATION and length in (4, 8):
+                duration = struct.unpack(">f" if length == 4 else ">d", value)[0]
+            pos += length
+        return {"duration": duration * scale / 1e9} if duration is not None else {}
+    return {}
+
+
+MEDIA_PARSERS = {
+    "png": png_info,
+    "jpg": jpeg_info,
+    "jpeg": jpeg_info,
+    "mp4": mp4_info,
+    "m4v": mp4_info,
+    "mov": mp4_info,
+    "mkv": mkv_info,
+    "webm": mkv_info,
+}
+
+
+def probe_media(path, ext):
+    """Media fields of one file from its header only, {} when unknown."""
+    parser = MEDIA_PARSERS.get(ext)
+    if parser is None:
+        return {}
+    try:
+        with open(path, "rb") as f:
+            return parser(f)
+    except (OSError, struct.error, ValueError, TypeError, OverflowError):
+        return {}
+
+
+def _probe_chunk(chunk):
+    """Worker process task: [(path, ext)] -> [media dict]."""
+    return [probe_media(path, ext) for path, ext in chunk]
+
+
+# ---------------- Cache ---------------- #
+
+class MetadataCache:
+    """
+    On-disk cache of media fields keyed by (path, mtime, size), so headers
+    of unchanged files are read once.
+    """
+
+    def __init__(self, db_path=DEFAULT_META_CACHE_PATH):
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS media ("
+            " path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER,"
+            " width INTEGER, height INTEGER, duration REAL)"
+        )
+        self.conn.commit()
+
+    def get_many(self, keys):
+        """{path: media dict} for the (path, mtime, size) keys found unchanged."""
+        found = {}
+        with self.lock:
+            for path, mtime, size in keys:
+                row = self.conn.execute(
+                    "SELECT width, height, duration FROM media WHERE path = ? AND mtime = ? AND size = ?",
+                    (path, mtime, size)
+                ).fetchone()
+                if row is not None:
+                    found[path] = {k: v for k, v in zip(MEDIA_FIELDS, row) if v is not None}
+        return found
+
+    def put_many(self, rows):
+        """rows: (path, mtime, size, media dict)."""
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO media (path, mtime, size, width, height, duration)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(path, mtime, size, media.get("width"), media.get("height"), media.get("duration"))
+                 for path, mtime, size, media in rows]
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+# ---------------- Enrichment stage ---------------- #
+
+def map_chunks(fn, chunks, workers, cancel_event=None, debug_cb=None):
+    """
+    Yield (chunk, fn(chunk)) for every chunk, in order, computed on a
+    process pool of workers. fn must be a module-level function. Chunks the
+    pool could not handle (no usable worker processes: frozen app, sandbox)
+    are computed in-process instead. Stops early when cancel_event is set.
+    """
+    done = 0
+    if workers > 1 and len(chunks) > 1:
+        try:
+            # spawn: forking a process that runs Tk and worker threads is unsafe
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as pool:
+                futures = [pool.submit(fn, chunk) for chunk in chunks]
+                for chunk, future in zip(chunks, futures):
+                    if cancel_event is not None and cancel_event.is_set():
+                        for f in futures:
+                            f.cancel()
+                        return
+                    yield chunk, future.result()
+                    done += 1
+        except (BrokenProcessPool, OSError) as e:
+            if debug_cb:
+                debug_cb(f"Process pool unavailable ({e}), continuing in-process.")
+    for chunk in chunks[done:]:
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        yield chunk, fn(chunk)
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino
+
+
+@profiler.instrumented("enrich")
+def enrich_results(results, workers=None, cache=None, media=True, debug_cb=None, cancel_event=None):
+    """
+    Add size, mtime, ctime, inode (and for media files width, height,
+    duration) to scan records in place.
+
+    stat() runs on a thread pool; header probing runs on a process pool in
+    chunks of CHUNK_SIZE files and only for files missing from the cache
+    (see MetadataCache). Unreadable files keep their fields empty.
+    Returns the number of files whose headers were actually read.
+    """
+    workers = workers or DEFAULT_ENRICH_WORKERS
+    log = debug_cb or (lambda msg: None)
+    own_cache = cache is None and media
+    if own_cache:
+        cache = MetadataCache()
+
+    try:
+        items = list(results)  # ResultStore iteration skips removed rows
+        paths = [item["path"] for item in items]
+        with ThreadPoolExecutor(max_workers=STAT_WORKERS) as pool:
+            stats = list(pool.map(_stat, paths, chunksize=CHUNK_SIZE))
+        profiler.count("stat_calls", len(paths))
+
+        to_probe = []
+        for i, (item, st) in enumerate(zip(items, stats)):
+            if st is None:
+                continue
+            for key, value in zip(STAT_FIELDS, st):
+                item[key] = value
+            ext = item["ext"].lower()
+            if media and ext in MEDIA_PARSERS:
+                to_probe.append((i, paths[i], ext, st[1], st[0]))
+        log(f"Metadata: {len(paths)} files stat'ed, {len(to_probe)} media files.")
+        if not to_probe:
+            return 0
+
+        cached = cache.get_many((path, mtime, size) for _, path, _, mtime, size in to_probe)
+        missing = [entry for entry in to_probe if entry[1] not in cached]
+        log(f"Metadata: {len(cached)} from cache, {len(missing)} headers to read.")
+
+        probed = {}
+        if missing:
+            chunks = [missing[n:n + CHUNK_SIZE] for n in range(0, len(missing), CHUNK_SIZE)]
+            tasks = [[(e[1], e[2]) for e in chunk] for chunk in chunks]
+            for task, infos in map_chunks(_probe_chunk, tasks, workers, cancel_event, debug_cb):
+                for (path, _), info in zip(task, infos):
+                    probed[path] = info
+            profiler.count("open_calls", len(probed))
+            cache.put_many((path, mtime, size, probed[path])
+                           for _, path, _, mtime, size in missing if path in probed)
+
+        for i, path, _, _, _ in to_probe:
+            info = cached.get(path) or probed.get(path) or {}
+            item = items[i]
+            for key, value in info.items():
+                item[key] = value
+        return len(probed)
+    finally:
+        if own_cache:
+            cache.close()
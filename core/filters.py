@@ -0,0 +1,154 @@
+import fnmatch
+import os
+import re
+
+# Directories skipped by the "prune common" option: VCS metadata, package
+# caches and filesystem/NAS snapshot folders
+DEFAULT_PRUNE = (".git", ".hg", ".svn", "node_modules", "__pycache__",
+                 ".snapshot", ".snapshots", ".zfs", "@eaDir", "$RECYCLE.BIN")
+
+# Patterns starting with this are regular expressions, anything else is a glob
+REGEX_PREFIX = "re:"
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_size(text):
+    """'1500', '10K', '2.5M', '1G' -> bytes. None/'' -> None."""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return int(text)
+    text = text.strip().upper().rstrip("B")
+    if not text:
+        return None
+    unit = text[-1] if text[-1] in _SIZE_UNITS else ""
+    number = text[:-1] if unit else text
+    try:
+        return int(float(number) * _SIZE_UNITS[unit])
+    except ValueError:
+        raise ValueError(f"Bad size: {text!r}")
+
+
+def split_patterns(text):
+    """Comma separated patterns from a GUI/CLI field, blanks dropped."""
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        return [p for t in text for p in split_patterns(t)]
+    return [p.strip() for p in text.split(",") if p.strip()]
+
+
+def _pattern_regex(pattern):
+    """Regex source matching a whole file name for one glob or re: pattern."""
+    if pattern.startswith(REGEX_PREFIX):
+        # Regexes match anywhere in the name, like re.search
+        return f".*?(?:{pattern[len(REGEX_PREFIX):]}).*"
+    return fnmatch.translate(pattern)
+
+
+def _alternation(patterns):
+    return "|".join(f"(?:{_pattern_regex(p)})" for p in patterns)
+
+
+class ScanFilter:
+    """
+    All file and directory rules of a scan, compiled once.
+
+    extensions        frozenset of lowercase extensions (empty = all)
+    filename_filter   case-insensitive substring, as before
+    include/exclude   globs or "re:" regexes on the file name; together with
+                      filename_filter they become one combined regex
+    min_size/max_size bytes, inclusive
+    newer_than/older_than
+                      epoch seconds on the modification time
+    prune             directory names (or globs) never descended into
+
+    Size and time rules need a stat() per file, the others only the name.
+    """
+
+    def __init__(self, extensions=None, filename_filter=None, include=None, exclude=None,
+                 min_size=None, max_size=None, newer_than=None, older_than=None, prune=None):
+        self.extensions = frozenset(e.lower().lstrip(".") for e in extensions or () if e != "ALL")
+        self.filename_filter = filename_filter or None
+        self.include = split_patterns(include)
+        self.exclude = split_patterns(exclude)
+        self.min_size = parse_size(min_size)
+        self.max_size = parse_size(max_size)
+        self.newer_than = newer_than
+        self.older_than = older_than
+        self.prune = split_patterns(prune)
+
+        # One regex for every name rule:
+        #   ^(?!exclude\Z)(?=.*substring)(?:include)\Z
+        parts = []
+        if self.exclude:
+            parts.append(f"(?!(?:{_alternation(self.exclude)})\\Z)")
+        if self.filename_filter:
+            parts.append(f"(?=.*?{re.escape(self.filename_filter)})")
+        if self.include:
+            parts.append(f"(?:{_alternation(self.include)})\\Z")
+        self.name_regex = re.compile("".join(parts), re.IGNORECASE | re.DOTALL) if parts else None
+        self._name_match = self.name_regex.match if self.name_regex else None
+
+        # Plain names are a set lookup, only real globs go through a regex
+        globs = [p for p in self.prune if p.startswith(REGEX_PREFIX) or any(c in p for c in "*?[")]
+        self.prune_names = frozenset(p for p in self.prune if p not in globs)
+        self._prune_match = re.compile(f"(?:{_alternation(globs)})\\Z").match if globs else None
+
+        self.needs_stat = any(v is not None for v in (self.min_size, self.max_size,
+                                                      self.newer_than, self.older_than))
+
+    @classmethod
+    def from_metadata(cls, scan_metadata):
+        """ScanFilter for a scan described by core.pipeline.build_scan_metadata."""
+        return cls(scan_metadata.get("file_extensions"), scan_metadata.get("filename_filter"),
+                   **(scan_metadata.get("filters") or {}))
+
+    def is_empty(self):
+        return not (self.extensions or self._name_match or self.needs_stat or self.prune)
+
+    def match_name(self, name, ext):
+        """Name rules only; ext is the lowercase extension of name."""
+        if self.extensions and ext not in self.extensions:
+            return False
+        return self._name_match is None or self._name_match(name) is not None
+
+    def match_stat(self, size, mtime):
+        """Size/time rules; mtime in seconds."""
+        if self.min_size is not None and size < self.min_size:
+            return False
+        if self.max_size is not None and size > self.max_size:
+            return False
+        if self.newer_than is not None and mtime < self.newer_than:
+            return False
+        if self.older_than is not None and mtime > self.older_than:
+            return False
+        return True
+
+    def match_entry(self, entry, ext):
+        """Full check of a file os.DirEntry."""
+        if not self.match_name(entry.name, ext):
+            return False
+        if not self.needs_stat:
+            return True
+        try:
+            st = entry.stat()
+        except OSError:
+            return False
+        return self.match_stat(st.st_size, st.st_mtime)
+
+    def prune_dir(self, name):
+        """True if a directory with this name is not to be descended into."""
+        if name in self.prune_names:
+            return True
+        return self._prune_match is not None and self._prune_match(name) is not None
+
+    def prune_path(self, path, base_path):
+        """True if any directory between base_path and path is pruned."""
+        if not self.prune:
+            return False
+        rel = os.path.relpath(os.path.dirname(path), base_path)
+        if rel == os.curdir:
+            return False
+        return any(self.prune_dir(part) for part in rel.split(os.sep))
@@ -0,0 +1,210 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from util import profiler, throttle
+
+# Bytes hashed from the head and from the tail of a file in the partial stage
+PARTIAL_SIZE = 4 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+
+# hashlib releases the GIL while digesting large buffers, so threads scale
+# on both the read and the hash side
+DEFAULT_HASH_WORKERS = min(8, os.cpu_count() or 1)
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "hash_cache.db"
+)
+
+
+def _new_hash():
+    return hashlib.blake2b(digest_size=16)
+
+
+def partial_hash(path, size, partial_size=PARTIAL_SIZE):
+    """
+    Hash the first and last partial_size bytes of a file.
+    Files no bigger than 2 * partial_size are hashed completely, so for them
+    the partial hash is also the full hash.
+    """
+    h = _new_hash()
+    profiler.count("open_calls")
+    profiler.count("bytes_hashed", min(size, 2 * partial_size))
+    with open(path, "rb") as f:
+        if size <= 2 * partial_size:
+            with throttle.io("read", size):
+                h.update(f.read())
+        else:
+            with throttle.io("read", partial_size):
+                h.update(f.read(partial_size))
+            f.seek(size - partial_size)
+            with throttle.io("read", partial_size):
+                h.update(f.read(partial_size))
+    return h.hexdigest()
+
+
+def full_hash(path):
+    """Hash the whole file with a reusable read buffer."""
+    h = _new_hash()
+    buf = bytearray(READ_SIZE)
+    view = memoryview(buf)
+    total = 0
+    profiler.count("open_calls")
+    with open(path, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        while True:
+            n = throttle.readinto(f, buf, size - total)
+            if not n:
+                break
+            h.update(view[:n])
+            total += n
+    profiler.count("bytes_hashed", total)
+    return h.hexdigest()
+
+
+class HashCache:
+    """
+    On-disk cache of partial/full hashes keyed by (path, size, mtime, inode).
+    A file whose key is unchanged since the last scan is never read again.
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            " path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, inode INTEGER,"
+            " partial TEXT, full TEXT)"
+        )
+        self.conn.commit()
+
+    def get(self, path, size, mtime, inode):
+        """Returns (partial, full) for an unchanged file, (None, None) otherwise."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT partial, full FROM hashes WHERE path = ? AND size = ? AND mtime = ? AND inode = ?",
+                (path, size, mtime, inode)
+            ).fetchone()
+        return row if row else (None, None)
+
+    def put(self, path, size, mtime, inode, partial=None, full=None):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO hashes (path, size, mtime, inode, partial, full) VALUES (?, ?, ?, ?, ?, ?)"
+                # Hashes of the same key are merged, a changed file starts over
+                " ON CONFLICT(path) DO UPDATE SET"
+                " partial = CASE WHEN size = excluded.size AND mtime = excluded.mtime"
+                "  AND inode = excluded.inode THEN COALESCE(excluded.partial, partial) ELSE excluded.partial END,"
+                " full = CASE WHEN size = excluded.size AND mtime = excluded.mtime"
+                "  AND inode = excluded.inode THEN COALESCE(excluded.full, full) ELSE excluded.full END,"
+                " size = excluded.size, mtime = excluded.mtime, inode = excluded.inode",
+                (path, size, mtime, inode, partial, full)
+            )
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+def detect_content_duplicates(results, workers=None, cache=None, partial_size=PARTIAL_SIZE,
+                              min_size=1, debug_cb=None):
+    """
+    Detect files with identical content in results.
+    Runs in stages so most files are never read:
+      1. group by st_size
+      2. hash head + tail of files whose size collides
+      3. full hash only for files whose partial hash still collides
+    Returns dict with content hash as key and list of full paths as value.
+    Files smaller than min_size (by default: empty files) are ignored.
+    """
+    workers = workers or DEFAULT_HASH_WORKERS
+    own_cache = cache is None
+    if own_cache:
+        cache = HashCache()
+
+    def log(msg):
+        if debug_cb:
+            debug_cb(msg)
+
+    # Stage 1: size
+    by_size = defaultdict(list)
+    for item in results:
+        try:
+            size, mtime, inode = _stat_key(item["path"])
+        except OSError:
+            continue
+        if size >= min_size:
+            by_size[size].append((item["path"], size, mtime, inode))
+    candidates = [f for group in by_size.values() if len(group) > 1 for f in group]
+    log(f"Content check: {len(candidates)} files share a size with another file.")
+
+    def stage_partial(entry):
+        path, size, mtime, inode = entry
+        partial, full = cache.get(path, size, mtime, inode)
+        if partial is None:
+            try:
+                partial = partial_hash(path, size, partial_size)
+            except OSError:
+                return entry, None, None
+            if size <= 2 * partial_size:
+                full = partial
+            cache.put(path, size, mtime, inode, partial=partial, full=full)
+        return entry, partial, full
+
+    def stage_full(entry):
+        path, size, mtime, inode = entry
+        _, full = cache.get(path, size, mtime, inode)
+        if full is None:
+            try:
+                full = full_hash(path)
+            except OSError:
+                return entry, None
+            cache.put(path, size, mtime, inode, full=full)
+        return entry, full
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Stage 2: head + tail
+            by_partial = defaultdict(list)
+            known_full = {}
+            for entry, partial, full in pool.map(stage_partial, candidates):
+                if partial is None:
+                    continue
+                by_partial[(entry[1], partial)].append(entry)
+                if full is not None:
+                    known_full[entry[0]] = full
+            colliding = [f for group in by_partial.values() if len(group) > 1 for f in group]
+            to_hash = [f for f in colliding if f[0] not in known_full]
+            log(f"Content check: {len(colliding)} partial matches, {len(to_hash)} need a full hash.")
+
+            # Stage 3: full hash of what is left
+            for entry, full in pool.map(stage_full, to_hash):
+                if full is not None:
+                    known_full[entry[0]] = full
+        cache.commit()
+    finally:
+        if own_cache:
+            cache.close()
+
+    by_hash = defaultdict(list)
+    for path, size, mtime, inode in colliding:
+        if path in known_full:
+            by_hash[f"{size}:{known_full[path]}"].append(path)
+
+    return {k: v for k, v in by_hash.items() if len(v) > 1}
@@ -0,0 +1,287 @@
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core.results import ResultStore
+from core.scanner import DEFAULT_WORKERS, _ext_of
+from util import profiler, throttle
+from util.constants import VIEWS
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "scan_index.db"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    depth INTEGER,
+    mtime INTEGER          -- NULL until the directory has been listed
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT,
+    name TEXT,
+    ext TEXT,
+    size INTEGER,
+    mtime INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files(dir);
+CREATE INDEX IF NOT EXISTS files_name ON files(name);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _norm(path):
+    return os.path.normpath(os.path.abspath(path))
+
+
+def _depth(path):
+    return path.rstrip(os.sep).count(os.sep)
+
+
+# Paths below a folder are a range of the (case sensitive) path order, as
+# LIKE would ignore ASCII case: "col = ? OR (col >= ? AND col < ?)"
+_BELOW = "({0} = ? OR ({0} >= ? AND {0} < ?))"
+
+
+def _below(path):
+    """Parameters of _BELOW for everything at or below path."""
+    prefix = path.rstrip(os.sep) + os.sep
+    return (path, prefix, prefix + "\U0010ffff")
+
+
+def _list_dir(path):
+    """
+    List one directory for the index.
+    Returns (files, subdirs) where files are (name, size, mtime_ns) tuples.
+    """
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            subdirs.append(entry.name)
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                files.append((entry.name, st.st_size, st.st_mtime_ns))
+    except OSError:
+        pass
+    return files, subdirs
+
+
+class ScanIndex:
+    """
+    Persistent SQLite (WAL mode) index of scanned directories and files.
+
+    refresh() walks a tree incrementally: a directory whose mtime matches the
+    index is not listed again, only its known subdirectories are checked.
+    query() then answers scan_files/tag_duplicates/filter requests in SQL.
+    Note that editing a file in place does not change its directory mtime, so
+    size/mtime of such files are only updated once the directory changes.
+    """
+
+    def __init__(self, db_path=DEFAULT_INDEX_PATH):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+    # ---------------- Updating ---------------- #
+
+    @profiler.instrumented("index_refresh")
+    def refresh(self, base_path, max_depth, workers=None, debug_cb=None, cancel_event=None):
+        """
+        Bring the index up to date for base_path down to max_depth.
+        Returns a dict with counts of checked, relisted and removed directories.
+        """
+        base = _norm(base_path)
+        base_depth = _depth(base)
+        stats = {"checked": 0, "listed": 0, "removed": 0, "files": 0}
+
+        with self.lock:
+            known = dict(self.conn.execute(
+                "SELECT path, mtime FROM dirs WHERE " + _BELOW.format("path"), _below(base)
+            ).fetchall())
+
+        def check(path):
+            """Runs on the pool: stat the dir and relist it if it changed."""
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                return path, None, None, None
+            if known.get(path) == mtime:
+                return path, mtime, None, None
+            with throttle.io("dir") as op:
+                files, subdirs = _list_dir(path)
+                op.units = len(files) + len(subdirs)
+            return path, mtime, files, subdirs
+
+        level = [base]
+        with ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS) as pool:
+            while level:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                next_level = []
+                with self.lock:
+                    for path, mtime, files, subdirs in pool.map(check, level):
+                        stats["checked"] += 1
+                        depth = _depth(path)
+                        if mtime is None:
+                            stats["removed"] += self._remove_tree(path)
+                            continue
+                        if files is None:
+                            # Unchanged: reuse the stored listing
+                            children = [row[0] for row in self.conn.execute(
+                                "SELECT path FROM dirs WHERE parent = ?", (path,))]
+                        else:
+                            stats["listed"] += 1
+                            stats["files"] += len(files)
+                            children = [os.path.join(path, d) for d in subdirs]
+                            stats["removed"] += self._store_listing(path, depth, mtime, files, children)
+                            known[path] = mtime
+                        if depth - base_depth < max_depth:
+                            next_level.extend(children)
+                    self.conn.commit()
+                if debug_cb:
+                    debug_cb(f"Index: {stats['checked']} dirs checked, {stats['listed']} relisted...")
+                level = next_level
+
+        return stats
+
+    def _store_listing(self, path, depth, mtime, files, children):
+        parent = os.path.dirname(path)
+        self.conn.execute(
+            "INSERT INTO dirs (path, parent, depth, mtime) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(path) DO UPDATE SET mtime = excluded.mtime",
+            (path, parent, depth, mtime)
+        )
+
+        # Subdirectories that disappeared take their whole subtree with them
+        old_children = set(row[0] for row in self.conn.execute(
+            "SELECT path FROM dirs WHERE parent = ?", (path,)))
+        removed = 0
+        for gone in old_children.difference(children):
+            removed += self._remove_tree(gone)
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO dirs (path, parent, depth, mtime) VALUES (?, ?, ?, NULL)",
+            [(child, path, depth + 1) for child in children]
+        )
+
+        self.conn.execute("DELETE FROM files WHERE dir = ?", (path,))
+        self.conn.executemany(
+            "INSERT INTO files (path, dir, name, ext, size, mtime) VALUES (?, ?, ?, ?, ?, ?)",
+            [(os.path.join(path, name), path, name, _ext_of(name) or "N/A", size, f_mtime)
+             for name, size, f_mtime in files]
+        )
+        return removed
+
+    def _remove_tree(self, path):
+        self.conn.execute("DELETE FROM files WHERE " + _BELOW.format("dir"), _below(path))
+        cur = self.conn.execute("DELETE FROM dirs WHERE " + _BELOW.format("path"), _below(path))
+        return cur.rowcount
+
+    # ---------------- Querying ---------------- #
+
+    @profiler.instrumented("index_query")
+    def query(self, base_path, extensions, max_depth, filename_filter=None, view="all",
+              scan_filter=None):
+        """
+        Same ResultStore as scan_files + tag_duplicates(mode="name"), straight
+        from the index (plus size/mtime). view is one of VIEWS.
+        The rules of a ScanFilter (core.filters) that SQL cannot express run
+        as a Python function inside the query, so duplicate counts only see
+        files that pass them.
+        """
+        if view not in VIEWS:
+            raise ValueError(f"Unknown view: {view}")
+        base = _norm(base_path)
+
+        where = [_BELOW.format("f.dir"), "d.depth - ? <= ?"]
+        params = [*_below(base), _depth(base), max_depth]
+        if extensions:
+            exts = sorted(set(e.lower() for e in extensions))
+            where.append(f"f.ext IN ({', '.join('?' * len(exts))})")
+            params.extend(exts)
+        if filename_filter:
+            where.append("instr(lower(f.name), ?) > 0")
+            params.append(filename_filter.lower())
+        if scan_filter is not None and scan_filter.is_empty():
+            scan_filter = None
+        if scan_filter is not None:
+            def keep(name, path, size, mtime):
+                if not scan_filter.match_name(name, _ext_of(name)):
+                    return False
+                if scan_filter.needs_stat and not scan_filter.match_stat(size, mtime / 1e9):
+                    return False
+                return not scan_filter.prune_path(path, base)
+
+            where.append("scan_keep(f.name, f.path, f.size, f.mtime)")
+
+        view_filter = {"all": "", "duplicates": "WHERE dup_count > 1", "unique": "WHERE dup_count = 1"}[view]
+        sql = f"""
+            WITH scoped AS (
+                SELECT f.name, f.ext, f.path, f.size, f.mtime,
+                       COUNT(*) OVER (PARTITION BY f.name) AS dup_count
+                FROM files f JOIN dirs d ON d.path = f.dir
+                WHERE {' AND '.join(where)}
+            )
+            SELECT name, ext, path, size, mtime, dup_count,
+                   CASE WHEN dup_count > 1
+                        THEN DENSE_RANK() OVER (PARTITION BY dup_count > 1 ORDER BY name)
+                        ELSE 0 END AS dup_group
+            FROM scoped {view_filter}
+            ORDER BY path
+        """
+        with self.lock:
+            if scan_filter is not None:
+                self.conn.create_function("scan_keep", 4, keep, deterministic=True)
+            rows = self.conn.execute(sql, params).fetchall()
+
+        return ResultStore({
+            "name": name,
+            "ext": ext,
+            "path": path,
+            "size": size,
+            "mtime": mtime,
+            "is_duplicate": dup_count > 1,
+            "duplicate_count": dup_count if dup_count > 1 else 0,
+            "duplicate_group": dup_group,
+        } for name, ext, path, size, mtime, dup_count, dup_group in rows)
+
+    # ---------------- Last scan ---------------- #
+
+    def save_last_scan(self, scan_metadata):
+        """Remember the parameters of the last scan so the GUI can reopen it."""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_scan', ?)",
+                (json.dumps(scan_metadata),)
+            )
+            self.conn.commit()
+
+    def load_last_scan(self):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'last_scan'").fetchone()
+        return json.loads(row[0]) if row else None
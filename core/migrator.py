@@ -1,13 +1,477 @@
+import errno
+import filecmp
 import shutil
 import os
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from core.hasher import _new_hash, full_hash
+from util import throttle
+
+# Bulk migration defaults
+DEFAULT_COPY_WORKERS = 4
+COPY_BUFFER = 8 * 1024 * 1024
+JOURNAL_NAME = ".migration_journal.jsonl"
+PART_SUFFIX = ".part"
+
+# Checksums of copied files, "digest  path" lines (check with: b2sum -l 128 -c)
+MANIFEST_NAME = ".migration_manifest.b2"
+
+# off: kernel copy, nothing read back (1x I/O, unchecked)
+# manifest: data hashed while it is copied, digests written to the manifest (1x)
+# verify: manifest, then every destination is re-read and compared (2x)
+CHECKSUM_MODES = ("off", "manifest", "verify")
+
+
+class VerifyError(OSError):
+    pass
+
 
 class Migrator:
-    def move_file(self, src, dst):
-        shutil.move(src, dst)
+    def move_file(self, src, dst, verify=False):
+        """
+        Move one file. On the same device this is a rename (returns None);
+        across devices it is copy_file then removing src (returns the digest).
+        """
+        if os.path.isdir(src):
+            shutil.move(src, dst)
+            return None
+        if os.path.isdir(dst):
+            dst = os.path.join(dst, os.path.basename(src))
+        try:
+            os.rename(src, dst)
+            return None
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        digest = self.copy_file(src, dst, verify)
+        os.remove(src)
+        return digest
 
-    def copy_file(self, src, dst):
-        shutil.copy2(src, dst)
+    def copy_file(self, src, dst, verify=False):
+        """
+        Copy one file with its metadata (like shutil.copy2), hashing the data
+        as it passes. With verify, dst is read back and compared before it
+        gets its final name. Returns the content digest (core.hasher's hash).
+        """
+        if os.path.isdir(dst):
+            dst = os.path.join(dst, os.path.basename(src))
+        part = dst + PART_SUFFIX
+        digest = _copy_hashed(src, part, durable=verify)
+        shutil.copystat(src, part)
+        if verify:
+            _verify_copy(part, digest)
+        os.replace(part, dst)
+        return digest
 
     def export_to_txt(self, data, path):
         with open(path, "w", encoding="utf-8") as f:
-            f.write("\n".join(data))
\ No newline at end of file
+            f.write("\n".join(data))
+
+
+def _device_of(path):
+    """st_dev of path, or of its nearest existing parent for new destinations."""
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except FileNotFoundError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                raise
+            path = parent
+
+
+def _same_stat(st, path):
+    """path has the size and mtime of st, as a finished copy (copystat) of that file has."""
+    try:
+        other = os.stat(path)
+    except OSError:
+        return False
+    return other.st_size == st.st_size and other.st_mtime_ns == st.st_mtime_ns
+
+
+def _already_copied(src, dst):
+    """dst is a finished copy of src whose run stopped before journaling it."""
+    try:
+        return _same_stat(os.stat(src), dst) and filecmp.cmp(src, dst, shallow=False)
+    except OSError:
+        return False
+
+
+def plan_migration(records, dest_dir, mode="move", base_path=None):
+    """
+    Work out every operation of a bulk migration up front.
+
+    records are scan results (anything with a "path"). With base_path the
+    folder structure below it is kept under dest_dir, otherwise files are
+    placed flat in dest_dir, with " (n)" added to names that would collide
+    with another file of the plan or one already at the destination. A
+    destination file that looks like a copy of the source (same size and
+    mtime: an earlier run of the same migration) keeps its name, so
+    planning again after an interruption gives the same names.
+    Returns a list of op dicts:
+    {"src", "dst", "size", "rename"} where rename means src and dst are on
+    the same device so a move is a plain os.rename.
+    """
+    if mode not in ("move", "copy"):
+        raise ValueError(f"Unknown migration mode: {mode}")
+    dest_dev = _device_of(dest_dir)
+    plan = []
+    taken = set()
+    for item in records:
+        src = item["path"]
+        try:
+            st = os.stat(src)
+        except OSError:
+            continue
+        if base_path:
+            rel = os.path.relpath(src, base_path)
+        else:
+            rel = os.path.basename(src)
+        dst = os.path.join(dest_dir, rel)
+        stem, ext = os.path.splitext(dst)
+        n = 0
+        while dst in taken or (not base_path and os.path.lexists(dst) and not _same_stat(st, dst)):
+            n += 1
+            dst = f"{stem} ({n}){ext}"
+        taken.add(dst)
+        plan.append({
+            "src": src,
+            "dst": dst,
+            "size": st.st_size,
+            "rename": mode == "move" and st.st_dev == dest_dev,
+        })
+    return plan
+
+
+def _copy_data(src, dst, buffer_size=COPY_BUFFER):
+    """
+    Copy file contents using the kernel where possible:
+    copy_file_range (Linux, may reflink), then sendfile, then a large
+    reusable buffer.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        for kernel_copy in ("copy_file_range", "sendfile"):
+            fn = getattr(os, kernel_copy, None)
+            if fn is None:
+                continue
+            try:
+                copied = 0
+                while copied < size:
+                    chunk = min(buffer_size, size - copied)
+                    with throttle.io("write", chunk):
+                        if kernel_copy == "copy_file_range":
+                            n = fn(infd, outfd, chunk)
+                        else:
+                            n = fn(outfd, infd, copied, chunk)
+                    if not n:
+                        break
+                    copied += n
+                if copied == size:
+                    return
+            except OSError:
+                pass
+            # Start over with the next method
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+
+        buf = bytearray(buffer_size)
+        view = memoryview(buf)
+        copied = 0
+        while True:
+            n = throttle.readinto(fsrc, buf, size - copied)
+            if not n:
+                break
+            copied += n
+            with throttle.io("write", n):
+                fdst.write(view[:n])
+
+
+def _copy_hashed(src, dst, buffer_size=COPY_BUFFER, durable=False):
+    """
+    Copy file contents through one reusable buffer, hashing every chunk on
+    the way; returns the digest. No kernel copy: the data has to pass
+    through the process to be hashed, but it is read only once.
+    durable flushes dst to the device and drops it from the page cache, so
+    a verification read really comes from the disk.
+    """
+    h = _new_hash()
+    buf = bytearray(buffer_size)
+    view = memoryview(buf)
+    with open(src, "rb", buffering=0) as fsrc, open(dst, "wb", buffering=0) as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        copied = 0
+        while True:
+            n = throttle.readinto(fsrc, buf, size - copied)
+            if not n:
+                break
+            copied += n
+            chunk = view[:n]
+            h.update(chunk)
+            written = 0
+            with throttle.io("write", n):
+                while written < n:  # raw writes may be partial
+                    written += fdst.write(chunk[written:])
+        if durable:
+            os.fsync(fdst.fileno())
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fdst.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    return h.hexdigest()
+
+
+def _verify_copy(path, digest):
+    """
+    Re-read a copy and compare it with the digest taken while copying. The
+    copy is removed when it does not match or cannot be read back.
+    """
+    try:
+        copied = full_hash(path)
+    except BaseException:
+        os.remove(path)
+        raise
+    if copied != digest:
+        os.remove(path)
+        raise VerifyError(errno.EIO, "copy does not match its source (removed)", path)
+
+
+class MigrationManifest:
+    """
+    Checksums of migrated files in b2sum format (BLAKE2b, 128 bits), paths
+    relative to the manifest's folder. Appended as files finish, so an
+    interrupted run keeps the digests of what it copied.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.base = os.path.dirname(os.path.abspath(path))
+        self.lock = threading.Lock()
+        self.f = None
+
+    def record(self, dst, digest):
+        rel = os.path.relpath(os.path.abspath(dst), self.base).replace(os.sep, "/")
+        with self.lock:
+            if self.f is None:
+                os.makedirs(self.base, exist_ok=True)
+                self.f = open(self.path, "a", encoding="utf-8")
+            self.f.write(f"{digest}  {rel}\n")
+            self.f.flush()
+
+    def close(self):
+        with self.lock:
+            if self.f is not None:
+                self.f.close()
+                self.f = None
+
+
+class MigrationJournal:
+    """
+    Append-only journal of finished operations (one JSON object per line),
+    kept next to the migrated files so an interrupted run can resume.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.f = None
+
+    def completed(self):
+        """Set of (src, dst) pairs already done according to the journal."""
+        done = set()
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line after a crash
+                if entry.get("status") == "done":
+                    done.add((entry["src"], entry["dst"]))
+        return done
+
+    def record(self, op, status, error=None):
+        entry = {"src": op["src"], "dst": op["dst"], "status": status}
+        if error:
+            entry["error"] = error
+        with self.lock:
+            if self.f is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self.f = open(self.path, "a", encoding="utf-8")
+            self.f.write(json.dumps(entry) + "\n")
+            self.f.flush()
+
+    def close(self):
+        with self.lock:
+            if self.f is not None:
+                self.f.close()
+                self.f = None
+
+
+class BulkMigrator:
+    """
+    Runs a plan from plan_migration.
+    Same-device moves are renamed in place; everything else is copied on a
+    bounded thread pool (to dst + PART_SUFFIX, renamed when complete, so a
+    crash never leaves a truncated file under the final name). Finished
+    operations are journaled and skipped when the same plan runs again.
+
+    checksum (see CHECKSUM_MODES) hashes copies as they stream and writes a
+    manifest next to the journal. With "verify" each copy is read back from
+    the device on a second pool while later files are still copying; it
+    only gets its final name, and a moved source is only removed, once it
+    matches.
+    """
+
+    def __init__(self, mode="move", workers=DEFAULT_COPY_WORKERS, buffer_size=COPY_BUFFER,
+                 journal_path=None, checksum="off", manifest_path=None):
+        if mode not in ("move", "copy"):
+            raise ValueError(f"Unknown migration mode: {mode}")
+        if checksum not in CHECKSUM_MODES:
+            raise ValueError(f"Unknown checksum mode: {checksum}")
+        self.mode = mode
+        self.workers = workers
+        self.buffer_size = buffer_size
+        self.journal_path = journal_path
+        self.checksum = checksum
+        self.manifest_path = manifest_path
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def _transfer(self, op):
+        """Copy or rename one file; returns the digest when the copy still has to be verified."""
+        src, dst = op["src"], op["dst"]
+        if os.path.lexists(dst):
+            if not _already_copied(src, dst):
+                raise FileExistsError(f"destination exists: {dst}")
+            # Finished by a run that stopped before journaling it
+            if self.mode == "move":
+                os.remove(src)
+            return None
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if op["rename"]:
+            os.rename(src, dst)
+            return None
+        part = dst + PART_SUFFIX
+        if self.checksum == "off":
+            _copy_data(src, part, self.buffer_size)
+            digest = None
+        else:
+            digest = _copy_hashed(src, part, self.buffer_size, durable=self.checksum == "verify")
+            op["digest"] = digest
+        shutil.copystat(src, part)
+        if self.checksum == "verify":
+            return digest
+        self._complete(op)
+        return None
+
+    def _complete(self, op):
+        os.replace(op["dst"] + PART_SUFFIX, op["dst"])
+        if self.mode == "move":
+            os.remove(op["src"])
+
+    def _verify(self, op, digest):
+        _verify_copy(op["dst"] + PART_SUFFIX, digest)
+        self._complete(op)
+
+    def _finish(self, op, journal, manifest, error=None):
+        with self.lock:
+            if error:
+                self.stats["failed"] += 1
+                self.stats["errors"].append(f"{op['src']}: {error}")
+            else:
+                self.stats["files_done"] += 1
+                self.stats["bytes_done"] += op["size"]
+                if self.checksum == "verify" and not op["rename"]:
+                    self.stats["verified"] += 1
+        if manifest is not None and not error and op.get("digest"):
+            manifest.record(op["dst"], op["digest"])
+        journal.record(op, "failed" if error else "done", error)
+
+    def run(self, plan, progress_cb=None, cancel_event=None):
+        """
+        Execute the plan. progress_cb(stats) is called after every file from
+        worker threads; stats holds files/bytes done and totals, elapsed
+        seconds, verified copies and any errors. Returns the final stats.
+        """
+        journal_path = self.journal_path
+        folder = None
+        if plan:
+            folder = os.path.commonpath([os.path.dirname(op["dst"]) for op in plan])
+        if journal_path is None and folder:
+            journal_path = os.path.join(folder, JOURNAL_NAME)
+        journal = MigrationJournal(journal_path) if journal_path else None
+        manifest_path = self.manifest_path
+        if manifest_path is None and folder and self.checksum != "off":
+            manifest_path = os.path.join(folder, MANIFEST_NAME)
+        manifest = MigrationManifest(manifest_path) if manifest_path else None
+        done = journal.completed() if journal else set()
+        todo = [op for op in plan if (op["src"], op["dst"]) not in done]
+
+        self.stats = {
+            "files_total": len(todo),
+            "bytes_total": sum(op["size"] for op in todo),
+            "files_done": 0,
+            "bytes_done": 0,
+            "verified": 0,
+            "skipped": len(plan) - len(todo),
+            "failed": 0,
+            "errors": [],
+            "started": time.monotonic(),
+            "manifest": manifest_path,
+        }
+        verify_pool = None
+        verifying = []
+
+        def report(op, error=None):
+            self._finish(op, journal, manifest, error)
+            if progress_cb:
+                progress_cb(self.stats)
+
+        def check(op, digest):
+            try:
+                self._verify(op, digest)
+            except OSError as e:
+                report(op, str(e))
+            else:
+                report(op)
+
+        def step(op):
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            try:
+                digest = self._transfer(op)
+            except OSError as e:
+                report(op, str(e))
+                return
+            if digest is None:
+                report(op)
+            else:
+                verifying.append(verify_pool.submit(check, op, digest))
+
+        try:
+            # Fast path first: same-device renames are metadata only
+            for op in todo:
+                if op["rename"]:
+                    step(op)
+            if self.checksum == "verify":
+                verify_pool = ThreadPoolExecutor(max_workers=max(1, self.workers))
+            with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+                futures = [pool.submit(step, op) for op in todo if not op["rename"]]
+                for future in as_completed(futures):
+                    future.result()
+            for future in verifying:
+                future.result()
+        finally:
+            if verify_pool is not None:
+                verify_pool.shutdown()
+            if journal:
+                journal.close()
+            if manifest:
+                manifest.close()
+        self.stats["elapsed"] = time.monotonic() - self.stats["started"]
+        return self.stats
@@ -0,0 +1,218 @@
+import os
+from array import array
+
+from core.devices import normalize_roots, plan_roots
+from core.filters import ScanFilter
+from core.results import ResultStore
+from core.scanner import DEFAULT_WORKERS, iter_scan, scan_root_folders, tag_duplicates
+from util.constants import VIEWS
+
+# Scan -> tag -> filter pipeline shared by IdentifyTab and the CLI.
+# Must not import tkinter: the CLI runs on headless hosts.
+
+
+def build_scan_metadata(folder_path, extensions=None, max_depth=0, filename_filter=None,
+                        duplicate_mode="name", folders_only=False, filters=None, enrich=False,
+                        similarity=None, extra_roots=None, usage=False):
+    """
+    Scan parameters as stored with results and written into exports.
+    extra_roots are more folders scanned together with folder_path into one
+    duplicate analysis. The folders actually scanned (without any inside
+    another one, see core.devices.normalize_roots) are stored as "roots"
+    whenever they are not just folder_path.
+    filters holds the extra ScanFilter rules (include, exclude, min_size,
+    max_size, newer_than, older_than, prune); empty values are dropped.
+    enrich adds size, times, inode and media info (core.enricher).
+    similarity holds options of the "similar" mode (threshold, method).
+    usage (with folders_only) measures folder sizes (core.usage); max_depth
+    is then how deep folders are listed in the results.
+    """
+    if folders_only:
+        scan_metadata = {
+            "folder_path": folder_path,
+            "scan_type": "FOLDERS_ONLY",
+            "file_extensions": [],
+            "filename_filter": None,
+            "depth": max_depth if usage else 0
+        }
+        if usage:
+            scan_metadata["usage"] = True
+            filters = {k: v for k, v in (filters or {}).items() if k == "prune" and v}
+            if filters:
+                scan_metadata["filters"] = filters
+        return scan_metadata
+    scan_metadata = {
+        "folder_path": folder_path,
+        "scan_type": "FILES",
+        "file_extensions": list(extensions) if extensions else ["ALL"],
+        "filename_filter": filename_filter,
+        "depth": max_depth,
+        "duplicate_mode": duplicate_mode
+    }
+    filters = {k: v for k, v in (filters or {}).items() if v not in (None, "", [], ())}
+    if filters:
+        scan_metadata["filters"] = filters
+    if enrich:
+        scan_metadata["enrich"] = True
+    if duplicate_mode == "similar" and similarity:
+        scan_metadata["similarity"] = dict(similarity)
+    roots = normalize_roots([folder_path] + list(extra_roots or ()))
+    if roots != [folder_path]:
+        scan_metadata["roots"] = roots
+    return scan_metadata
+
+
+def scan_roots(scan_metadata):
+    """Folders a scan covers: "roots" of a multi-root scan, else folder_path."""
+    return scan_metadata.get("roots") or [scan_metadata["folder_path"]]
+
+
+def scan_folders(folder_path):
+    """FOLDERS_ONLY scan: top-level folders of folder_path as a ResultStore."""
+    results = ResultStore()
+    for folder in scan_root_folders(folder_path):
+        results.append({
+            "name": folder,
+            "ext": "FOLDER",
+            "path": os.path.join(folder_path, folder),
+            "is_duplicate": False,
+            "duplicate_count": 0
+        })
+    return results
+
+
+def run_usage(scan_metadata, workers=None, debug_cb=None, cancel_event=None):
+    """
+    Folder size scan (scan_metadata from build_scan_metadata(usage=True)).
+    Returns (UsageReport, ResultStore of its records, see UsageReport.to_records).
+    """
+    from core.usage import scan_usage
+
+    log = debug_cb or (lambda msg: None)
+    log("📊 Measuring folder sizes...")
+    report = scan_usage(scan_metadata["folder_path"], workers=workers,
+                        scan_filter=ScanFilter.from_metadata(scan_metadata),
+                        debug_cb=debug_cb, cancel_event=cancel_event)
+    log(f"📊 {report.summary()}")
+    if report.errors:
+        log(f"⚠️ {report.errors} folders could not be read.")
+    return report, ResultStore(report.to_records(scan_metadata["depth"]))
+
+
+def run_scan(scan_metadata, results=None, use_index=False, restore=False, workers=None,
+             debug_cb=None, batch_cb=None, cancel_event=None):
+    """
+    Run the scan described by scan_metadata (see build_scan_metadata) and
+    tag duplicates. Returns the tagged ResultStore.
+
+    Without use_index, records are appended to results (a fresh ResultStore
+    by default) while the walk runs and batch_cb(n) is called after every
+    batch. With use_index, the persistent scan index is refreshed and
+    queried instead. restore only reads the index: no refresh, no
+    enrichment and name tagging whatever duplicate_mode says, so nothing
+    is stat'ed, hashed or decoded.
+    """
+    base_path = scan_metadata["folder_path"]
+    if scan_metadata["scan_type"] == "FOLDERS_ONLY":
+        if scan_metadata.get("usage"):
+            return run_usage(scan_metadata, workers, debug_cb, cancel_event)[1]
+        return scan_folders(base_path)
+    roots = scan_roots(scan_metadata)
+
+    extensions = [e for e in scan_metadata["file_extensions"] if e != "ALL"]
+    depth = scan_metadata["depth"]
+    filename_filter = scan_metadata["filename_filter"]
+    duplicate_mode = scan_metadata.get("duplicate_mode", "name")
+    scan_filter = ScanFilter.from_metadata(scan_metadata)
+    log = debug_cb or (lambda msg: None)
+
+    plan = plan_roots(roots, workers or DEFAULT_WORKERS)
+    if len(roots) > 1:
+        for label, kind, paths, budget in plan:
+            log(f"💽 {label} ({kind}, {budget} threads): {', '.join(paths)}")
+
+    if use_index:
+        # Only pulled in when needed, keeps plain CLI scans light
+        from core.index import ScanIndex
+
+        index = ScanIndex()
+        try:
+            # The index is one SQLite file, so devices are refreshed in turn
+            refresh = [] if restore else [(root, budget) for _, _, paths, budget in plan for root in paths]
+            for root, budget in refresh:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                stats = index.refresh(root, depth, workers=budget, debug_cb=debug_cb,
+                                      cancel_event=cancel_event)
+                log(f"Index: {stats['listed']} of {stats['checked']} dirs changed, "
+                    f"{stats['removed']} removed.")
+            # Name duplicates are tagged by the query itself (per root, so a
+            # multi-root scan is tagged again below)
+            results = index.query(roots[0], extensions, depth, filename_filter, scan_filter=scan_filter)
+            for root in roots[1:]:
+                results.extend(index.query(root, extensions, depth, filename_filter,
+                                           scan_filter=scan_filter))
+            if not restore and not (cancel_event is not None and cancel_event.is_set()):
+                index.save_last_scan(scan_metadata)
+        finally:
+            index.close()
+        if restore:
+            if len(roots) > 1:
+                tag_duplicates(results, "name")
+            return results
+    else:
+        if results is None:
+            results = ResultStore()
+        for batch in iter_scan(roots, extensions, depth, filename_filter, workers=workers,
+                               cancel_event=cancel_event, scan_filter=scan_filter):
+            results.extend(batch)
+            if batch_cb:
+                batch_cb(len(batch))
+
+    if scan_metadata.get("enrich") and not (cancel_event is not None and cancel_event.is_set()):
+        from core.enricher import enrich_results
+
+        log("📐 Reading file details...")
+        enrich_results(results, workers=workers, debug_cb=debug_cb, cancel_event=cancel_event)
+
+    # Tagging may hash file contents
+    if duplicate_mode == "content":
+        log("🔑 Comparing file contents...")
+        tag_duplicates(results, duplicate_mode, debug_cb=debug_cb, workers=workers)
+    elif duplicate_mode == "similar":
+        log("🖼 Looking for similar images and videos...")
+        tag_duplicates(results, duplicate_mode, debug_cb=debug_cb, workers=workers,
+                       cancel_event=cancel_event, **scan_metadata.get("similarity", {}))
+    elif not use_index or len(roots) > 1:
+        tag_duplicates(results, duplicate_mode)
+    return results
+
+
+def build_views(results):
+    """
+    Row numbers of the duplicate and unique views of tagged results.
+    "all" is None (every row) unless rows were removed in watch mode.
+    """
+    if isinstance(results, ResultStore):
+        all_rows, duplicates, unique = results.view_indices()
+        # Members of a group next to each other (stable: path order inside)
+        duplicates = array("L", sorted(duplicates, key=results.group_col.__getitem__))
+        return {"all": all_rows if results.removed else None, "duplicates": duplicates, "unique": unique}
+    duplicates = array("L")
+    unique = array("L")
+    for i, r in enumerate(results):
+        if r.get("is_duplicate", False):
+            duplicates.append(i)
+        else:
+            unique.append(i)
+    duplicates = array("L", sorted(duplicates, key=lambda i: results[i].get("duplicate_group", 0)))
+    return {"all": None, "duplicates": duplicates, "unique": unique}
+
+
+def filter_results(results, view="all"):
+    """Results restricted to one of VIEWS, as a new ResultStore."""
+    if view not in VIEWS:
+        raise ValueError(f"Unknown view: {view}")
+    if view == "all":
+        return results
+    return ResultStore(results[i] for i in build_views(results)[view])
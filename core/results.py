@@ -0,0 +1,355 @@
+from array import array
+
+# is_duplicate column values; _REMOVED marks a deleted row (tombstone)
+_UNTAGGED, _UNIQUE, _DUPLICATE, _REMOVED = 2, 0, 1, 3
+
+_BASE_KEYS = ("name", "ext", "path", "is_duplicate", "duplicate_count", "duplicate_group")
+
+# Keys of ResultStore.sort_order besides the extra fields (size, mtime, ...);
+# "status" is duplicates by group, then unique, then untagged rows
+SORT_KEYS = ("name", "path", "ext", "status")
+
+_NO_VALUE = object()
+
+_STATUS_RANK = {_DUPLICATE: 0, _UNIQUE: 1, _UNTAGGED: 2, _REMOVED: 3}
+
+
+def _dense_ranks(n, rows, value_of):
+    """
+    Ranks of rows listed in value order (equal values share one), as an
+    array over all n rows; rows not listed rank after every other.
+    """
+    ranks = array("L", [n + 1]) * n
+    rank = 0
+    previous = _NO_VALUE
+    for i in rows:
+        value = value_of(i)
+        if value != previous:
+            rank += 1
+            previous = value
+        ranks[i] = rank
+    return ranks
+
+
+class ResultRecord:
+    """
+    Lightweight view of one row of a ResultStore.
+    Behaves like the old result dicts: record["path"], record.get("is_duplicate"),
+    "is_duplicate" in record and record["duplicate_count"] = 3 all work.
+    """
+    __slots__ = ("store", "index")
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def __getitem__(self, key):
+        value = self.store.get_field(self.index, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = self.store.get_field(self.index, key)
+        return default if value is None else value
+
+    def __setitem__(self, key, value):
+        self.store.set_field(self.index, key, value)
+
+    def __contains__(self, key):
+        return self.store.get_field(self.index, key) is not None
+
+    def keys(self):
+        return [k for k in self.store.field_names() if k in self]
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def to_dict(self):
+        return {k: self[k] for k in self.keys()}
+
+    def __repr__(self):
+        return f"ResultRecord({self.to_dict()!r})"
+
+
+class ResultStore:
+    """
+    Compact columnar container for scan results.
+
+    Instead of one dict per file it keeps parallel arrays: an interned
+    directory prefix id, the file name, an interned extension code and the
+    duplicate tags. The full path is rebuilt from prefix + name on access,
+    so it is never stored twice. Optional per-file fields (size, mtime, ...)
+    live in sparse extra columns.
+
+    It is a sequence: len(), iteration and store[i] yield ResultRecord views
+    that read and write like the old result dicts.
+
+    Rows can be removed (watch mode); they stay in place as tombstones so
+    row numbers remain stable. len() still counts them, iteration skips
+    them, and live_count() is the number of real results. compact() drops
+    them once they pile up.
+
+    Sorted orders (sort_order) are built from compact per-column key
+    arrays and cached until the next change, for the views and exports.
+    """
+
+    def __init__(self, records=None):
+        self.prefixes = []
+        self.prefix_ids = {}
+        self.exts = []
+        self.ext_ids = {}
+
+        self.prefix_col = array("I")
+        self.names = []
+        self.ext_col = array("I")
+        self.dup_col = bytearray()
+        self.count_col = array("I")
+        self.group_col = array("I")
+        self.extra = {}
+        self.removed = 0
+        self.compactions = 0  # compact() calls, row numbers change with each
+
+        # Sort keys and orders (see sort_order), valid while the store has
+        # the same length and edit count
+        self.changes = 0
+        self.sort_stamp = None
+        self.sort_keys_cache = {}
+        self.sort_orders = {}
+
+        if records is not None:
+            self.extend(records)
+
+    # ---------------- Sequence API ---------------- #
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [ResultRecord(self, j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("result index out of range")
+        return ResultRecord(self, i)
+
+    def __iter__(self):
+        dup_col = self.dup_col
+        for i in range(len(self)):
+            if dup_col[i] != _REMOVED:
+                yield ResultRecord(self, i)
+
+    def __bool__(self):
+        return bool(self.names)
+
+    # ---------------- Building ---------------- #
+
+    def _intern(self, table, ids, value):
+        code = ids.get(value)
+        if code is None:
+            code = ids[value] = len(table)
+            table.append(value)
+        return code
+
+    def append(self, record):
+        """Add one result; accepts the dicts produced by the scanner."""
+        name = record["name"]
+        path = record["path"]
+        if not name or not path.endswith(name):
+            raise ValueError(f"Path {path!r} does not end with name {name!r}")
+        i = len(self.names)
+
+        self.prefix_col.append(self._intern(self.prefixes, self.prefix_ids, path[:len(path) - len(name)]))
+        self.ext_col.append(self._intern(self.exts, self.ext_ids, record["ext"]))
+        is_duplicate = record.get("is_duplicate")
+        self.dup_col.append(_UNTAGGED if is_duplicate is None else int(bool(is_duplicate)))
+        self.count_col.append(record.get("duplicate_count", 0))
+        self.group_col.append(record.get("duplicate_group", 0))
+        for key, value in record.items():
+            if key not in _BASE_KEYS:
+                self.set_field(i, key, value, size=i + 1)
+
+        # names goes last: len() only grows once the whole row is in place,
+        # so another thread may read rows < len(store) while this one appends
+        self.names.append(name)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def clear(self):
+        self.__init__()
+
+    def remove(self, i):
+        """Turn row i into a tombstone."""
+        if self.dup_col[i] != _REMOVED:
+            self.dup_col[i] = _REMOVED
+            self.removed += 1
+            self.changes += 1
+
+    def compact(self):
+        """
+        Drop the tombstones. Row numbers of the remaining rows change, so
+        anything holding them (views, name indexes) has to be rebuilt.
+        Returns the old row number of every row, in the new order.
+        """
+        dup_col = self.dup_col
+        keep = array("L", (i for i in range(len(self.names)) if dup_col[i] != _REMOVED))
+        self.prefix_col = array(self.prefix_col.typecode, (self.prefix_col[i] for i in keep))
+        self.ext_col = array(self.ext_col.typecode, (self.ext_col[i] for i in keep))
+        self.dup_col = bytearray(dup_col[i] for i in keep)
+        self.count_col = array("I", (self.count_col[i] for i in keep))
+        self.group_col = array("I", (self.group_col[i] for i in keep))
+        self.extra = {key: [column[i] if i < len(column) else None for i in keep]
+                      for key, column in self.extra.items()}
+        self.names = [self.names[i] for i in keep]
+        self.removed = 0
+        self.compactions += 1
+        self.changes += 1
+        return keep
+
+    def is_removed(self, i):
+        return self.dup_col[i] == _REMOVED
+
+    def live_count(self):
+        return len(self) - self.removed
+
+    def view_indices(self):
+        """Row numbers of (all live, duplicate, unique) rows, straight from the flag column."""
+        all_rows, duplicates, unique = array("L"), array("L"), array("L")
+        for i, flag in enumerate(self.dup_col):
+            if flag == _REMOVED:
+                continue
+            all_rows.append(i)
+            if flag == _DUPLICATE:
+                duplicates.append(i)
+            else:
+                unique.append(i)
+        return all_rows, duplicates, unique
+
+    # ---------------- Field access ---------------- #
+
+    def field_names(self):
+        return _BASE_KEYS + tuple(self.extra)
+
+    def path(self, i):
+        return self.prefixes[self.prefix_col[i]] + self.names[i]
+
+    def get_field(self, i, key):
+        """Value of key for row i, None when the row does not have it."""
+        if key == "name":
+            return self.names[i]
+        if key == "path":
+            return self.path(i)
+        if key == "ext":
+            return self.exts[self.ext_col[i]]
+        if key == "is_duplicate":
+            flag = self.dup_col[i]
+            return None if flag >= _UNTAGGED else flag == _DUPLICATE
+        if key == "duplicate_count":
+            return None if self.dup_col[i] >= _UNTAGGED else self.count_col[i]
+        if key == "duplicate_group":
+            return None if self.dup_col[i] >= _UNTAGGED else self.group_col[i]
+        column = self.extra.get(key)
+        if column is None:
+            return None
+        return column[i] if i < len(column) else None
+
+    def set_field(self, i, key, value, size=None):
+        self.changes += 1
+        if key == "is_duplicate":
+            self.dup_col[i] = _DUPLICATE if value else _UNIQUE
+        elif key == "duplicate_count":
+            self.count_col[i] = value
+        elif key == "duplicate_group":
+            self.group_col[i] = value
+        elif key == "ext":
+            self.ext_col[i] = self._intern(self.exts, self.ext_ids, value)
+        elif key in ("name", "path"):
+            raise KeyError(f"{key} is read-only in a ResultStore")
+        else:
+            column = self.extra.setdefault(key, [])
+            if len(column) <= i:
+                column.extend([None] * ((size or len(self.names)) - len(column)))
+            column[i] = value
+
+    # ---------------- Sorting ---------------- #
+
+    def _sort_cache(self):
+        stamp = (len(self.names), self.changes)
+        if stamp != self.sort_stamp:
+            self.sort_stamp = stamp
+            self.sort_keys_cache = {}
+            self.sort_orders = {}
+
+    def sort_keys(self, key):
+        """
+        Sort key of every row for key (see sort_order) as one compact
+        sequence: ranks in an array, or the names list itself. Built once
+        per key until the store changes.
+        """
+        self._sort_cache()
+        keys = self.sort_keys_cache.get(key)
+        if keys is not None:
+            return keys
+        n = len(self.names)
+        if key == "name":
+            keys = self.names
+        elif key == "path":
+            paths = [self.path(i) for i in range(n)]
+            keys = _dense_ranks(n, sorted(range(n), key=paths.__getitem__), paths.__getitem__)
+        elif key == "ext":
+            exts = self.exts
+            table = _dense_ranks(len(exts), sorted(range(len(exts)), key=exts.__getitem__), exts.__getitem__)
+            ext_col = self.ext_col
+            keys = array("L", (table[ext_col[i]] for i in range(n)))
+        elif key == "status":
+            dup_col, group_col = self.dup_col, self.group_col
+            keys = array("Q", (_STATUS_RANK[dup_col[i]] << 32 | group_col[i] for i in range(n)))
+        else:
+            column = self.extra.get(key)
+            if column is None:
+                raise KeyError(f"Unknown sort key: {key}")
+            rows = [i for i in range(min(n, len(column))) if column[i] is not None]
+            rows.sort(key=column.__getitem__)
+            keys = _dense_ranks(n, rows, column.__getitem__)
+        self.sort_keys_cache[key] = keys
+        return keys
+
+    def sort_order(self, key="path", reverse=False):
+        """
+        Row numbers of the live rows sorted by key: one of SORT_KEYS or an
+        extra field (size, mtime...), rows without it last (first when
+        reversed). Ties keep path order. Cached per key and direction
+        until the store changes, so switching orders is a lookup.
+        """
+        self._sort_cache()
+        order = self.sort_orders.get((key, reverse))
+        if order is not None:
+            return order
+        keys = self.sort_keys(key)
+        if key == "path" and not reverse:
+            dup_col = self.dup_col
+            rows = (i for i in range(len(keys)) if dup_col[i] != _REMOVED) if self.removed else range(len(keys))
+        else:
+            rows = self.sort_order("path")
+        order = array("L", sorted(rows, key=keys.__getitem__, reverse=reverse))
+        self.sort_orders[(key, reverse)] = order
+        return order
+
+    def duplicate_order(self, key="name"):
+        """
+        (duplicate rows, other rows) of sort_order(key): duplicates by
+        group, members in key order; unique and untagged rows in key order.
+        """
+        self._sort_cache()
+        split = self.sort_orders.get(("duplicates", key))
+        if split is None:
+            dup_col = self.dup_col
+            order = self.sort_order(key)
+            duplicates = array("L", sorted((i for i in order if dup_col[i] == _DUPLICATE),
+                                           key=self.group_col.__getitem__))
+            others = array("L", (i for i in order if dup_col[i] != _DUPLICATE))
+            split = self.sort_orders[("duplicates", key)] = (duplicates, others)
+        return split
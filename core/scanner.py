@@ -1,31 +1,225 @@
 import os
+import queue
+import threading
+import time
 from collections import defaultdict
+from core.devices import plan_roots
+from core.filters import ScanFilter
+from core.results import ResultStore
+from util import profiler, throttle
 
-def scan_files(base_path, extensions, max_depth, debug_cb=None, filename_filter=None):
-    results = []
-    base_depth = base_path.rstrip(os.sep).count(os.sep)
-
-    for root, dirs, files in os.walk(base_path):
-        depth = root.count(os.sep) - base_depth
-        if depth > max_depth:
-            dirs[:] = []
-            continue
-
-        for file in files:
-            ext = os.path.splitext(file)[1].lower().replace(".", "")
-            if not extensions or ext in extensions:
-                # Apply filename filter if provided
-                if filename_filter and filename_filter.lower() not in file.lower():
+# Directory listing is I/O bound (especially on network shares), so a handful
+# of threads keeps several scandir() calls in flight despite the GIL.
+DEFAULT_WORKERS = min(16, (os.cpu_count() or 1) * 4)
+
+# Streaming scans hand out batches of about this many records, and never
+# hold on to a partial batch longer than BATCH_INTERVAL seconds.
+BATCH_SIZE = 500
+BATCH_INTERVAL = 0.1
+
+# Minimum seconds between two debug_cb progress messages
+PROGRESS_INTERVAL = 0.5
+
+_DONE = object()
+
+
+def _ext_of(name):
+    """
+    Lowercase extension without the dot, same rules as os.path.splitext
+    (leading dots of hidden files do not start an extension).
+    """
+    i = name.rfind(".")
+    if i <= 0 or not name[:i].lstrip("."):
+        return ""
+    return name[i + 1:].lower()
+
+
+def _scan_dir(path, depth, max_depth, scan_filter):
+    """
+    List one directory with os.scandir, keeping files that pass scan_filter.
+    Returns (records, subdirs) where subdirs are the (path, depth) pairs
+    still inside max_depth and not pruned.
+    """
+    prune = scan_filter.prune_dir if scan_filter.prune else None
+    check = scan_filter.match_entry if scan_filter.needs_stat else None
+    match_name = scan_filter.match_name
+    stats = profiler.active()
+    if stats is not None:
+        started = time.perf_counter()
+    records = []
+    subdirs = []
+    entries = stat_calls = 0
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                entries += 1
+                try:
+                    # d_type from the directory listing, no extra stat() call
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+
+                if is_dir:
+                    # Same as os.walk: symlinked dirs are not followed
+                    if depth < max_depth and not entry.is_symlink():
+                        if prune is None or not prune(entry.name):
+                            subdirs.append((entry.path, depth + 1))
+                    continue
+
+                name = entry.name
+                ext = _ext_of(name)
+                if check is not None:
+                    stat_calls += 1
+                    if not check(entry, ext):
+                        continue
+                elif not match_name(name, ext):
                     continue
-                
-                results.append({
-                    "name": file,
+
+                records.append({
+                    "name": name,
                     "ext": ext if ext else "N/A",
-                    "path": os.path.join(root, file)
+                    "path": entry.path
                 })
+    except OSError:
+        # Unreadable directory, os.walk skips these silently as well
+        pass
+    if stats is not None:
+        stats.record_dir(path, time.perf_counter() - started, entries, stat_calls)
+    return records, subdirs
+
+
+def _parallel_walk(pools, max_depth, scan_filter, cancel_event=None):
+    """
+    Generator yielding one list of records per directory.
+    pools is a list of (root paths, worker count): each gets its own worker
+    threads sharing a directory queue (one pool per device, see
+    core.devices.plan_roots). Each queued item carries its depth so nothing
+    has to be recomputed from the path string.
+    Stops early when cancel_event is set or the generator is closed.
+    An unexpected error in a worker is raised here, in the consumer.
+    """
+    out_queue = queue.Queue()
+    stop = threading.Event()
+    queues = []
+
+    def start_pool(roots, workers):
+        dir_queue = queue.Queue()
+        pending = [len(roots)]
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                item = dir_queue.get()
+                if item is _DONE:
+                    return
+                if stop.is_set():
+                    continue
+                path, depth = item
+                try:
+                    with throttle.io("dir") as op:
+                        records, subdirs = _scan_dir(path, depth, max_depth, scan_filter)
+                        op.units = len(records) + len(subdirs)
+                except Exception as e:
+                    # _scan_dir handles OSError; anything else would leave
+                    # pending above 0 forever, so the consumer raises it
+                    out_queue.put(e)
+                    continue
+                with lock:
+                    pending[0] += len(subdirs) - 1
+                    finished = pending[0] == 0
+                for sub in subdirs:
+                    dir_queue.put(sub)
+                if records:
+                    out_queue.put(records)
+                if finished:
+                    out_queue.put(_DONE)
+
+        workers = max(1, workers)
+        for _ in range(workers):
+            threading.Thread(target=worker, daemon=True).start()
+        queues.append((dir_queue, workers))
+        for root in roots:
+            dir_queue.put((root, 0))
 
-                if debug_cb and len(results) % 10 == 0:
-                    debug_cb(f"Found {len(results)} items...")
+    for roots, workers in pools:
+        start_pool(roots, workers)
+    running = len(queues)
+
+    try:
+        while running:
+            try:
+                batch = out_queue.get(timeout=BATCH_INTERVAL)
+            except queue.Empty:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                yield []
+                continue
+            if batch is _DONE:
+                running -= 1
+                continue
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+            if cancel_event is not None and cancel_event.is_set():
+                break
+    finally:
+        stop.set()
+        for dir_queue, workers in queues:
+            for _ in range(workers):
+                dir_queue.put(_DONE)
+
+
+def iter_scan(base_path, extensions, max_depth, filename_filter=None, workers=None,
+              batch_size=BATCH_SIZE, cancel_event=None, scan_filter=None):
+    """
+    Streaming variant of scan_files.
+    Yields lists of {"name", "ext", "path"} records as directories are listed,
+    so callers can show results before the walk finishes. Setting
+    cancel_event (a threading.Event) stops the walk after the current batch.
+    A ScanFilter (core.filters) replaces extensions and filename_filter.
+    base_path may be a list of folders: they are walked together, one
+    thread pool per device (see core.devices.plan_roots), with workers as
+    the per-device maximum.
+    """
+    if scan_filter is None:
+        scan_filter = ScanFilter(extensions, filename_filter)
+    roots = [base_path] if isinstance(base_path, str) else base_path
+    pools = [(paths, budget) for _, _, paths, budget in plan_roots(roots, workers or DEFAULT_WORKERS)]
+
+    batch = []
+    last_flush = time.monotonic()
+    with profiler.phase("scan"):
+        for records in _parallel_walk(pools, max_depth, scan_filter, cancel_event):
+            batch.extend(records)
+            now = time.monotonic()
+            if batch and (len(batch) >= batch_size or now - last_flush >= BATCH_INTERVAL):
+                yield batch
+                batch = []
+                last_flush = now
+        if batch:
+            yield batch
+
+
+def scan_files(base_path, extensions, max_depth, debug_cb=None, filename_filter=None, workers=None,
+               scan_filter=None):
+    """
+    Scan base_path for files up to max_depth levels deep.
+    Returns a ResultStore of {"name", "ext", "path"} records.
+    scan_filter (a core.filters.ScanFilter) adds include/exclude, size/time
+    and folder prune rules; it replaces extensions and filename_filter.
+    Directory listing runs on a pool of worker threads (see DEFAULT_WORKERS);
+    debug_cb is only ever called from the calling thread, at most once
+    every PROGRESS_INTERVAL seconds.
+    """
+    results = ResultStore()
+    last_report = time.monotonic()
+
+    for batch in iter_scan(base_path, extensions, max_depth, filename_filter, workers,
+                           scan_filter=scan_filter):
+        results.extend(batch)
+        if debug_cb and time.monotonic() - last_report >= PROGRESS_INTERVAL:
+            last_report = time.monotonic()
+            debug_cb(f"Found {len(results)} items...")
 
     return results
 
@@ -47,24 +241,54 @@ def detect_duplicates(results):
     duplicates = defaultdict(list)
     for item in results:
         duplicates[item["name"]].append(item["path"])
-    
+
     # Filter to only keep actual duplicates
     return {k: v for k, v in duplicates.items() if len(v) > 1}
 
 
-def tag_duplicates(results):
+@profiler.instrumented("tag")
+def tag_duplicates(results, mode="name", debug_cb=None, **content_options):
     """
     Tag results with duplicate information.
-    Adds 'is_duplicate' and 'duplicate_count' fields to each result.
+    Adds 'is_duplicate', 'duplicate_count' and 'duplicate_group' fields to
+    each result. duplicate_group is a 1-based id shared by every member of
+    a group, 0 for unique files.
+
+    mode "name" groups by filename, mode "content" by file content (see
+    core.hasher.detect_content_duplicates, which takes content_options),
+    mode "similar" by perceptual hash of images and videos (see
+    core.similarity.detect_similar, same).
     """
-    duplicates = detect_duplicates(results)
-    
+    # The hash engines are only imported once a scan asks for them
+    if mode == "content":
+        from core.hasher import detect_content_duplicates
+
+        groups = detect_content_duplicates(results, debug_cb=debug_cb, **content_options)
+    elif mode == "similar":
+        from core.similarity import detect_similar
+
+        groups = detect_similar(results, debug_cb=debug_cb, **content_options)
+    elif mode == "name":
+        groups = detect_duplicates(results)
+    else:
+        raise ValueError(f"Unknown duplicate mode: {mode}")
+
+    # Name groups are numbered by name, so reports listing duplicates by
+    # group list them by name; other groups by their first path
+    ordered = [groups[name] for name in sorted(groups)] if mode == "name" else sorted(groups.values())
+    group_of = {}
+    for group_id, members in enumerate(ordered, start=1):
+        for member in members:
+            group_of[member] = (group_id, len(members))
+
     for item in results:
-        if item["name"] in duplicates:
+        group = group_of.get(item["path"])
+        if group:
             item["is_duplicate"] = True
-            item["duplicate_count"] = len(duplicates[item["name"]])
+            item["duplicate_group"], item["duplicate_count"] = group
         else:
             item["is_duplicate"] = False
+            item["duplicate_group"] = 0
             item["duplicate_count"] = 0
-    
+
     return results
@@ -0,0 +1,257 @@
+import fnmatch
+import re
+import threading
+from array import array
+from bisect import bisect_left
+
+# In-memory search over the names and paths of a ResultStore.
+#
+# Names are indexed by trigram (postings are row numbers, ascending since
+# rows are only appended). Directories are indexed once per interned
+# prefix, not once per file, so path matching costs about as much as the
+# number of distinct folders. A substring query only reads the shortest
+# posting list of its trigrams and checks those names.
+
+# Hits ranked by match quality; above this, hits stay in row order
+RANK_LIMIT = 100_000
+
+# Minimum share of the query's trigrams a fuzzy match must contain (one
+# typo in a short word already costs up to three of them)
+FUZZY_MIN = 0.4
+
+GLOB_CHARS = "*?["
+
+# Characters before a match that make it a word start ("the_cat", "a.cat")
+_WORD_BREAKS = " ._-([/"
+
+
+def _trigrams(text):
+    return {text[k:k + 3] for k in range(len(text) - 2)}
+
+
+def _norm_path(path):
+    return path.lower().replace("\\", "/")
+
+
+def _name_tier(name, q):
+    """Rank of a name containing q: exact, prefix, word start, anywhere."""
+    if name == q:
+        return 0
+    pos = name.find(q)
+    if pos == 0:
+        return 1
+    if name[pos - 1] in _WORD_BREAKS:
+        return 2
+    return 3
+
+
+class NameIndex:
+    """
+    Trigram index over the names and folders of a ResultStore.
+
+    update() indexes rows appended since the last call, so it can follow a
+    running scan or watch mode; removed rows are skipped at query time.
+    search() works while an update runs on another thread: rows not yet
+    indexed are matched one by one. Compacting the store renumbers its
+    rows, so the index then has to be rebuilt (see is_current).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.compactions = store.compactions
+        self.lock = threading.Lock()
+        self.lower = []          # row -> lowercase name
+        self.grams = {}          # trigram -> rows
+        self.prefix_lower = []   # prefix id -> lowercase folder path ("/" separated)
+        self.prefix_grams = {}   # trigram -> prefix ids
+        self.prefix_rows = {}    # prefix id -> rows
+        self.indexed = 0         # rows below this are in the index
+
+    def is_current(self, store):
+        """True while this index still describes store's row numbers."""
+        return self.store is store and self.compactions == store.compactions
+
+    def update(self):
+        """Index new rows; returns how many were added."""
+        with self.lock:
+            store = self.store
+            end = len(store)
+            # Prefixes before rows: every indexed row's folder is indexed
+            prefixes = store.prefixes
+            for pid in range(len(self.prefix_lower), len(prefixes)):
+                folder = _norm_path(prefixes[pid])
+                for t in _trigrams(folder):
+                    self.prefix_grams.setdefault(t, array("I")).append(pid)
+                self.prefix_lower.append(folder)
+
+            names, prefix_col = store.names, store.prefix_col
+            lower, grams, prefix_rows = self.lower, self.grams, self.prefix_rows
+            start = self.indexed
+            for i in range(start, end):
+                name = names[i].lower()
+                lower.append(name)
+                for t in _trigrams(name):
+                    posting = grams.get(t)
+                    if posting is None:
+                        posting = grams[t] = array("I")
+                    posting.append(i)
+                pid = prefix_col[i]
+                rows = prefix_rows.get(pid)
+                if rows is None:
+                    rows = prefix_rows[pid] = array("I")
+                rows.append(i)
+            # Set last: search() takes it as the indexed/unindexed boundary
+            self.indexed = end
+            return end - start
+
+    # ---------------- Candidates ---------------- #
+
+    @staticmethod
+    def _shortest(table, grams, below):
+        """Shortest posting of grams (cut at below), None if a gram is missing."""
+        best = None
+        for t in grams:
+            posting = table.get(t)
+            if posting is None:
+                return ()
+            if best is None or len(posting) < len(best):
+                best = posting
+        if best is None:
+            return None
+        return best[:bisect_left(best, below)]
+
+    def _names_containing(self, q, n):
+        lower = self.lower
+        candidates = self._shortest(self.grams, _trigrams(q), n)
+        if candidates is None:
+            candidates = range(n)
+        return [i for i in candidates if q in lower[i]]
+
+    def _prefixes_containing(self, q, n_prefixes, suffix=False):
+        folders = self.prefix_lower
+        candidates = self._shortest(self.prefix_grams, _trigrams(q), n_prefixes)
+        if candidates is None:
+            candidates = range(n_prefixes)
+        if suffix:
+            return [p for p in candidates if folders[p].endswith(q)]
+        return [p for p in candidates if q in folders[p]]
+
+    def _rows_of(self, pids, n):
+        rows = []
+        for pid in pids:
+            posting = self.prefix_rows.get(pid, ())
+            rows.extend(posting[:bisect_left(posting, n)])
+        return rows
+
+    # ---------------- Queries ---------------- #
+
+    def search(self, query, fuzzy=False):
+        """
+        Rows matching query, best first. A query with * ? [ is a glob on the
+        name (on the path if it contains "/"); otherwise it is a substring
+        of the name or path, or with fuzzy a trigram-similar name.
+        Returns None for an empty query (no filtering).
+        """
+        q = query.strip().lower().replace("\\", "/")
+        if not q:
+            return None
+        n = self.indexed
+        n_prefixes = len(self.prefix_lower)
+        if any(c in q for c in GLOB_CHARS):
+            scored = self._glob(q, n)
+        elif fuzzy and len(q) >= 3:
+            scored = self._fuzzy(q, n)
+        else:
+            scored = self._substring(q, n, n_prefixes)
+        scored.extend(self._unindexed(q, n, fuzzy))
+
+        store = self.store
+        scored = [hit for hit in scored if not store.is_removed(hit[-1])]
+        if len(scored) <= RANK_LIMIT:
+            scored.sort()
+        else:
+            scored.sort(key=lambda hit: hit[-1])
+        return array("L", (hit[-1] for hit in scored))
+
+    def _substring(self, q, n, n_prefixes):
+        """(tier, name length, row) hits; tier 4 is a match in the folder only."""
+        lower = self.lower
+        hits = {i: _name_tier(lower[i], q) for i in self._names_containing(q, n)}
+        for i in self._rows_of(self._prefixes_containing(q, n_prefixes), n):
+            hits.setdefault(i, 4)
+        cut = q.rfind("/")
+        if cut >= 0:
+            # "folder/na": folder ends with the head, name starts with the tail
+            head, tail = q[:cut + 1], q[cut + 1:]
+            if tail:
+                pids = self._prefixes_containing(head, n_prefixes, suffix=True)
+                for i in self._rows_of(pids, n):
+                    if lower[i].startswith(tail):
+                        hits.setdefault(i, 4)
+        return [(tier, len(lower[i]), i) for i, tier in hits.items()]
+
+    def _glob(self, q, n):
+        lower = self.lower
+        on_path = "/" in q
+        match = re.compile(fnmatch.translate(q)).match
+        # Literal runs of the name part narrow the candidates (in a path
+        # glob, only without "*": that may match across folders)
+        name_part = q.rsplit("/", 1)[-1]
+        grams = set()
+        if not (on_path and "*" in name_part):
+            for part in re.split(r"[*?]|\[[^\]]*\]?", name_part):
+                grams |= _trigrams(part)
+        candidates = self._shortest(self.grams, grams, n)
+        if candidates is None:
+            candidates = range(n)
+        if on_path:
+            path = self.store.path
+            return [(len(lower[i]), i) for i in candidates if match(_norm_path(path(i)))]
+        return [(len(lower[i]), i) for i in candidates if match(lower[i])]
+
+    def _fuzzy(self, q, n):
+        """(-score, name length, row) hits sharing at least FUZZY_MIN of q's trigrams."""
+        lower, grams = self.lower, self.grams
+        wanted = _trigrams(q)
+        need = max(1, round(len(wanted) * FUZZY_MIN))
+        postings = sorted((grams.get(t, ()) for t in wanted), key=len)
+        # A name with `need` of the trigrams is in one of the other
+        # len - need + 1 shortest postings (pigeonhole)
+        candidates = set()
+        for posting in postings[:len(postings) - need + 1]:
+            candidates.update(posting[:bisect_left(posting, n)])
+        hits = []
+        for i in candidates:
+            shared = len(wanted & _trigrams(lower[i]))
+            if shared >= need:
+                hits.append((-shared / len(wanted), len(lower[i]), i))
+        return hits
+
+    def _unindexed(self, q, n, fuzzy):
+        """Hits among rows appended after the last update(), checked one by one."""
+        store = self.store
+        end = len(store)
+        if end <= n:
+            return []
+        hits = []
+        if any(c in q for c in GLOB_CHARS):
+            match = re.compile(fnmatch.translate(q)).match
+            on_path = "/" in q
+            for i in range(n, end):
+                name = store.names[i].lower()
+                if match(_norm_path(store.path(i)) if on_path else name):
+                    hits.append((len(name), i))
+            return hits
+        wanted = _trigrams(q)
+        need = max(1, round(len(wanted) * FUZZY_MIN))
+        for i in range(n, end):
+            name = store.names[i].lower()
+            if fuzzy and wanted:
+                shared = len(wanted & _trigrams(name))
+                if shared >= need:
+                    hits.append((-shared / len(wanted), len(name), i))
+            elif q in name:
+                hits.append((_name_tier(name, q), len(name), i))
+            elif q in _norm_path(store.path(i)):
+                hits.append((4, len(name), i))
+        return hits
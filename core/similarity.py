@@ -0,0 +1,346 @@
+import itertools
+import math
+import os
+import shutil
+import sqlite3
+import subprocess
+import threading
+
+from core.enricher import DEFAULT_META_CACHE_PATH, map_chunks, probe_media
+from core.hasher import _stat_key
+from util import profiler
+from util.constants import HASH_METHODS
+
+# Near-duplicate detection for images and videos.
+#
+# Every file gets a fingerprint: a tuple of 64-bit perceptual hashes (one
+# for an image, one per sampled frame for a video). Two files are similar
+# when each pair of hashes differs in at most `threshold` bits. Candidates
+# come from a multi-index hamming table, so the search is not pairwise.
+#
+# Image decoding needs Pillow, video frames need the ffmpeg executable;
+# both are optional and only required for this mode.
+
+IMAGE_EXTS = frozenset(("jpg", "jpeg", "png", "gif", "bmp", "webp", "tif", "tiff"))
+VIDEO_EXTS = frozenset(("mp4", "m4v", "mov", "mkv", "webm", "avi"))
+
+# Default maximum hamming distance (of 64 bits) between similar files
+SIMILARITY_THRESHOLD = 4
+
+# Positions (share of the duration) of the frames hashed for a video
+VIDEO_FRAMES = (0.1, 0.5, 0.9)
+
+# Files per process pool task; decoding dominates, so chunks stay small
+CHUNK_SIZE = 64
+
+DEFAULT_SIMILARITY_WORKERS = os.cpu_count() or 1
+
+FFMPEG_TIMEOUT = 30
+
+
+class SimilarityError(Exception):
+    pass
+
+
+def have_pillow():
+    try:
+        import PIL.Image  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def have_ffmpeg():
+    return shutil.which("ffmpeg") is not None
+
+
+# ---------------- Hashes ---------------- #
+
+def dhash_bits(pixels, width=9, height=8):
+    """64-bit difference hash of a width x height grayscale buffer."""
+    value = 0
+    for y in range(height):
+        row = pixels[y * width:(y + 1) * width]
+        for x in range(width - 1):
+            value = (value << 1) | (row[x] < row[x + 1])
+    return value
+
+
+_DCT_SIZE = 32
+_DCT = [[math.cos((2 * x + 1) * u * math.pi / (2 * _DCT_SIZE)) for x in range(_DCT_SIZE)]
+        for u in range(8)]
+
+
+def phash_bits(pixels):
+    """
+    64-bit DCT hash of a 32x32 grayscale buffer: the 8x8 lowest frequencies
+    compared with their median. Only the needed coefficients are computed.
+    """
+    n = _DCT_SIZE
+    rows = []
+    for y in range(n):
+        row = pixels[y * n:(y + 1) * n]
+        rows.append([sum(c * p for c, p in zip(cos_u, row)) for cos_u in _DCT])
+    coefficients = []
+    for cos_v in _DCT:
+        for u in range(8):
+            coefficients.append(sum(cos_v[y] * rows[y][u] for y in range(n)))
+    median = sorted(coefficients)[32]
+    value = 0
+    for c in coefficients:
+        value = (value << 1) | (c > median)
+    return value
+
+
+def _hash_size(method):
+    return (9, 8) if method == "dhash" else (_DCT_SIZE, _DCT_SIZE)
+
+
+def _hash_pixels(pixels, method):
+    return dhash_bits(pixels) if method == "dhash" else phash_bits(pixels)
+
+
+def image_fingerprint(path, method="dhash"):
+    from PIL import Image
+
+    size = _hash_size(method)
+    with Image.open(path) as img:
+        # JPEG: let the decoder downscale by up to 8x, far less work
+        img.draft("L", (size[0] * 4, size[1] * 4))
+        pixels = img.convert("L").resize(size, Image.BILINEAR).tobytes()
+    return (_hash_pixels(pixels, method),)
+
+
+def video_fingerprint(path, ext, method="dhash"):
+    """One hash per VIDEO_FRAMES position, frames grabbed by ffmpeg."""
+    duration = probe_media(path, ext).get("duration")
+    if not duration:
+        return None
+    width, height = _hash_size(method)
+    hashes = []
+    for share in VIDEO_FRAMES:
+        cmd = ["ffmpeg", "-v", "error", "-ss", f"{duration * share:.3f}", "-i", path,
+               "-frames:v", "1", "-vf", f"scale={width}:{height},format=gray",
+               "-f", "rawvideo", "-"]
+        out = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                             timeout=FFMPEG_TIMEOUT).stdout
+        if len(out) < width * height:
+            return None
+        hashes.append(_hash_pixels(out[:width * height], method))
+    return tuple(hashes)
+
+
+def _fingerprint_chunk(chunk):
+    """Worker process task: [(path, ext, method)] -> [fingerprint or None]."""
+    out = []
+    for path, ext, method in chunk:
+        try:
+            if ext in IMAGE_EXTS:
+                out.append(image_fingerprint(path, method))
+            else:
+                out.append(video_fingerprint(path, ext, method))
+        except Exception:
+            out.append(None)  # unreadable or unsupported file
+    return out
+
+
+# ---------------- Index ---------------- #
+
+class HammingIndex:
+    """
+    Multi-index hashing for 64-bit keys.
+
+    Keys are split into `chunks` bit ranges, each with its own table. If two
+    keys differ in at most t bits, then by pigeonhole some chunk differs in
+    at most t // chunks bits, so probing every chunk table with all values
+    within that radius finds every candidate. Candidates are then checked
+    with the full distance.
+    """
+
+    def __init__(self, threshold, bits=64, chunks=3):
+        self.threshold = threshold
+        self.radius = threshold // chunks
+        step = -(-bits // chunks)
+        self.ranges = [(start, min(step, bits - start)) for start in range(0, bits, step)]
+        self.tables = [{} for _ in self.ranges]
+        # Bit flips of every chunk value within radius, computed once
+        self.flips = []
+        for _, width in self.ranges:
+            masks = [0]
+            for r in range(1, self.radius + 1):
+                for combo in itertools.combinations(range(width), r):
+                    masks.append(sum(1 << b for b in combo))
+            self.flips.append(masks)
+
+    def _parts(self, key):
+        return [(key >> start) & ((1 << width) - 1) for start, width in self.ranges]
+
+    def add(self, key, value):
+        for table, part in zip(self.tables, self._parts(key)):
+            table.setdefault(part, []).append((key, value))
+
+    def query(self, key):
+        """Values of all added keys within threshold of key."""
+        found = {}
+        threshold = self.threshold
+        for table, part, masks in zip(self.tables, self._parts(key), self.flips):
+            for mask in masks:
+                for other, value in table.get(part ^ mask, ()):
+                    if (other ^ key).bit_count() <= threshold:
+                        found[value] = True
+        return list(found)
+
+
+def find_similar_groups(fingerprints, threshold=SIMILARITY_THRESHOLD):
+    """
+    fingerprints: {id: tuple of hashes}. Returns lists of ids whose
+    fingerprints are similar, transitively (union-find over matches).
+    Only fingerprints with the same number of hashes are compared.
+    """
+    parent = {}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    by_length = {}
+    for item_id, fp in fingerprints.items():
+        by_length.setdefault(len(fp), []).append(item_id)
+
+    for length, ids in by_length.items():
+        index = HammingIndex(threshold)
+        middle = length // 2
+        for item_id in ids:
+            parent[item_id] = item_id
+            fp = fingerprints[item_id]
+            # Query before adding: every pair is seen once
+            for other in index.query(fp[middle]):
+                ofp = fingerprints[other]
+                if all((a ^ b).bit_count() <= threshold for a, b in zip(fp, ofp)):
+                    ra, rb = find(item_id), find(other)
+                    if ra != rb:
+                        parent[ra] = rb
+            index.add(fp[middle], item_id)
+
+    groups = {}
+    for item_id in parent:
+        groups.setdefault(find(item_id), []).append(item_id)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+# ---------------- Cache ---------------- #
+
+class FingerprintCache:
+    """Perceptual fingerprints keyed by (path, mtime, size, method)."""
+
+    def __init__(self, db_path=DEFAULT_META_CACHE_PATH):
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            " path TEXT, method TEXT, mtime INTEGER, size INTEGER, hashes TEXT,"
+            " PRIMARY KEY (path, method))"
+        )
+        self.conn.commit()
+
+    def get(self, path, method, mtime, size):
+        """Cached fingerprint; () for a file known to be unreadable; None if unknown."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT hashes FROM fingerprints WHERE path = ? AND method = ? AND mtime = ? AND size = ?",
+                (path, method, mtime, size)
+            ).fetchone()
+        if row is None:
+            return None
+        return tuple(int(h, 16) for h in row[0].split()) if row[0] else ()
+
+    def put_many(self, rows):
+        """rows: (path, method, mtime, size, fingerprint or None)."""
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO fingerprints (path, method, mtime, size, hashes) VALUES (?, ?, ?, ?, ?)",
+                [(path, method, mtime, size, " ".join(f"{h:016x}" for h in fp or ()))
+                 for path, method, mtime, size, fp in rows]
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+# ---------------- Detection ---------------- #
+
+@profiler.instrumented("similar")
+def detect_similar(results, workers=None, threshold=SIMILARITY_THRESHOLD, method="dhash",
+                   cache=None, debug_cb=None, cancel_event=None):
+    """
+    Detect near-duplicate images and videos in results.
+    Returns dict "similar:<n>" -> list of paths, like the other detectors.
+    Files of other types are ignored; images are skipped (with a message)
+    when Pillow is missing, videos when ffmpeg is.
+    """
+    if method not in HASH_METHODS:
+        raise ValueError(f"Unknown hash method: {method}")
+    workers = workers or DEFAULT_SIMILARITY_WORKERS
+    log = debug_cb or (lambda msg: None)
+
+    exts = set()
+    if have_pillow():
+        exts |= IMAGE_EXTS
+    else:
+        log("Similarity: Pillow is not installed, images are skipped.")
+    if have_ffmpeg():
+        exts |= VIDEO_EXTS
+    else:
+        log("Similarity: ffmpeg not found, videos are skipped.")
+    if not exts:
+        raise SimilarityError("Near-duplicate mode needs Pillow (images) and/or ffmpeg (videos)")
+
+    own_cache = cache is None
+    if own_cache:
+        cache = FingerprintCache()
+    try:
+        fingerprints = {}
+        todo = []
+        for item in results:
+            ext = item["ext"].lower()
+            if ext not in exts:
+                continue
+            path = item["path"]
+            try:
+                size, mtime, _ = _stat_key(path)
+            except OSError:
+                continue
+            fp = cache.get(path, method, mtime, size)
+            if fp is None:
+                todo.append((path, ext, mtime, size))
+            elif fp:
+                fingerprints[path] = fp
+        log(f"Similarity: {len(fingerprints)} fingerprints cached, {len(todo)} files to hash.")
+
+        chunks = [[(path, ext, method) for path, ext, _, _ in todo[n:n + CHUNK_SIZE]]
+                  for n in range(0, len(todo), CHUNK_SIZE)]
+        done = 0
+        for n, (chunk, fps) in enumerate(map_chunks(_fingerprint_chunk, chunks, workers,
+                                                    cancel_event, debug_cb)):
+            meta = todo[n * CHUNK_SIZE:(n + 1) * CHUNK_SIZE]
+            cache.put_many((path, method, mtime, size, fp) for (path, _, mtime, size), fp in zip(meta, fps))
+            for (path, _, _), fp in zip(chunk, fps):
+                if fp:
+                    fingerprints[path] = fp
+            done += len(chunk)
+            if n % 20 == 19:
+                log(f"Similarity: hashed {done} of {len(todo)} files...")
+
+        groups = find_similar_groups(fingerprints, threshold)
+        log(f"Similarity: {len(groups)} groups of similar files.")
+        return {f"similar:{n}": sorted(members) for n, members in enumerate(groups, start=1)}
+    finally:
+        if own_cache:
+            cache.close()
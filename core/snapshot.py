@@ -0,0 +1,339 @@
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from util import profiler
+from util.exporter import SORT_BUFFER_ROWS, ExternalSorter
+
+# Scan snapshots and streaming diffs between them.
+#
+# A snapshot is a text file (gzip-compressed by default): one JSON header
+# line, then one "path<TAB>size<TAB>mtime_ns<TAB>hash" line per file,
+# sorted by path. Paths are relative to the scanned root, so snapshots of
+# a folder and of its copy elsewhere compare as well. Because both sides
+# are sorted, a diff is a single merge-join over two streams; only the
+# unmatched files are spilled to external sorts to pair up moves.
+
+SNAPSHOT_FORMAT = "pyfile-snapshot"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_EXT = "snap.gz"
+
+# Diff kinds, in report order
+CHANGES = ("moved", "changed", "added", "removed")
+
+# Files handed to the hash pool at a time while writing
+HASH_CHUNK_ROWS = 4096
+
+_ESCAPES = {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"}
+_UNESCAPES = {"\\": "\\", "t": "\t", "n": "\n", "r": "\r"}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _escape(path):
+    if "\\" in path or "\t" in path or "\n" in path or "\r" in path:
+        return "".join(_ESCAPES.get(c, c) for c in path)
+    return path
+
+
+def _unescape(text):
+    if "\\" not in text:
+        return text
+    out = []
+    chars = iter(text)
+    for c in chars:
+        out.append(_UNESCAPES.get(next(chars, ""), "") if c == "\\" else c)
+    return "".join(out)
+
+
+def relative_path(path, root):
+    """path relative to root ("/" separated); paths outside root stay absolute."""
+    prefix = root.rstrip("/\\") + os.sep
+    if path.startswith(prefix):
+        path = path[len(prefix):]
+    return path.replace(os.sep, "/") if os.sep != "/" else path
+
+
+# ---------------- Writing ---------------- #
+
+def _chunks(results, size):
+    """(path, size, mtime, inode) of the files in results, in lists of up to size."""
+    chunk = []
+    for item in results:
+        if item["ext"] == "FOLDER" or item.get("size") is None:
+            continue
+        chunk.append((item["path"], item["size"], item["mtime"], item.get("inode")))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+@profiler.instrumented("snapshot")
+def write_snapshot(filepath, root, results, scan_metadata=None, hashes=False, workers=None,
+                   cache=None, compress=True, buffer_rows=SORT_BUFFER_ROWS):
+    """
+    Write results (scan records) as a snapshot of root. Records without
+    size/mtime are stat'ed first (core.enricher, no media probing). With
+    hashes, full content hashes are added (core.hasher.HashCache makes
+    unchanged files free). Sorting is external, memory stays bounded by
+    buffer_rows (about 70 MB peak RSS at the default, for any number of
+    files). Returns the number of files written.
+    """
+    if any(item.get("size") is None for item in results if item["ext"] != "FOLDER"):
+        from core.enricher import enrich_results
+
+        enrich_results(results, media=False)
+
+    pool = None
+    if hashes:
+        from core.hasher import DEFAULT_HASH_WORKERS, HashCache, full_hash
+
+        own_cache = cache is None
+        if own_cache:
+            cache = HashCache()
+        pool = ThreadPoolExecutor(max_workers=workers or DEFAULT_HASH_WORKERS)
+
+        def digest(row):
+            path, size, mtime, inode = row
+            full = cache.get(path, size, mtime, inode)[1]
+            if full is None:
+                try:
+                    full = full_hash(path)
+                except OSError:
+                    return ""
+                cache.put(path, size, mtime, inode, full=full)
+            return full
+
+    sorter = ExternalSorter(buffer_rows=buffer_rows)
+    try:
+        for chunk in _chunks(results, HASH_CHUNK_ROWS):
+            digests = pool.map(digest, chunk, chunksize=64) if pool else [""] * len(chunk)
+            for (path, size, mtime, _), full in zip(chunk, digests):
+                sorter.add((relative_path(path, root), size, mtime, full))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+            if own_cache:
+                cache.close()
+            else:
+                cache.commit()
+
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "root": os.path.abspath(root),
+        "created": time.time(),
+        "hashes": bool(hashes),
+        "count": len(sorter),
+        "scan": scan_metadata or {},
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+    opener = gzip.open if compress else open
+    with opener(filepath, "wt", encoding="utf-8", newline="\n") as f:
+        f.write(json.dumps(header) + "\n")
+        lines = []
+        for rel, size, mtime, digest in sorter:
+            lines.append(f"{_escape(rel)}\t{size}\t{mtime}\t{digest}\n")
+            if len(lines) >= 10_000:
+                f.write("".join(lines))
+                lines = []
+        f.write("".join(lines))
+    return header["count"]
+
+
+# ---------------- Reading ---------------- #
+
+class SnapshotReader:
+    """
+    Streams the rows of a snapshot file as (path, size, mtime, hash), hash
+    "" when absent. header is the parsed header line. Rows out of order
+    (a damaged or hand-edited file) raise SnapshotError.
+
+        with SnapshotReader("a.snap.gz") as snap:
+            for path, size, mtime, digest in snap: ...
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        with open(filepath, "rb") as f:
+            compressed = f.read(2) == b"\x1f\x8b"
+        opener = gzip.open if compressed else open
+        self.file = opener(filepath, "rt", encoding="utf-8", newline="\n")
+        try:
+            self.header = json.loads(self.file.readline())
+        except ValueError:
+            self.header = None
+        if not isinstance(self.header, dict) or self.header.get("format") != SNAPSHOT_FORMAT:
+            self.file.close()
+            raise SnapshotError(f"Not a snapshot file: {filepath}")
+        if self.header.get("version", 0) > SNAPSHOT_VERSION:
+            self.file.close()
+            raise SnapshotError(f"Snapshot version {self.header['version']} is newer than supported")
+
+    def __iter__(self):
+        previous = ""
+        for line in self.file:
+            rel, size, mtime, digest = line.rstrip("\n").split("\t")
+            rel = _unescape(rel)
+            if rel < previous:
+                raise SnapshotError(f"{self.filepath}: rows are not sorted at {rel!r}")
+            previous = rel
+            yield rel, int(size), int(mtime), digest
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# ---------------- Diffing ---------------- #
+
+def _pair_moves(removed, added):
+    """
+    Pair removed and added rows of one move key: same file name first,
+    then in path order. Returns (moves, still removed, still added).
+    """
+    moves = []
+    by_name = {}
+    for row in added:
+        by_name.setdefault(row[1].rsplit("/", 1)[-1], []).append(row)
+    left = []
+    for row in removed:
+        candidates = by_name.get(row[1].rsplit("/", 1)[-1])
+        if candidates:
+            moves.append((row, candidates.pop(0)))
+        else:
+            left.append(row)
+    paired = set(id(new) for _, new in moves)
+    rest = [row for row in added if id(row) not in paired]
+    for old, new in zip(left, rest):
+        moves.append((old, new))
+    n = min(len(left), len(rest))
+    return moves, left[n:], rest[n:]
+
+
+@profiler.instrumented("diff")
+def diff_snapshots(old_file, new_file, buffer_rows=SORT_BUFFER_ROWS):
+    """
+    Compare two snapshot files. Yields change records:
+        {"change", "path", "old_path", "size", "old_size", "mtime"}
+    with "change" one of CHANGES and paths relative to the roots. Files
+    at the same path are "changed" when their hash (if both snapshots
+    have hashes) or size/mtime differ. A removed and an added file with
+    the same size and hash (or size and mtime without hashes) are a move;
+    empty (or unhashable) files are never paired.
+
+    Memory does not depend on the snapshot sizes: the files are merged
+    as streams, unmatched ones go through two external sorts by move key
+    sharing buffer_rows (about 65 MB peak RSS at the default, even when no
+    path matches).
+    Changed files come first, then moves, additions and removals in move
+    key order.
+    """
+    with SnapshotReader(old_file) as old, SnapshotReader(new_file) as new:
+        use_hash = old.header.get("hashes") and new.header.get("hashes")
+
+        def move_key(size, mtime, digest):
+            return (size, digest if use_hash else mtime)
+
+        removed = ExternalSorter(buffer_rows=max(1, buffer_rows // 2))
+        added = ExternalSorter(buffer_rows=max(1, buffer_rows // 2))
+        old_rows, new_rows = iter(old), iter(new)
+        a = next(old_rows, None)
+        b = next(new_rows, None)
+        while a is not None or b is not None:
+            if b is None or (a is not None and a[0] < b[0]):
+                removed.add((move_key(a[1], a[2], a[3]), a[0], a[1], a[2]))
+                a = next(old_rows, None)
+            elif a is None or b[0] < a[0]:
+                added.add((move_key(b[1], b[2], b[3]), b[0], b[1], b[2]))
+                b = next(new_rows, None)
+            else:
+                if use_hash:
+                    differs = a[1] != b[1] or a[3] != b[3]
+                else:
+                    differs = a[1] != b[1] or a[2] != b[2]
+                if differs:
+                    yield {"change": "changed", "path": b[0], "old_path": a[0],
+                           "size": b[1], "old_size": a[1], "mtime": b[2]}
+                a = next(old_rows, None)
+                b = next(new_rows, None)
+
+        # Both sorted by move key: walk them together one key at a time
+        removed_rows, added_rows = iter(removed), iter(added)
+        r = next(removed_rows, None)
+        n = next(added_rows, None)
+        while r is not None or n is not None:
+            key = min(row[0] for row in (r, n) if row is not None)
+            group_removed, group_added = [], []
+            while r is not None and r[0] == key:
+                group_removed.append(r)
+                r = next(removed_rows, None)
+            while n is not None and n[0] == key:
+                group_added.append(n)
+                n = next(added_rows, None)
+            if key[0] > 0 and key[1] != "" and group_removed and group_added:
+                moves, group_removed, group_added = _pair_moves(group_removed, group_added)
+                for old_row, new_row in moves:
+                    yield {"change": "moved", "path": new_row[1], "old_path": old_row[1],
+                           "size": new_row[2], "old_size": old_row[2], "mtime": new_row[3]}
+            for row in group_added:
+                yield {"change": "added", "path": row[1], "old_path": None,
+                       "size": row[2], "old_size": None, "mtime": row[3]}
+            for row in group_removed:
+                yield {"change": "removed", "path": None, "old_path": row[1],
+                       "size": None, "old_size": row[2], "mtime": row[3]}
+
+
+def snapshot_roots(old_file, new_file):
+    """(old root, new root) from the headers of two snapshot files."""
+    with SnapshotReader(old_file) as old, SnapshotReader(new_file) as new:
+        return old.header.get("root", ""), new.header.get("root", "")
+
+
+def diff_records(old_file, new_file, buffer_rows=SORT_BUFFER_ROWS):
+    """
+    diff_snapshots as scan-like records for a ResultStore and the exports:
+    name/ext/path of the file (its old path when removed) plus change,
+    old_path, size, old_size, mtime, with the roots joined back on.
+    """
+    old_root, new_root = snapshot_roots(old_file, new_file)
+
+    def absolute(root, rel):
+        return rel if os.path.isabs(rel) or not root else os.path.join(root, *rel.split("/"))
+
+    for change in diff_snapshots(old_file, new_file, buffer_rows):
+        old_path = absolute(old_root, change["old_path"]) if change["old_path"] else None
+        path = absolute(new_root, change["path"]) if change["path"] else old_path
+        name = os.path.basename(path)
+        ext = name.rsplit(".", 1)[-1].lower() if "." in name.lstrip(".") else "N/A"
+        yield {"name": name, "ext": ext, "path": path, "change": change["change"],
+               "old_path": old_path, "size": change["size"] if change["size"] is not None else change["old_size"],
+               "old_size": change["old_size"],
+               "mtime": change["mtime"]}
+
+
+def diff_metadata(old_file, new_file):
+    """scan_metadata of a diff, for the exports."""
+    old_root, new_root = snapshot_roots(old_file, new_file)
+    return {
+        "folder_path": new_root,
+        "scan_type": "DIFF",
+        "old_snapshot": old_file,
+        "new_snapshot": new_file,
+        "old_root": old_root,
+        "file_extensions": [],
+        "filename_filter": None,
+        "depth": None,
+    }
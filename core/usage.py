@@ -0,0 +1,242 @@
+import heapq
+import os
+import queue
+import threading
+import time
+
+from core.devices import plan_roots
+from core.scanner import DEFAULT_WORKERS, PROGRESS_INTERVAL
+from util import profiler, throttle
+from util.file_utils import format_size
+
+# du-style disk usage: recursive size, file count and newest mtime per
+# folder, in one parallel traversal. Times are in ns, like the enricher's.
+#
+# Totals flow bottom-up while the walk runs: every folder counts the
+# listings still pending below it (its own plus one per subfolder) and,
+# when that reaches zero, adds its totals to its parent. The root is done
+# when its count reaches zero; there is no second pass over the tree.
+
+# Largest files and folders kept in a report
+TOP_N = 100
+
+_DONE = object()
+
+
+class DirUsage:
+    """One folder of a usage report; size, files and newest cover its whole subtree."""
+
+    __slots__ = ("path", "name", "parent", "depth", "size", "files", "newest",
+                 "children", "pending")
+
+    def __init__(self, path, parent=None):
+        self.path = path
+        self.name = os.path.basename(path.rstrip(os.sep)) or path
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.size = 0
+        self.files = 0
+        self.newest = 0
+        self.children = []
+        self.pending = 1  # own listing
+
+    def to_record(self):
+        return {"name": self.name, "ext": "FOLDER", "path": self.path, "size": self.size,
+                "files": self.files, "mtime": self.newest or None, "depth": self.depth}
+
+
+class UsageReport:
+    """
+    Result of scan_usage: the folder tree (root), the TOP_N largest files as
+    (size, path, mtime) and folders as DirUsage, both largest first.
+    """
+
+    def __init__(self, root, top_files, top_dirs, dirs, errors, cancelled, seconds):
+        self.root = root
+        self.top_files = top_files
+        self.top_dirs = top_dirs
+        self.dirs = dirs
+        self.errors = errors
+        self.cancelled = cancelled
+        self.seconds = seconds
+
+    def iter_dirs(self, max_depth=None):
+        """Folders depth first, largest subfolder first."""
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            yield node
+            if max_depth is None or node.depth < max_depth:
+                stack.extend(sorted(node.children, key=lambda c: c.size))
+
+    def to_records(self, max_depth=None):
+        """
+        Records for a ResultStore / export: folders down to max_depth (plus
+        the largest folders below it), then the largest files.
+        """
+        records = []
+        listed = set()
+        for node in self.iter_dirs(max_depth):
+            records.append(node.to_record())
+            listed.add(node.path)
+        for node in self.top_dirs:
+            if node.path not in listed:
+                records.append(node.to_record())
+        for size, path, mtime in self.top_files:
+            name = os.path.basename(path)
+            ext = name.rsplit(".", 1)[-1].lower() if "." in name.lstrip(".") else "N/A"
+            records.append({"name": name, "ext": ext, "path": path, "size": size,
+                            "files": 1, "mtime": mtime, "depth": None})
+        return records
+
+    def summary(self):
+        root = self.root
+        state = " (cancelled, totals incomplete)" if self.cancelled else ""
+        return (f"{format_size(root.size)} in {root.files} files, {self.dirs} folders, "
+                f"{self.seconds:.1f}s{state}")
+
+
+@profiler.instrumented("usage")
+def scan_usage(base_path, workers=None, top_n=TOP_N, scan_filter=None, debug_cb=None,
+               cancel_event=None):
+    """
+    Walk base_path completely and return a UsageReport. Sizes are apparent
+    sizes (st_size); files with several hard links are counted once.
+    Symlinks are not followed. scan_filter (core.filters) only contributes
+    its folder prune rules. workers is capped by the device budget (see
+    core.devices). debug_cb is called from the calling thread only.
+    """
+    started = time.monotonic()
+    workers = plan_roots([base_path], workers or DEFAULT_WORKERS)[0][3]
+    prune = scan_filter.prune_dir if scan_filter is not None and scan_filter.prune else None
+
+    root = DirUsage(base_path)
+    dir_queue = queue.Queue()
+    lock = threading.Lock()
+    finished = threading.Event()
+    stop = threading.Event()
+    top_files = []  # min-heaps
+    top_dirs = []
+    linked = set()
+    counts = {"dirs": 0, "files": 0, "errors": 0}
+
+    def finalize(node):
+        """Add node's totals to its ancestors as far as they are complete. Lock held."""
+        while True:
+            parent = node.parent
+            if parent is None:
+                finished.set()
+                return
+            parent.size += node.size
+            parent.files += node.files
+            if node.newest > parent.newest:
+                parent.newest = node.newest
+            item = (node.size, node.path, node)
+            if len(top_dirs) < top_n:
+                heapq.heappush(top_dirs, item)
+            elif node.size > top_dirs[0][0]:
+                heapq.heapreplace(top_dirs, item)
+            parent.pending -= 1
+            if parent.pending:
+                return
+            node = parent
+
+    def list_dir(node):
+        stats = profiler.active()
+        if stats is not None:
+            listed_at = time.perf_counter()
+        size = files = entries = 0
+        newest = 0
+        children = []
+        big = []
+        try:
+            with os.scandir(node.path) as it:
+                for entry in it:
+                    entries += 1
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if prune is None or not prune(entry.name):
+                                children.append(DirUsage(entry.path, node))
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if st.st_nlink > 1:
+                        key = (st.st_dev, st.st_ino)
+                        with lock:
+                            if key in linked:
+                                continue
+                            linked.add(key)
+                    size += st.st_size
+                    files += 1
+                    if st.st_mtime_ns > newest:
+                        newest = st.st_mtime_ns
+                    # Unlocked peek: only likely candidates take the lock
+                    if len(top_files) < top_n or st.st_size > top_files[0][0]:
+                        big.append((st.st_size, entry.path, st.st_mtime_ns))
+        except OSError:
+            with lock:
+                counts["errors"] += 1
+        if stats is not None:
+            stats.record_dir(node.path, time.perf_counter() - listed_at, entries, files)
+
+        with lock:
+            for item in big:
+                if len(top_files) < top_n:
+                    heapq.heappush(top_files, item)
+                elif item[0] > top_files[0][0]:
+                    heapq.heapreplace(top_files, item)
+            counts["dirs"] += 1
+            counts["files"] += files
+            node.size += size
+            node.files += files
+            if newest > node.newest:
+                node.newest = newest
+            node.children = children
+            node.pending += len(children) - 1
+            if not node.pending:
+                finalize(node)
+        for child in children:
+            dir_queue.put(child)
+        return entries
+
+    def worker():
+        while True:
+            node = dir_queue.get()
+            if node is _DONE:
+                return
+            if not stop.is_set():
+                with throttle.io("dir") as op:
+                    op.units = list_dir(node)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+    for t in threads:
+        t.start()
+    dir_queue.put(root)
+
+    cancelled = False
+    try:
+        while not finished.wait(PROGRESS_INTERVAL):
+            if cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+                break
+            if debug_cb:
+                with lock:
+                    dirs, files = counts["dirs"], counts["files"]
+                debug_cb(f"Usage: {dirs} folders, {files} files so far...")
+    finally:
+        stop.set()
+        for _ in threads:
+            dir_queue.put(_DONE)
+
+    with lock:
+        report = UsageReport(
+            root,
+            sorted(top_files, reverse=True),
+            [node for _, _, node in sorted(top_dirs, key=lambda d: d[0], reverse=True)],
+            counts["dirs"],
+            counts["errors"],
+            cancelled,
+            time.monotonic() - started,
+        )
+    return report
@@ -0,0 +1,462 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from core.filters import ScanFilter
+from core.hasher import detect_content_duplicates
+from core.similarity import detect_similar
+from core.scanner import _ext_of
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Seconds between two polls of the fallback watcher
+POLL_INTERVAL = 5.0
+
+# Events are handed to the callback in batches at most this often
+EVENT_BATCH_INTERVAL = 0.5
+
+# LiveResults compacts its store once tombstones are as many as the live rows
+# and are at least this many
+COMPACT_MIN_REMOVED = 1000
+
+
+def _list_tree(path, depth, max_depth):
+    """(files, dirs) below path, dirs as (path, depth) pairs, within max_depth."""
+    files = []
+    dirs = [(path, depth)]
+    i = 0
+    while i < len(dirs):
+        d, level = dirs[i]
+        i += 1
+        try:
+            with os.scandir(d) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if level < max_depth:
+                                dirs.append((entry.path, level + 1))
+                        else:
+                            files.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return files, dirs
+
+
+class _BaseWatcher:
+    """
+    Common part of the watchers: a background thread that collects events
+    and calls callback(events) with batches. Events are tuples:
+      ("created", path)   file appeared (also for files inside new dirs)
+      ("deleted", path)   file or directory went away
+      ("modified", path)  file contents were rewritten
+      ("rescan", root)    events were lost, caller should rescan
+    """
+
+    def __init__(self, root, max_depth, callback):
+        self.root = os.path.normpath(root)
+        self.max_depth = max_depth
+        self.callback = callback
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.pending = []
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    def emit(self, *event):
+        self.pending.append(event)
+
+    def flush(self):
+        if self.pending:
+            events, self.pending = self.pending, []
+            self.callback(events)
+
+    def depth_of(self, path):
+        return path.count(os.sep) - self.root.count(os.sep)
+
+
+class InotifyWatcher(_BaseWatcher):
+    """Linux watcher on inotify through ctypes; one watch per directory."""
+
+    def __init__(self, root, max_depth, callback):
+        super().__init__(root, max_depth, callback)
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}  # wd -> directory path
+        self.moves = {}    # cookie -> path of a MOVED_FROM waiting for its MOVED_TO
+        for d, _ in _list_tree(self.root, 0, max_depth)[1]:
+            self.add_watch(d)
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self.watches[wd] = path
+        return wd
+
+    def run(self):
+        try:
+            last_flush = time.monotonic()
+            while not self.stop_event.is_set():
+                ready, _, _ = select.select([self.fd], [], [], EVENT_BATCH_INTERVAL)
+                if ready:
+                    try:
+                        data = os.read(self.fd, 1024 * 1024)
+                    except BlockingIOError:
+                        data = b""
+                    self.parse(data)
+                now = time.monotonic()
+                if now - last_flush >= EVENT_BATCH_INTERVAL:
+                    self.flush_moves()
+                    self.flush()
+                    last_flush = now
+        finally:
+            os.close(self.fd)
+
+    def parse(self, data):
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                self.emit("rescan", self.root)
+                continue
+            folder = self.watches.get(wd)
+            if folder is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.watches[wd]
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                continue  # reported by the parent as DELETE / MOVED_FROM
+            path = os.path.join(folder, name)
+            is_dir = bool(mask & IN_ISDIR)
+
+            if mask & IN_MOVED_FROM:
+                self.moves[cookie] = path
+            elif mask & IN_MOVED_TO:
+                old = self.moves.pop(cookie, None)
+                if old is not None:
+                    self.emit("deleted", old)
+                self.created(path, is_dir)
+            elif mask & IN_CREATE:
+                self.created(path, is_dir)
+            elif mask & IN_DELETE:
+                self.emit("deleted", path)
+            elif mask & IN_CLOSE_WRITE:
+                self.emit("modified", path)
+
+    def created(self, path, is_dir):
+        if not is_dir:
+            self.emit("created", path)
+            return
+        depth = self.depth_of(path)
+        if depth > self.max_depth:
+            return
+        # Watch the new subtree first, then report what is already in it
+        files, dirs = _list_tree(path, depth, self.max_depth)
+        for d, _ in dirs:
+            self.add_watch(d)
+        for f in files:
+            self.emit("created", f)
+
+    def flush_moves(self):
+        # A MOVED_FROM without partner means the item left the watched tree
+        for path in self.moves.values():
+            self.emit("deleted", path)
+        self.moves.clear()
+
+
+class PollingWatcher(_BaseWatcher):
+    """
+    Portable fallback: stats every directory each POLL_INTERVAL seconds and
+    relists only those whose mtime changed. In-place edits of existing files
+    are not seen (they do not touch the directory mtime).
+    """
+
+    def __init__(self, root, max_depth, callback, interval=POLL_INTERVAL):
+        super().__init__(root, max_depth, callback)
+        self.interval = interval
+        self.dirs = {}  # path -> (mtime, file names, subdir names)
+        for d, _ in _list_tree(self.root, 0, max_depth)[1]:
+            self.snapshot(d)
+
+    def snapshot(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            files, subdirs = set(), set()
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.add(entry.name)
+                    else:
+                        files.add(entry.name)
+        except OSError:
+            return None
+        self.dirs[path] = (mtime, files, subdirs)
+        return self.dirs[path]
+
+    def forget(self, path):
+        """Drop a vanished directory and everything below it."""
+        prefix = path + os.sep
+        for d in [d for d in self.dirs if d == path or d.startswith(prefix)]:
+            del self.dirs[d]
+        self.emit("deleted", path)
+
+    def poll(self):
+        for path in list(self.dirs):
+            if path not in self.dirs:
+                continue  # removed while handling its parent
+            old_mtime, old_files, old_subdirs = self.dirs[path]
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                self.forget(path)
+                continue
+            if mtime == old_mtime:
+                continue
+            state = self.snapshot(path)
+            if state is None:
+                self.forget(path)
+                continue
+            _, files, subdirs = state
+            for name in files - old_files:
+                self.emit("created", os.path.join(path, name))
+            for name in old_files - files:
+                self.emit("deleted", os.path.join(path, name))
+            for name in old_subdirs - subdirs:
+                self.forget(os.path.join(path, name))
+            depth = self.depth_of(path)
+            if depth < self.max_depth:
+                for name in subdirs - old_subdirs:
+                    new_files, new_dirs = _list_tree(os.path.join(path, name), depth + 1, self.max_depth)
+                    for d, _ in new_dirs:
+                        self.snapshot(d)
+                    for f in new_files:
+                        self.emit("created", f)
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.poll()
+            self.flush()
+
+
+def create_watcher(root, max_depth, callback, force_polling=False):
+    """inotify watcher on Linux, polling watcher elsewhere or if inotify fails."""
+    if sys.platform.startswith("linux") and not force_polling:
+        try:
+            return InotifyWatcher(root, max_depth, callback)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root, max_depth, callback)
+
+
+class LiveResults:
+    """
+    Applies watcher events to a tagged ResultStore in place.
+    New files are appended, deleted ones become tombstones, modified ones
+    are updated in their row, and duplicate tags are recomputed only for
+    the name (or content/size) groups the events touched. The store is
+    compacted once tombstones pile up, which renumbers its rows.
+
+    apply() changes the store without any locking, so it has to run on the
+    thread that reads the store (the Tk main loop in the GUI), not on the
+    watcher's thread.
+    """
+
+    def __init__(self, results, scan_metadata, hash_cache=None):
+        self.results = results
+        self.root = (scan_metadata.get("roots") or [scan_metadata["folder_path"]])[0]
+        self.scan_filter = ScanFilter.from_metadata(scan_metadata)
+        self.mode = scan_metadata.get("duplicate_mode", "name")
+        self.similarity = scan_metadata.get("similarity", {})
+        self.hash_cache = hash_cache
+        self.next_group = 1
+        self.index_rows()
+
+    def index_rows(self):
+        """(Re)build the path and name indexes from the store's live rows."""
+        results = self.results
+        self.rows = {}                   # path -> row number
+        self.by_name = defaultdict(set)  # name -> live row numbers
+        for i in range(len(results)):
+            if results.is_removed(i):
+                continue
+            self.rows[results.path(i)] = i
+            self.by_name[results.names[i]].add(i)
+            self.next_group = max(self.next_group, results.group_col[i] + 1)
+        self.by_size = None  # built on first content-mode update
+
+    def wanted(self, path):
+        """Same rules as the scan that produced the results."""
+        scan_filter = self.scan_filter
+        if not scan_filter.match_name(os.path.basename(path), _ext_of(os.path.basename(path))):
+            return False
+        if scan_filter.prune_path(path, self.root):
+            return False
+        if scan_filter.needs_stat:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return False
+            return scan_filter.match_stat(st.st_size, st.st_mtime)
+        return True
+
+    def apply(self, events):
+        """
+        Apply a batch of watcher events. Returns (added, removed, retagged);
+        "rescan" events are ignored here, the caller decides what to do.
+        Row numbers held outside change when the batch compacts the store.
+        """
+        added = removed = 0
+        touched = set()
+        for kind, path in events:
+            if kind == "modified" and path in self.rows:
+                i = self.rows[path]
+                if os.path.isfile(path) and self.wanted(path):
+                    self.update(i)
+                    if self.mode != "name":
+                        touched.add(i)  # the contents matter, names did not change
+                    continue
+                kind = "deleted"  # no longer matches the scan
+            if kind in ("deleted", "modified"):
+                if path in self.rows:
+                    gone = [path]
+                elif kind == "deleted":
+                    # Not a known file, so possibly a directory: drop everything below it
+                    prefix = path + os.sep
+                    gone = [p for p in self.rows if p.startswith(prefix)]
+                else:
+                    gone = []
+                for p in gone:
+                    i = self.rows.pop(p)
+                    self.by_name[self.results.names[i]].discard(i)
+                    touched.add(i)
+                    if self.by_size is not None:
+                        self.by_size[self.size_of(i)].discard(i)
+                    self.results.remove(i)
+                    removed += 1
+            if kind in ("created", "modified"):
+                if path in self.rows or not os.path.isfile(path) or not self.wanted(path):
+                    continue
+                name = os.path.basename(path)
+                ext = _ext_of(name)
+                self.results.append({"name": name, "ext": ext if ext else "N/A", "path": path})
+                i = len(self.results) - 1
+                self.rows[path] = i
+                self.by_name[name].add(i)
+                if self.by_size is not None:
+                    self.by_size[self.size_of(i)].add(i)
+                touched.add(i)
+                added += 1
+
+        retagged = self.retag(touched) if touched else 0
+        results = self.results
+        if removed and results.removed >= max(COMPACT_MIN_REMOVED, results.live_count()):
+            results.compact()
+            self.index_rows()
+        return added, removed, retagged
+
+    def update(self, i):
+        """Refresh the stat fields row i has (size, mtime) after a rewrite."""
+        results = self.results
+        try:
+            st = os.stat(results.path(i))
+        except OSError:
+            return
+        if self.by_size is not None:
+            self.by_size[self.size_of(i)].discard(i)
+        if results.get_field(i, "size") is not None:
+            results.set_field(i, "size", st.st_size)
+        if results.get_field(i, "mtime") is not None:
+            results.set_field(i, "mtime", st.st_mtime_ns)
+        if self.by_size is not None:
+            self.by_size[self.size_of(i)].add(i)
+
+    def size_of(self, i):
+        size = self.results.get_field(i, "size")
+        if size is None:
+            try:
+                size = os.stat(self.results.path(i)).st_size
+            except OSError:
+                size = -1
+            self.results.set_field(i, "size", size)
+        return size
+
+    def retag(self, touched):
+        """Recompute duplicate tags for the groups of the touched rows."""
+        results = self.results
+        if self.mode == "content":
+            if self.by_size is None:
+                self.by_size = defaultdict(set)
+                for i in self.rows.values():
+                    self.by_size[self.size_of(i)].add(i)
+            sizes = set(self.size_of(i) for i in touched)
+            # Old group mates of touched rows may have lost their partner
+            groups = set(results.group_col[i] for i in touched if results.group_col[i])
+            affected = set(i for s in sizes for i in self.by_size.get(s, ()))
+            affected.update(i for i in self.rows.values() if results.group_col[i] in groups)
+            affected = [i for i in affected if not results.is_removed(i)]
+            options = {"cache": self.hash_cache} if self.hash_cache else {}
+            found = detect_content_duplicates([results[i] for i in affected], **options)
+            members = list(found.values())
+        elif self.mode == "similar":
+            # Similar groups are transitive, so regroup everything; the
+            # fingerprint cache keeps this to the new files' decoding
+            affected = list(self.rows.values())
+            found = detect_similar([results[i] for i in affected], **self.similarity)
+            members = list(found.values())
+        else:
+            names = set(results.names[i] for i in touched)
+            affected = [i for n in names for i in self.by_name.get(n, ())]
+            members = [[results.path(i) for i in self.by_name[n]] for n in names
+                       if len(self.by_name.get(n, ())) > 1]
+
+        for i in affected:
+            results[i]["is_duplicate"] = False
+            results[i]["duplicate_count"] = 0
+            results[i]["duplicate_group"] = 0
+        for paths in members:
+            group = self.next_group
+            self.next_group += 1
+            for p in paths:
+                record = results[self.rows[p]]
+                record["is_duplicate"] = True
+                record["duplicate_count"] = len(paths)
+                record["duplicate_group"] = group
+        return len(affected)
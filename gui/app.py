@@ -1,8 +1,19 @@
+import importlib
 import tkinter as tk
 from tkinter import ttk
-from tabs.identipy import IdentifyTab
-from tabs.editapy import EditTab
-from tabs.migrapy import MigrateTab
+from gui.throttle_bar import ThrottleBar
+from util import startup
+
+# Notebook pages: (name, label, module, class). A tab's module is imported
+# and the tab built the first time its page is selected, until then the
+# page is an empty frame. The other tabs work on the Identify tab's
+# results and get it as their second argument.
+TABS = (
+    ("identify", "Identify", "tabs.identipy", "IdentifyTab"),
+    ("edit", "Edit", "tabs.editapy", "EditTab"),
+    ("migrate", "Migrate", "tabs.migrapy", "MigrateTab"),
+)
+
 
 class App:
     def __init__(self, root):
@@ -10,20 +21,52 @@ class App:
         self.root.title("File Manager App")
         self.root.geometry("800x600")
 
-        # Create tab manager
+        # Create tab manager, with a placeholder page per tab
         self.tab_control = ttk.Notebook(self.root)
+        self.pages = {}
+        self.tabs = {}
+        for name, label, _, _ in TABS:
+            self.pages[name] = tk.Frame(self.tab_control)
+            self.tab_control.add(self.pages[name], text=label)
 
-        # Create tabs
-        self.identify_tab = IdentifyTab(self.root)
-        self.tab_control.add(self.identify_tab, text='Identify')
+        # Shared by every tab's scans, hashing and migrations
+        self.throttle_bar = ThrottleBar(self.root)
+        self.throttle_bar.pack(side="bottom", fill="x")
 
-        self.edit_tab = EditTab(self.root)
-        self.tab_control.add(self.edit_tab, text='Edit')
+        self.tab_control.pack(expand=1, fill="both")
+        self.tab_control.bind("<<NotebookTabChanged>>", self.on_tab_changed)
 
-        self.migrate_tab = MigrateTab(self.root)
-        self.tab_control.add(self.migrate_tab, text='Migrate')
+        # Let the window appear before the first tab is built (the Notebook
+        # also queues a tab change event for its first page)
+        self.shown = False
+        self.root.after_idle(self.on_window_shown)
 
-        self.tab_control.pack(expand=1, fill="both")
+    def on_window_shown(self):
+        self.root.update_idletasks()
+        startup.mark("window shown")
+        self.shown = True
+        self.on_tab_changed()
+
+    def on_tab_changed(self, event=None):
+        if not self.shown:
+            return
+        self.tab(TABS[self.tab_control.index("current")][0])
+
+    def tab(self, name):
+        """The tab called name (see TABS), built on first use."""
+        tab = self.tabs.get(name)
+        if tab is None:
+            _, _, module, class_name = next(t for t in TABS if t[0] == name)
+            args = () if name == "identify" else (self.tab("identify"),)
+            tab = getattr(importlib.import_module(module), class_name)(self.pages[name], *args)
+            tab.pack(expand=1, fill="both")
+            self.tabs[name] = tab
+            startup.mark(f"{name} tab built")
+        return tab
+
+    @property
+    def identify_tab(self):
+        return self.tab("identify")
 
     def run(self):
-        self.root.mainloop()
\ No newline at end of file
+        self.root.mainloop()
@@ -0,0 +1,116 @@
+import tkinter as tk
+
+from util import throttle
+from util.throttle import Scheduler, load_profile
+
+# How often the status line is refreshed
+STATUS_INTERVAL = 1000  # ms
+
+
+class ThrottleBar(tk.Frame):
+    """
+    Controls of the process-wide I/O scheduler (util.throttle): limits,
+    adaptive mode, a time-of-day profile and pause/resume. Scans, hashing
+    and migrations started from any tab go through it while "Limit I/O"
+    is checked.
+    """
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.enabled = tk.BooleanVar(value=False)
+        self.adaptive = tk.BooleanVar(value=True)
+        self.max_mbps = tk.StringVar()
+        self.max_ops = tk.StringVar()
+        self.max_io = tk.StringVar()
+        self.profile = None
+        self.profile_path = None
+        self.scheduler = None
+
+        tk.Checkbutton(self, text="Limit I/O", variable=self.enabled,
+                       command=self.apply).pack(side="left", padx=5)
+        for label, var in (("MB/s:", self.max_mbps), ("ops/s:", self.max_ops), ("in flight:", self.max_io)):
+            tk.Label(self, text=label).pack(side="left")
+            entry = tk.Entry(self, textvariable=var, width=5)
+            entry.pack(side="left", padx=(0, 5))
+            entry.bind("<Return>", lambda e: self.apply())
+            entry.bind("<FocusOut>", lambda e: self.apply())
+        tk.Checkbutton(self, text="Adaptive", variable=self.adaptive, command=self.apply).pack(side="left")
+        tk.Button(self, text="Profile...", command=self.load_profile).pack(side="left", padx=5)
+        self.pause_button = tk.Button(self, text="Pause", command=self.toggle_pause, width=7)
+        self.pause_button.pack(side="left", padx=5)
+        self.status = tk.Label(self, text="I/O unlimited", anchor="w")
+        self.status.pack(side="left", fill="x", expand=True, padx=5)
+        self.after(STATUS_INTERVAL, self.show_status)
+
+    @staticmethod
+    def _number(var, kind=float):
+        text = var.get().strip()
+        if not text:
+            return None
+        try:
+            value = kind(text)
+        except ValueError:
+            return None
+        return value if value > 0 else None
+
+    def apply(self):
+        """(Re)configure the active scheduler from the controls; a running job picks it up at once."""
+        if not self.enabled.get():
+            if self.scheduler is not None:
+                throttle.set_active(None)
+                self.scheduler.stop()  # release anything waiting on it
+                self.scheduler = None
+                self.pause_button.config(text="Pause")
+            return
+        limits = (self._number(self.max_ops), self._number(self.max_mbps), self._number(self.max_io, int))
+        if self.scheduler is not None and self.scheduler.adaptive == self.adaptive.get() \
+                and self.scheduler.profile == (self.profile or []):
+            self.scheduler.set_limits(*limits)
+            return
+        previous = self.scheduler
+        self.scheduler = Scheduler(*limits, adaptive=self.adaptive.get(), profile=self.profile)
+        if previous is not None and previous.user_paused:
+            self.scheduler.pause()
+        throttle.set_active(self.scheduler)
+        if previous is not None:
+            previous.stop()
+
+    def load_profile(self):
+        from tkinter import filedialog, messagebox
+
+        path = filedialog.askopenfilename(title="Time-of-day I/O profile",
+                                          filetypes=[("JSON", "*.json"), ("All files", "*")])
+        if not path:
+            return
+        try:
+            self.profile = load_profile(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("I/O profile", f"Could not load {path}: {e}")
+            return
+        self.profile_path = path
+        self.enabled.set(True)
+        self.apply()
+
+    def toggle_pause(self):
+        if self.scheduler is None:
+            self.enabled.set(True)
+            self.apply()
+        if self.scheduler.user_paused:
+            self.scheduler.resume()
+            self.pause_button.config(text="Pause")
+        else:
+            self.scheduler.pause()
+            self.pause_button.config(text="Resume")
+        self.show_status(reschedule=False)
+
+    def show_status(self, reschedule=True):
+        scheduler = self.scheduler
+        if scheduler is None:
+            self.status.config(text="I/O unlimited")
+        else:
+            text = scheduler.summary()
+            if scheduler.profile_paused and not scheduler.user_paused:
+                text += " (profile)"
+            self.status.config(text=text)
+        if reschedule:
+            self.after(STATUS_INTERVAL, self.show_status)
@@ -0,0 +1,120 @@
+import tkinter as tk
+from datetime import datetime
+from tkinter import ttk
+
+from util.file_utils import format_size
+
+# Sort keys of the UsageTree columns ("#0" is the name column)
+SORT_KEYS = {
+    "#0": lambda row: row["name"].lower(),
+    "Size": lambda row: row["size"],
+    "Files": lambda row: row["files"],
+    "Newest": lambda row: row["newest"],
+}
+
+
+class UsageTree(tk.Frame):
+    """
+    Folder tree of a disk usage report (core.usage.UsageReport).
+
+    Subfolders are only inserted when their parent is opened, so a report
+    of millions of folders shows instantly. Clicking a heading sorts every
+    opened level by that column; clicking it again reverses the order.
+    Two extra top-level nodes list the largest files and folders.
+    """
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.report = None
+        self.rows = {}        # item id -> {"name", "size", "files", "newest", "node"}
+        self.filled = set()   # item ids whose children are inserted
+        self.sort_column = "Size"
+        self.sort_reverse = True
+
+        self.vbar = ttk.Scrollbar(self, orient="vertical")
+        self.tree = ttk.Treeview(self, columns=("Size", "Files", "Newest"),
+                                 yscrollcommand=self.vbar.set)
+        self.vbar.config(command=self.tree.yview)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.vbar.grid(row=0, column=1, sticky="ns")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        for column, text in (("#0", "Folder"), ("Size", "Size"), ("Files", "Files"), ("Newest", "Newest file")):
+            self.tree.heading(column, text=text, command=lambda c=column: self.sort_by(c))
+        self.tree.column("#0", width=480)
+        self.tree.column("Size", width=100, anchor="e")
+        self.tree.column("Files", width=90, anchor="e")
+        self.tree.column("Newest", width=130, anchor="center")
+        self.tree.bind("<<TreeviewOpen>>", self.on_open)
+
+    # ---------------- Data ---------------- #
+
+    def set_report(self, report):
+        self.clear()
+        self.report = report
+        root = self.insert_dir("", report.root, report.root.path)
+        self.tree.item(root, open=True)
+        self.fill(root)
+
+        files = self.tree.insert("", "end", text=f"Largest files ({len(report.top_files)})")
+        for size, path, mtime in report.top_files:
+            self.insert_row(files, {"name": path, "size": size, "files": 1, "newest": mtime or 0, "node": None})
+        self.filled.add(files)
+        folders = self.tree.insert("", "end", text=f"Largest folders ({len(report.top_dirs)})")
+        for node in report.top_dirs:
+            self.insert_dir(folders, node, node.path)
+        self.filled.add(folders)
+        self.sort_children(files)
+
+    def clear(self):
+        self.tree.delete(*self.tree.get_children())
+        self.rows.clear()
+        self.filled.clear()
+        self.report = None
+
+    def insert_row(self, parent, row):
+        newest = datetime.fromtimestamp(row["newest"] / 1e9).strftime("%Y-%m-%d %H:%M") if row["newest"] else "-"
+        iid = self.tree.insert(parent, "end", text=row["name"],
+                               values=(format_size(row["size"]), row["files"], newest))
+        self.rows[iid] = row
+        return iid
+
+    def insert_dir(self, parent, node, label):
+        iid = self.insert_row(parent, {"name": label, "size": node.size, "files": node.files,
+                                       "newest": node.newest, "node": node})
+        if node.children:
+            self.tree.insert(iid, "end", text="…")  # placeholder until opened
+        return iid
+
+    def fill(self, iid):
+        if iid in self.filled:
+            return
+        self.filled.add(iid)
+        self.tree.delete(*self.tree.get_children(iid))
+        for child in self.rows[iid]["node"].children:
+            self.insert_dir(iid, child, child.name)
+        self.sort_children(iid)
+
+    def on_open(self, event):
+        iid = self.tree.focus()
+        if iid in self.rows and self.rows[iid]["node"] is not None:
+            self.fill(iid)
+
+    # ---------------- Sorting ---------------- #
+
+    def sort_by(self, column):
+        if column == self.sort_column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = column != "#0"
+        for iid in list(self.filled):
+            self.sort_children(iid)
+
+    def sort_children(self, iid):
+        key = SORT_KEYS[self.sort_column]
+        children = [c for c in self.tree.get_children(iid) if c in self.rows]
+        children.sort(key=lambda c: key(self.rows[c]), reverse=self.sort_reverse)
+        for index, child in enumerate(children):
+            self.tree.move(child, iid, index)
@@ -0,0 +1,127 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTree(tk.Frame):
+    """
+    Treeview that only materializes the rows currently on screen.
+
+    The data stays with the caller: set_source(count, row_fn) gives the
+    number of rows and a function returning the values tuple of row i.
+    Scrolling reuses a fixed pool of Treeview items, so its cost depends on
+    the window height only, never on the number of rows.
+    """
+
+    def __init__(self, parent, columns, **tree_options):
+        super().__init__(parent)
+        self.count = 0
+        self.row_fn = None
+        self.offset = 0
+        self.visible_rows = 1
+        self.items = []
+        self.scroll_cb = None  # called after every re-render
+
+        self.vbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.hbar = ttk.Scrollbar(self, orient="horizontal")
+        self.tree = ttk.Treeview(
+            self,
+            columns=columns,
+            show="headings",
+            xscrollcommand=self.hbar.set,
+            **tree_options
+        )
+        self.hbar.config(command=self.tree.xview)
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.vbar.grid(row=0, column=1, sticky="ns")
+        self.hbar.grid(row=1, column=0, sticky="ew")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", self.on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self.visible_rows) or "break")
+        self.tree.bind("<Next>", lambda e: self.scroll(self.visible_rows) or "break")
+        self.tree.bind("<Home>", lambda e: self.scroll_to(0) or "break")
+        self.tree.bind("<End>", lambda e: self.scroll_to(self.count) or "break")
+
+    # Pass-through so callers can configure it like a plain Treeview
+    def heading(self, *args, **kwargs):
+        return self.tree.heading(*args, **kwargs)
+
+    def column(self, *args, **kwargs):
+        return self.tree.column(*args, **kwargs)
+
+    # ---------------- Data ---------------- #
+
+    def set_source(self, count, row_fn, keep_offset=False):
+        """Point the view at new data; call again whenever count changes."""
+        self.count = count
+        self.row_fn = row_fn
+        if not keep_offset:
+            self.offset = 0
+        self.refresh()
+
+    def clear(self):
+        self.set_source(0, None)
+
+    def refresh(self):
+        """Re-render the visible window (O(visible rows))."""
+        self.offset = max(0, min(self.offset, self.count - self.visible_rows))
+        shown = min(self.visible_rows, self.count - self.offset)
+
+        # Grow or shrink the pool of reusable items
+        while len(self.items) < shown:
+            self.items.append(self.tree.insert("", "end", values=()))
+        while len(self.items) > shown:
+            self.tree.delete(self.items.pop())
+
+        for i, iid in enumerate(self.items):
+            self.tree.item(iid, values=self.row_fn(self.offset + i))
+
+        if self.count:
+            self.vbar.set(self.offset / self.count, (self.offset + shown) / self.count)
+        else:
+            self.vbar.set(0, 1)
+        if self.scroll_cb:
+            self.scroll_cb()
+
+    def visible_range(self):
+        """(first, last) row indices on screen, last exclusive."""
+        return self.offset, min(self.offset + self.visible_rows, self.count)
+
+    def selected_rows(self):
+        """Row indices (into the source) of the selected items."""
+        return [self.offset + self.items.index(iid) for iid in self.tree.selection()
+                if iid in self.items]
+
+    # ---------------- Scrolling ---------------- #
+
+    def scroll(self, rows):
+        self.scroll_to(self.offset + rows)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, self.count - self.visible_rows))
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+
+    def yview(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'|'pages')."""
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * self.count))
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else 1
+            self.scroll(int(args[1]) * step)
+
+    def on_wheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+
+    def on_resize(self, event):
+        row_height = ttk.Style().lookup("Treeview", "rowheight") or 20
+        rows = max(1, (event.height - 25) // int(row_height))  # minus heading row
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.refresh()
@@ -1,7 +1,18 @@
-from gui.app import App
-import tkinter as tk
+import sys
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Command line mode (python main.py scan ...), never loads tkinter
+        from cli import main
+        sys.exit(main())
+
+    # First, so the startup report's times cover the imports below
+    from util import startup
+
+    import tkinter as tk
+    from gui.app import App
+
+    startup.mark("imports")
     root = tk.Tk()
     app = App(root)
     app.run()
@@ -1,23 +1,131 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, simpledialog
-from core.editor import Editor
+import os
+from tkinter import ttk, filedialog, simpledialog, messagebox
+from core.editor import Editor, RenameError, build_rename_plan, TEMPLATE_HELP
+from gui.virtual_tree import VirtualTree
 
 class EditTab(tk.Frame):
-    def __init__(self, parent):
+    def __init__(self, parent, identify_tab=None):
         super().__init__(parent)
         self.editor = Editor()
+        # Batch renames work on the Identify tab's current view
+        self.identify_tab = identify_tab
+        self.plan = []
+
+        self.pattern = tk.StringVar()
+        self.replacement = tk.StringVar()
+        self.template = tk.StringVar()
+        self.new_ext = tk.StringVar()
+        self.change_ext = tk.BooleanVar(value=False)
+        self.counter_start = tk.StringVar(value="1")
 
         # Widgets for editing
         ttk.Label(self, text="Edit / Rename Files").pack(pady=10)
         self.rename_button = ttk.Button(self, text="Rename File", command=self.rename_file)
         self.rename_button.pack(pady=5)
 
+        self.build_batch_ui()
+
+    def build_batch_ui(self):
+        rules = tk.LabelFrame(self, text="Batch Rename (scan results)")
+        rules.pack(fill="x", padx=5, pady=5)
+
+        tk.Label(rules, text="Find (regex):").grid(row=0, column=0, sticky="w", padx=5)
+        tk.Entry(rules, textvariable=self.pattern, width=25).grid(row=0, column=1, padx=5)
+        tk.Label(rules, text="Replace:").grid(row=0, column=2, sticky="w", padx=5)
+        tk.Entry(rules, textvariable=self.replacement, width=25).grid(row=0, column=3, padx=5)
+
+        tk.Label(rules, text="Template:").grid(row=1, column=0, sticky="w", padx=5)
+        tk.Entry(rules, textvariable=self.template, width=25).grid(row=1, column=1, padx=5)
+        tk.Label(rules, text=TEMPLATE_HELP).grid(row=1, column=2, columnspan=2, sticky="w", padx=5)
+
+        tk.Checkbutton(rules, text="New extension:", variable=self.change_ext).grid(row=2, column=0, sticky="w", padx=5)
+        tk.Entry(rules, textvariable=self.new_ext, width=10).grid(row=2, column=1, sticky="w", padx=5)
+        tk.Label(rules, text="Counter start:").grid(row=2, column=2, sticky="w", padx=5)
+        tk.Entry(rules, textvariable=self.counter_start, width=6).grid(row=2, column=3, sticky="w", padx=5)
+
+        buttons = tk.Frame(self)
+        buttons.pack(pady=5)
+        tk.Button(buttons, text="Preview", command=self.preview).pack(side="left", padx=5)
+        tk.Button(buttons, text="Apply", command=self.apply).pack(side="left", padx=5)
+        tk.Button(buttons, text="Undo Last", command=self.undo).pack(side="left", padx=5)
+        self.summary = tk.Label(buttons, text="")
+        self.summary.pack(side="left", padx=10)
+
+        # Preview only materializes visible rows, fine for thousands of files
+        self.preview_tree = VirtualTree(self, columns=("Status", "Old", "New"))
+        self.preview_tree.pack(expand=True, fill="both", padx=5, pady=5)
+        self.preview_tree.heading("Status", text="Status")
+        self.preview_tree.heading("Old", text="Current Name")
+        self.preview_tree.heading("New", text="New Name")
+        self.preview_tree.column("Status", width=90, anchor="center")
+        self.preview_tree.column("Old", width=300)
+        self.preview_tree.column("New", width=300)
+
     def rename_file(self):
         file_path = filedialog.askopenfilename()
         if file_path:
-            new_name = simpledialog.askstring("Rename", "Enter new name:")
+            new_name = simpledialog.askstring("Rename", "Enter new name:",
+                                              initialvalue=os.path.basename(file_path))
             if new_name:
-                import os
-                dir_path = os.path.dirname(file_path)
-                new_path = os.path.join(dir_path, new_name)
-                self.editor.rename_file(file_path, new_path)
\ No newline at end of file
+                try:
+                    self.editor.rename_file(file_path, new_name)
+                except (RenameError, OSError) as e:
+                    messagebox.showerror("Rename", str(e))
+
+    def preview(self):
+        if self.identify_tab is None or not self.identify_tab.results_cache:
+            messagebox.showwarning("Rename", "No scan results. Run a scan in the Identify tab first.")
+            return False
+        try:
+            start = int(self.counter_start.get() or 1)
+            self.plan = build_rename_plan(
+                self.identify_tab.current_records(),
+                pattern=self.pattern.get() or None,
+                replacement=self.replacement.get(),
+                template=self.template.get() or None,
+                new_ext=self.new_ext.get().strip() if self.change_ext.get() else None,
+                start=start
+            )
+        except (RenameError, ValueError) as e:
+            messagebox.showerror("Rename", str(e))
+            return False
+
+        plan = self.plan
+        self.preview_tree.set_source(
+            len(plan),
+            lambda i: (plan[i]["status"].upper(), os.path.basename(plan[i]["src"]), plan[i]["name"])
+        )
+        counts = {}
+        for op in plan:
+            counts[op["status"]] = counts.get(op["status"], 0) + 1
+        self.summary.config(text=", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+        return True
+
+    def apply(self):
+        if not self.preview():
+            return
+        blocked = sum(1 for op in self.plan if op["status"] in ("invalid", "collision"))
+        ready = sum(1 for op in self.plan if op["status"] == "ok")
+        if not ready:
+            messagebox.showinfo("Rename", "Nothing to rename.")
+            return
+        msg = f"Rename {ready} files?"
+        if blocked:
+            msg += f"\n{blocked} files with invalid or colliding names will be skipped."
+        if not messagebox.askyesno("Rename", msg):
+            return
+        try:
+            journal, renamed = self.editor.apply_renames(self.plan)
+        except (RenameError, OSError) as e:
+            messagebox.showerror("Rename", f"Stopped: {e}\nUse Undo Last to roll back.")
+            return
+        messagebox.showinfo("Rename", f"{renamed} files renamed. Rescan to refresh the results.")
+
+    def undo(self):
+        try:
+            undone = self.editor.undo()
+        except (RenameError, OSError) as e:
+            messagebox.showerror("Undo", str(e))
+            return
+        messagebox.showinfo("Undo", f"{undone} renames reverted.")
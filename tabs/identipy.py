@@ -1,8 +1,30 @@
 import tkinter as tk
 import os
-from tkinter import ttk, filedialog, messagebox
-from core.scanner import scan_files, scan_root_folders, tag_duplicates
-from util.file_utils import export_scan_results
+import queue
+import threading
+import time
+from array import array
+from datetime import datetime
+from tkinter import ttk
+from core.filters import DEFAULT_PRUNE, parse_size
+from core.pipeline import build_scan_metadata, build_views, run_scan, run_usage, scan_folders, scan_roots
+from core.results import SORT_KEYS, ResultStore
+from core.search import NameIndex
+from gui.virtual_tree import VirtualTree
+from util.constants import DUPLICATE_MODES, EXPORT_FORMATS
+from util.file_utils import format_size
+from util import profiler, startup
+
+# The scan index (sqlite3), snapshots, watchers, exporters and the Tk
+# dialogs are imported by the methods that use them, so building the tab
+# stays cheap (see gui.app).
+
+# Result list columns: heading text and the ResultStore.sort_order key a
+# click on the heading sorts by (the status of DIFF results by change)
+HEADINGS = {"Type": "Type", "Duplicate": "Status", "Details": "Details",
+            "Modified": "Modified", "Value": "Path / Name"}
+SORT_COLUMNS = {"Type": "ext", "Duplicate": "status", "Details": "size",
+                "Modified": "mtime", "Value": "path"}
 
 class IdentifyTab(tk.Frame):
     # START HERE
@@ -10,20 +32,85 @@ class IdentifyTab(tk.Frame):
         super().__init__(parent)
 
         self.folder_path = tk.StringVar()
+        # More folders (other drives, shares) scanned together with folder_path
+        self.extra_folders = []
+        self.extra_folders_text = tk.StringVar()
         self.scan_all_files = tk.BooleanVar(value=False)
         self.scan_folders_only = tk.BooleanVar(value=False)
+        self.folder_sizes = tk.BooleanVar(value=False)
         self.scan_subfolders = tk.BooleanVar(value=True)
         self.depth_level = tk.StringVar(value="2")
         self.filename_filter = tk.StringVar()
+        self.exclude_patterns = tk.StringVar()
+        self.min_size = tk.StringVar()
+        self.prune_common = tk.BooleanVar(value=False)
         self.show_duplicates_only = tk.BooleanVar(value=False)
         self.show_unique_only = tk.BooleanVar(value=False)
-
-        self.page_size = 50
-        self.page_index = 0
-        self.results_cache = []
-        self.current_filter_results = []
+        self.duplicate_mode = tk.StringVar(value=DUPLICATE_MODES[0])
+        self.use_index = tk.BooleanVar(value=False)
+        self.export_format = tk.StringVar(value=EXPORT_FORMATS[0])
+        self.export_gzip = tk.BooleanVar(value=False)
+        self.watch_mode = tk.BooleanVar(value=False)
+        self.profile_scan = tk.BooleanVar(value=False)
+        self.profile_python = tk.BooleanVar(value=False)
+        self.read_details = tk.BooleanVar(value=False)
+        self.search_text = tk.StringVar()
+        self.search_fuzzy = tk.BooleanVar(value=False)
+
+        self.results_cache = ResultStore()
+        # Row numbers into results_cache for the filtered views, rebuilt only
+        # when a scan finishes (see build_views); None means "all rows"
+        self.view_indices = build_views(self.results_cache)
+        self.current_view = None
         self.scan_metadata = {}  # Store scan parameters
 
+        # Sorted column (click on a heading). The store caches its sorted
+        # orders, sorted_views the duplicate/unique views in those orders
+        self.sort_by = None
+        self.sort_reverse = False
+        self.sorted_views = {}
+
+        # Search as you type: a trigram index over results_cache, filled on
+        # a background thread; search_rows are the ranked hits (None: no
+        # search), view_mask marks the rows of the view being narrowed
+        self.name_index = None
+        self.index_thread = None
+        self.search_rows = None
+        self.search_after = None
+        self.view_mask = (None, None)
+
+        # Background scan state: the worker thread only touches scan_queue,
+        # everything Tk related stays on the main loop (see poll_scan)
+        self.scan_queue = queue.Queue()
+        self.scan_thread = None
+        self.scanning = False
+        self.cancel_event = threading.Event()
+        self.poll_interval = 50  # ms
+        self.progress_interval = 0.5  # seconds between progress log lines
+
+        # Watch mode: the watcher thread queues its events, the main loop
+        # applies them to results_cache and refreshes the views (poll_watch)
+        self.watcher = None
+        self.live = None
+        self.watch_queue = queue.Queue()
+        self.watch_poll_interval = 500  # ms
+
+        # Snapshot writing runs beside the results, not as a scan
+        self.snapshot_thread = None
+        self.snapshot_queue = queue.Queue()
+
+        # The last scan's metadata, read from the index off the main loop
+        self.restore_queue = queue.Queue()
+
+        # Log lines are written to the widget in one go when Tk is idle
+        self.log_lines = []
+        self.log_pending = False
+
+        # Profiling session (util.profiler), active from scan start until the
+        # next scan so display and export calls are recorded too
+        self.profile_session = None
+        self.profile_path = None
+
         self.file_types = {
             "mp4": tk.BooleanVar(value=True),
             "mkv": tk.BooleanVar(value=True),
@@ -33,11 +120,25 @@ class IdentifyTab(tk.Frame):
 
         self.build_ui()
 
+        self.show_duplicates_only.trace_add("write", lambda *_: self.on_filter_change())
+        self.show_unique_only.trace_add("write", lambda *_: self.on_filter_change())
+        self.watch_mode.trace_add("write", lambda *_: self.toggle_watch())
+        self.search_text.trace_add("write", lambda *_: self.on_search_change())
+        self.search_fuzzy.trace_add("write", lambda *_: self.on_search_change())
+
+        # Reopen the last scan from the persistent index once the UI is up
+        self.after_idle(self.restore_last_scan)
+
     # ---------------- UI ---------------- #
 
     def build_ui(self):
-        tk.Button(self, text="Select Folder", command=self.select_folder, bg="blue", fg="white").pack(pady=4)
+        folder_buttons = tk.Frame(self)
+        folder_buttons.pack(pady=4)
+        tk.Button(folder_buttons, text="Select Folder", command=self.select_folder,
+                  bg="blue", fg="white").pack(side="left", padx=2)
+        tk.Button(folder_buttons, text="Add Folder", command=self.add_folder).pack(side="left", padx=2)
         tk.Label(self, textvariable=self.folder_path, wraplength=850).pack()
+        tk.Label(self, textvariable=self.extra_folders_text, wraplength=850).pack()
 
         self.file_type_frame = tk.LabelFrame(self, text="File Types")
         self.file_type_frame.pack(fill="x", padx=5, pady=5)
@@ -75,11 +176,34 @@ class IdentifyTab(tk.Frame):
             variable=self.show_unique_only
         ).pack(side="left", padx=5)
 
+        tk.Label(filter_frame, text="Match by:").pack(side="left", padx=5)
+        ttk.Combobox(filter_frame, values=list(DUPLICATE_MODES), textvariable=self.duplicate_mode,
+                     state="readonly", width=8).pack(side="left", padx=5)
+
+        rules_frame = tk.Frame(self)
+        rules_frame.pack(fill="x", padx=5)
+        tk.Label(rules_frame, text="Exclude (globs, re:regex):").pack(side="left", padx=5)
+        tk.Entry(rules_frame, textvariable=self.exclude_patterns, width=25).pack(side="left", padx=5)
+        tk.Label(rules_frame, text="Min size:").pack(side="left", padx=5)
+        tk.Entry(rules_frame, textvariable=self.min_size, width=8).pack(side="left", padx=5)
+        tk.Checkbutton(
+            rules_frame,
+            text="Skip .git, node_modules, snapshots",
+            variable=self.prune_common
+        ).pack(side="left", padx=5)
+
+        folders_frame = tk.Frame(self)
+        folders_frame.pack(pady=4)
         tk.Checkbutton(
-            self,
+            folders_frame,
             text="Folders only (root level)",
             variable=self.scan_folders_only
-        ).pack(pady=4)
+        ).pack(side="left")
+        tk.Checkbutton(
+            folders_frame,
+            text="with sizes (whole tree, largest files/folders)",
+            variable=self.folder_sizes
+        ).pack(side="left", padx=5)
 
         opts = tk.Frame(self)
         opts.pack(pady=4)
@@ -88,52 +212,57 @@ class IdentifyTab(tk.Frame):
         ttk.Combobox(opts, values=["0","1","2"], textvariable=self.depth_level,
                      state="readonly", width=3).pack(side="left", padx=5)
         tk.Label(opts, text="Depth").pack(side="left")
+        tk.Checkbutton(opts, text="Incremental (use scan index)", variable=self.use_index).pack(side="left", padx=10)
+        tk.Checkbutton(opts, text="Watch for changes", variable=self.watch_mode).pack(side="left")
+        tk.Checkbutton(opts, text="File details", variable=self.read_details).pack(side="left", padx=(10, 0))
+        tk.Checkbutton(opts, text="Profile", variable=self.profile_scan).pack(side="left", padx=(10, 0))
+        tk.Checkbutton(opts, text="+cProfile/tracemalloc", variable=self.profile_python).pack(side="left")
 
         button_frame = tk.Frame(self)
         button_frame.pack(pady=5)
-        tk.Button(button_frame, text="Scan", command=self.run_scan).pack(side="left", padx=5)
+        self.scan_button = tk.Button(button_frame, text="Scan", command=self.run_scan)
+        self.scan_button.pack(side="left", padx=5)
+        self.cancel_button = tk.Button(button_frame, text="Cancel", command=self.cancel_scan, state="disabled")
+        self.cancel_button.pack(side="left", padx=5)
         tk.Button(button_frame, text="Export Results", command=self.export_results).pack(side="left", padx=5)
+        ttk.Combobox(button_frame, values=list(EXPORT_FORMATS), textvariable=self.export_format,
+                     state="readonly", width=6).pack(side="left", padx=5)
+        tk.Checkbutton(button_frame, text="gzip", variable=self.export_gzip).pack(side="left")
+        tk.Button(button_frame, text="Save Snapshot", command=self.save_snapshot).pack(side="left", padx=(15, 5))
+        tk.Button(button_frame, text="Compare Snapshots", command=self.compare_snapshots).pack(side="left", padx=5)
+
+        search_frame = tk.Frame(self)
+        search_frame.pack(fill="x", padx=5)
+        tk.Label(search_frame, text="Search results:").pack(side="left", padx=5)
+        tk.Entry(search_frame, textvariable=self.search_text, width=40).pack(side="left", padx=5)
+        tk.Checkbutton(search_frame, text="Fuzzy", variable=self.search_fuzzy).pack(side="left")
+        self.search_info = tk.Label(search_frame, text="text, folder/name or *.glob")
+        self.search_info.pack(side="left", padx=10)
 
         # ---- Tree + Scrollbars ---- #
-        tree_frame = tk.Frame(self)
-        tree_frame.pack(expand=True, fill="both", padx=5)
-
-        v = ttk.Scrollbar(tree_frame, orient="vertical")
-        h = ttk.Scrollbar(tree_frame, orient="horizontal")
-
-        self.tree = ttk.Treeview(
-            tree_frame,
-            columns=("Type", "Duplicate", "Value"),
-            show="headings",
-            yscrollcommand=v.set,
-            xscrollcommand=h.set
-        )
-
-        v.config(command=self.tree.yview)
-        h.config(command=self.tree.xview)
+        self.tree = VirtualTree(self, columns=tuple(HEADINGS))
+        self.tree.pack(expand=True, fill="both", padx=5)
+        # Shown instead of self.tree after a folder size scan
+        self.usage_tree = None  # created by the first folder size scan
+        self.usage_report = None
 
-        self.tree.heading("Type", text="Type")
-        self.tree.heading("Duplicate", text="Status")
-        self.tree.heading("Value", text="Path / Name")
+        for column, text in HEADINGS.items():
+            self.tree.heading(column, text=text, command=lambda c=column: self.sort_column(c))
 
         self.tree.column("Type", width=80, anchor="center")
         self.tree.column("Duplicate", width=100, anchor="center")
+        self.tree.column("Details", width=170)
+        self.tree.column("Modified", width=120, anchor="center")
         self.tree.column("Value", width=600)
 
-        self.tree.grid(row=0, column=0, sticky="nsew")
-        v.grid(row=0, column=1, sticky="ns")
-        h.grid(row=1, column=0, sticky="ew")
-
-        tree_frame.rowconfigure(0, weight=1)
-        tree_frame.columnconfigure(0, weight=1)
-
-        nav = tk.Frame(self)
+        nav = self.nav = tk.Frame(self)
         nav.pack(pady=4)
         tk.Button(nav, text="◀ Prev", command=self.prev_page).pack(side="left", padx=5)
         tk.Button(nav, text="Next ▶", command=self.next_page).pack(side="left", padx=5)
-        tk.Label(nav, text="Page info:").pack(side="left", padx=5)
-        self.page_info = tk.Label(nav, text="0/0")
+        tk.Label(nav, text="Rows:").pack(side="left", padx=5)
+        self.page_info = tk.Label(nav, text="0-0 of 0")
         self.page_info.pack(side="left", padx=5)
+        self.tree.scroll_cb = self.update_page_info
 
         debug = tk.LabelFrame(self, text="Scan Status")
         debug.pack(fill="x", padx=5, pady=5)
@@ -144,11 +273,21 @@ class IdentifyTab(tk.Frame):
     # ---------------- Logic ---------------- #
 
     def log(self, msg):
-        self.debug_text.config(state="normal")
-        self.debug_text.insert("end", msg + "\n")
-        self.debug_text.see("end")
-        self.debug_text.config(state="disabled")
-        self.update_idletasks()
+        # Batched: forcing a redraw per line (update_idletasks) was a
+        # measurable share of scan time
+        self.log_lines.append(msg)
+        if not self.log_pending:
+            self.log_pending = True
+            self.after_idle(self.flush_log)
+
+    def flush_log(self):
+        with profiler.phase("log"):
+            lines, self.log_lines = self.log_lines, []
+            self.log_pending = False
+            self.debug_text.config(state="normal")
+            self.debug_text.insert("end", "\n".join(lines) + "\n")
+            self.debug_text.see("end")
+            self.debug_text.config(state="disabled")
 
     def toggle_file_types(self):
         state = tk.DISABLED if self.scan_all_files.get() else tk.NORMAL
@@ -157,14 +296,41 @@ class IdentifyTab(tk.Frame):
                 w.configure(state=state)
 
     def select_folder(self):
+        from tkinter import filedialog
+
         path = filedialog.askdirectory()
         if path:
             self.folder_path.set(path)
+            self.set_extra_folders([])
+
+    def add_folder(self):
+        """Add a folder (e.g. on another drive) to the next scan."""
+        if not self.folder_path.get():
+            self.select_folder()
+            return
+        from tkinter import filedialog
+
+        path = filedialog.askdirectory()
+        if path and path != self.folder_path.get() and path not in self.extra_folders:
+            self.set_extra_folders(self.extra_folders + [path])
+
+    def set_extra_folders(self, folders):
+        self.extra_folders = list(folders)
+        self.extra_folders_text.set(f"+ {', '.join(folders)}" if folders else "")
 
     def run_scan(self):
-        self.tree.delete(*self.tree.get_children())
-        self.results_cache.clear()
-        self.page_index = 0
+        if self.scan_thread is not None and self.scan_thread.is_alive():
+            self.log("⏳ A scan is already running.")
+            return
+
+        self.stop_watch()
+        self.stop_profile()
+        if self.profile_scan.get():
+            self.start_profile()
+        self.results_cache = ResultStore()
+        self.show_usage(None)
+        self.build_views()
+        self.display_page()
 
         if not self.folder_path.get():
             self.log("❌ Please select a folder first.")
@@ -172,35 +338,23 @@ class IdentifyTab(tk.Frame):
 
         self.log("🔍 Starting scan...")
 
-        # Initialize metadata
-        self.scan_metadata = {
-            "folder_path": self.folder_path.get(),
-            "scan_type": None,
-            "scanned_items": [],
-            "file_extensions": [],
-            "filename_filter": None,
-            "depth": 0
-        }
+        if self.scan_folders_only.get() and self.folder_sizes.get():
+            depth = int(self.depth_level.get()) if self.scan_subfolders.get() else 0
+            self.scan_metadata = build_scan_metadata(
+                self.folder_path.get(), max_depth=depth, folders_only=True, usage=True,
+                filters={"prune": list(DEFAULT_PRUNE) if self.prune_common.get() else None}
+            )
+            self.start_scan_thread(self.usage_worker, dict(self.scan_metadata), False, False)
+            return
 
         if self.scan_folders_only.get():
-            folders = scan_root_folders(self.folder_path.get())
-            self.scan_metadata["scan_type"] = "FOLDERS_ONLY"
-            self.scan_metadata["scanned_items"] = folders
-            
-            # Store folders in results_cache for export capability
-            for folder in folders:
-                self.results_cache.append({
-                    "name": folder,
-                    "ext": "FOLDER",
-                    "path": os.path.join(self.folder_path.get(), folder),
-                    "is_duplicate": False,
-                    "duplicate_count": 0
-                })
+            self.scan_metadata = build_scan_metadata(self.folder_path.get(), folders_only=True)
+            self.results_cache = scan_folders(self.folder_path.get())
             
             # Display in tree
-            for f in folders:
-                self.tree.insert("", "end", values=("FOLDER", "-", f))
-            self.log(f"✅ {len(folders)} folders found.")
+            self.build_views()
+            self.display_page()
+            self.log(f"✅ {len(self.results_cache)} folders found.")
             return
 
         extensions = [] if self.scan_all_files.get() else [
@@ -209,77 +363,626 @@ class IdentifyTab(tk.Frame):
 
         depth = int(self.depth_level.get()) if self.scan_subfolders.get() else 0
         filename_filter = self.filename_filter.get().strip() if self.filename_filter.get() else None
+        try:
+            filters = {
+                "exclude": self.exclude_patterns.get().strip(),
+                "min_size": parse_size(self.min_size.get()),
+                "prune": list(DEFAULT_PRUNE) if self.prune_common.get() else None,
+            }
+        except ValueError as e:
+            self.log(f"❌ {e}")
+            return
 
         # Set metadata
-        self.scan_metadata["scan_type"] = "FILES"
-        self.scan_metadata["file_extensions"] = extensions if extensions else ["ALL"]
-        self.scan_metadata["filename_filter"] = filename_filter
-        self.scan_metadata["depth"] = depth
-
-        self.results_cache = scan_files(
-            self.folder_path.get(),
-            extensions,
-            depth,
-            self.log,
-            filename_filter
+        self.scan_metadata = build_scan_metadata(
+            self.folder_path.get(), extensions, depth, filename_filter, self.duplicate_mode.get(),
+            filters=filters, enrich=self.read_details.get(), extra_roots=self.extra_folders
         )
 
-        # Store scanned filenames
-        self.scan_metadata["scanned_items"] = [r["name"] for r in self.results_cache]
+        self.start_scan_thread(self.scan_worker, dict(self.scan_metadata), self.use_index.get(), False)
+
+    def start_scan_thread(self, target, scan_metadata, use_index, restore):
+        """
+        Run target on a background thread. It appends to a fresh results_cache
+        (ResultStore appends are safe to read concurrently) and reports
+        through scan_queue.
+        """
+        self.cancel_event = threading.Event()
+        self.scan_queue = queue.Queue()
+        self.results_cache = ResultStore()
+        self.scan_thread = threading.Thread(
+            target=target,
+            args=(scan_metadata, use_index, restore, self.results_cache,
+                  self.cancel_event, self.scan_queue),
+            daemon=True
+        )
+        self.scan_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        self.scanning = True
+        self.scan_started = time.monotonic()
+        self.last_progress = self.scan_started
+        self.scan_thread.start()
+        self.after(self.poll_interval, self.poll_scan)
+
+    def scan_worker(self, scan_metadata, use_index, restore, results, cancel_event, out_queue):
+        """
+        Runs on the scan thread, must not touch any widget.
+        See core.pipeline.run_scan for use_index/restore.
+        """
+        try:
+            results = run_scan(
+                scan_metadata, results, use_index=use_index, restore=restore,
+                debug_cb=lambda msg: out_queue.put(("log", msg)),
+                batch_cb=lambda n: out_queue.put(("batch", n)),
+                cancel_event=cancel_event
+            )
+            out_queue.put(("results", results))
+            out_queue.put(("cancelled" if cancel_event.is_set() else "done", None))
+        except Exception as e:
+            out_queue.put(("error", e))
 
-        # Tag duplicates
-        self.results_cache = tag_duplicates(self.results_cache)
+    def usage_worker(self, scan_metadata, use_index, restore, results, cancel_event, out_queue):
+        """Folder size scan on the scan thread (see core.pipeline.run_usage)."""
+        try:
+            report, results = run_usage(
+                scan_metadata,
+                debug_cb=lambda msg: out_queue.put(("log", msg)),
+                cancel_event=cancel_event
+            )
+            out_queue.put(("usage", report))
+            out_queue.put(("results", results))
+            out_queue.put(("cancelled" if cancel_event.is_set() else "done", None))
+        except Exception as e:
+            out_queue.put(("error", e))
 
-        # Apply additional filters
-        self.apply_filters()
+    def diff_worker(self, scan_metadata, use_index, restore, results, cancel_event, out_queue):
+        """Streams the changes between two snapshots into results (see core.snapshot)."""
+        from core.snapshot import diff_records
+
+        try:
+            batch = []
+            for record in diff_records(scan_metadata["old_snapshot"], scan_metadata["new_snapshot"]):
+                batch.append(record)
+                if len(batch) >= 1000:
+                    results.extend(batch)
+                    out_queue.put(("batch", len(batch)))
+                    batch = []
+                    if cancel_event.is_set():
+                        break
+            results.extend(batch)
+            out_queue.put(("cancelled" if cancel_event.is_set() else "done", None))
+        except Exception as e:
+            out_queue.put(("error", e))
+
+    def compare_snapshots(self):
+        if self.scan_thread is not None and self.scan_thread.is_alive():
+            self.log("⏳ A scan is already running.")
+            return
+        from tkinter import filedialog
+        from core.snapshot import SNAPSHOT_EXT, diff_metadata
+
+        filetypes = [("Snapshots", "*." + SNAPSHOT_EXT), ("All files", "*")]
+        old = filedialog.askopenfilename(title="Earlier snapshot", filetypes=filetypes)
+        if not old:
+            return
+        new = filedialog.askopenfilename(title="Later snapshot", filetypes=filetypes)
+        if not new:
+            return
+        try:
+            scan_metadata = diff_metadata(old, new)
+        except Exception as e:
+            self.log(f"❌ {e}")
+            return
+
+        self.stop_watch()
+        self.show_usage(None)
+        self.scan_metadata = scan_metadata
+        self.log(f"🔀 Comparing {os.path.basename(old)} with {os.path.basename(new)}...")
+        self.start_scan_thread(self.diff_worker, dict(scan_metadata), False, False)
+
+    def save_snapshot(self):
+        if self.snapshot_thread is not None and self.snapshot_thread.is_alive():
+            self.log("⏳ A snapshot is already being written.")
+            return
+        if self.scan_thread is not None and self.scan_thread.is_alive():
+            self.log("⏳ Wait for the scan to finish.")
+            return
+        from tkinter import filedialog, messagebox
+        from core.snapshot import SNAPSHOT_EXT
+
+        if self.scan_metadata.get("scan_type") != "FILES" or not self.results_cache:
+            messagebox.showwarning("Snapshot", "Run a file scan first.")
+            return
+        filepath = filedialog.asksaveasfilename(
+            title="Save snapshot", defaultextension="." + SNAPSHOT_EXT,
+            filetypes=[("Snapshots", "*." + SNAPSHOT_EXT)]
+        )
+        if not filepath:
+            return
+        self.snapshot_thread = threading.Thread(
+            target=self.snapshot_worker,
+            args=(filepath, self.results_cache, dict(self.scan_metadata), self.snapshot_queue),
+            daemon=True
+        )
+        self.log("💾 Writing snapshot...")
+        self.snapshot_thread.start()
+        self.after(self.poll_interval, self.poll_snapshot)
+
+    def snapshot_worker(self, filepath, results, scan_metadata, out_queue):
+        """Runs on the snapshot thread, must not touch any widget."""
+        from core.snapshot import write_snapshot
+
+        try:
+            count = write_snapshot(filepath, scan_metadata["folder_path"], results, scan_metadata,
+                                   hashes=scan_metadata.get("duplicate_mode") == "content")
+            out_queue.put(f"💾 Snapshot of {count} files saved to {filepath}")
+        except Exception as e:
+            out_queue.put(f"❌ Snapshot failed: {e}")
+
+    def poll_snapshot(self):
+        try:
+            while True:
+                self.log(self.snapshot_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if self.snapshot_thread.is_alive():
+            self.after(self.poll_interval, self.poll_snapshot)
+
+    def show_usage(self, report):
+        """Swap the result list for the folder size tree (report None: back to the list)."""
+        self.usage_report = report
+        if report is None:
+            if self.usage_tree is not None and self.usage_tree.winfo_ismapped():
+                self.usage_tree.clear()
+                self.usage_tree.pack_forget()
+                self.tree.pack(expand=True, fill="both", padx=5, before=self.nav)
+            return
+        if self.usage_tree is None:
+            from gui.usage_tree import UsageTree
+
+            self.usage_tree = UsageTree(self)
+        self.usage_tree.set_report(report)
+        if not self.usage_tree.winfo_ismapped():
+            self.tree.pack_forget()
+            self.usage_tree.pack(expand=True, fill="both", padx=5, before=self.nav)
+
+    def restore_last_scan(self):
+        """
+        Show the results of the last indexed scan without touching the disk:
+        the index rows as they are, tagged by name (see run_scan's restore).
+        The index is opened on a background thread, the window stays usable
+        meanwhile; a scan started in between wins.
+        """
+        threading.Thread(target=self.restore_worker, args=(self.restore_queue,), daemon=True).start()
+        self.after(self.poll_interval, self.poll_restore)
+
+    def restore_worker(self, out_queue):
+        """Runs on the restore thread, must not touch any widget."""
+        try:
+            from core.index import ScanIndex, DEFAULT_INDEX_PATH
+
+            scan_metadata = None
+            if os.path.exists(DEFAULT_INDEX_PATH):
+                index = ScanIndex()
+                try:
+                    scan_metadata = index.load_last_scan()
+                finally:
+                    index.close()
+            out_queue.put(("done", scan_metadata))
+        except Exception as e:
+            out_queue.put(("error", e))
+
+    def poll_restore(self):
+        try:
+            kind, payload = self.restore_queue.get_nowait()
+        except queue.Empty:
+            self.after(self.poll_interval, self.poll_restore)
+            return
+        startup.mark("index loaded")
+        if kind == "error":
+            self.log(f"⚠️ Could not open scan index: {payload}")
+            return
+        scan_metadata = payload
+        if not scan_metadata or self.scan_thread is not None:
+            return
 
-        self.log(f"✅ Scan complete: {len(self.results_cache)} items found.")
+        if scan_metadata.get("duplicate_mode", "name") != "name" or scan_metadata.get("enrich"):
+            self.log("📂 Restored results are tagged by name and not enriched, scan again for more.")
+            scan_metadata = dict(scan_metadata, duplicate_mode="name", enrich=False)
+        self.scan_metadata = scan_metadata
+        self.folder_path.set(scan_metadata["folder_path"])
+        self.set_extra_folders([r for r in scan_metadata.get("roots", []) if r != scan_metadata["folder_path"]])
+        self.duplicate_mode.set(scan_metadata.get("duplicate_mode", "name"))
+        self.log(f"📂 Loading last scan of {scan_metadata['folder_path']} from index...")
+        self.start_scan_thread(self.scan_worker, dict(scan_metadata), True, True)
+
+    def poll_scan(self):
+        """Drain scan_queue on the Tk main loop and reschedule until the scan ends."""
+        status = None
+        shown_before = len(self.results_cache)
+        try:
+            while True:
+                kind, payload = self.scan_queue.get_nowait()
+                if kind == "batch":
+                    pass  # already appended to results_cache by the worker
+                elif kind == "results":
+                    self.results_cache = payload
+                elif kind == "usage":
+                    self.usage_report = payload
+                elif kind == "log":
+                    self.log(payload)
+                else:
+                    status = (kind, payload)
+                    break
+        except queue.Empty:
+            pass
+
+        if status is None:
+            # Fill the visible window as soon as results arrive, then only
+            # refresh the counters on the progress interval
+            if shown_before < self.tree.visible_rows and len(self.results_cache) > shown_before:
+                self.display_page()
+            now = time.monotonic()
+            if now - self.last_progress >= self.progress_interval and not self.scan_metadata.get("usage"):
+                self.last_progress = now
+                self.log(f"Found {len(self.results_cache)} items...")
+                self.display_page()
+            self.after(self.poll_interval, self.poll_scan)
+            return
+
+        self.finish_scan(*status)
+
+    def finish_scan(self, kind, payload):
+        self.scanning = False
+        self.scan_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+
+        if kind == "error":
+            self.log(f"❌ Scan failed: {payload}")
+            return
+
+        # Precompute the duplicate/unique views once per scan
+        self.index_names()
+        self.build_views()
+
+        elapsed = time.monotonic() - self.scan_started
+        if kind == "cancelled":
+            self.log(f"⛔ Scan cancelled: {len(self.results_cache)} items found in {elapsed:.1f}s.")
+        else:
+            self.log(f"✅ Scan complete: {len(self.results_cache)} items found in {elapsed:.1f}s.")
+            if self.watch_mode.get():
+                self.start_watch()
+        if self.usage_report is not None:
+            self.show_usage(self.usage_report)
         self.display_page()
+        self.report_profile()
+
+    def cancel_scan(self):
+        if self.scan_thread is not None and self.scan_thread.is_alive():
+            self.cancel_event.set()
+            self.log("Cancelling scan...")
+
+    # ---------------- Watch mode ---------------- #
+
+    def toggle_watch(self):
+        if self.watch_mode.get():
+            if self.scan_thread is not None and self.scan_thread.is_alive():
+                return  # started by finish_scan
+            self.start_watch()
+        else:
+            self.stop_watch()
+
+    def start_watch(self):
+        """Keep the finished FILES scan live by watching its folder."""
+        if self.watcher is not None:
+            return
+        if self.scan_metadata.get("scan_type") != "FILES":
+            self.log("👁 Watch mode needs a completed file scan.")
+            return
+        roots = scan_roots(self.scan_metadata)
+        if len(roots) > 1:
+            self.log("👁 Watch mode follows a single folder, not a multi-folder scan.")
+            return
+        from core.watcher import LiveResults, create_watcher
 
-    def apply_filters(self):
-        """Apply duplicate/unique filters to results"""
-        self.current_filter_results = self.results_cache.copy()
+        folder = roots[0]
+        try:
+            self.live = LiveResults(self.results_cache, self.scan_metadata)
+            self.watcher = create_watcher(folder, self.scan_metadata["depth"], self.on_watch_events)
+            self.watcher.start()
+        except OSError as e:
+            self.watcher = self.live = None
+            self.log(f"❌ Could not watch {folder}: {e}")
+            return
+        self.watch_queue = queue.Queue()
+        self.log(f"👁 Watching {folder} ({type(self.watcher).__name__})")
+        self.after(self.watch_poll_interval, self.poll_watch)
 
-        if self.show_duplicates_only.get():
-            self.current_filter_results = [
-                r for r in self.current_filter_results if r.get("is_duplicate", False)
-            ]
-        elif self.show_unique_only.get():
-            self.current_filter_results = [
-                r for r in self.current_filter_results if not r.get("is_duplicate", False)
-            ]
+    def stop_watch(self):
+        if self.watcher is None:
+            return
+        watcher, self.watcher, self.live = self.watcher, None, None
+        watcher.stop()
+        self.log("👁 Stopped watching.")
+
+    def on_watch_events(self, events):
+        """
+        Runs on the watcher thread, must not touch any widget nor the
+        results: the events are applied by poll_watch on the main loop.
+        """
+        if any(kind == "rescan" for kind, _ in events):
+            self.watch_queue.put(("rescan", None))
+        else:
+            self.watch_queue.put(("events", events))
+
+    def poll_watch(self):
+        if self.watcher is None:
+            return
+        changed = False
+        try:
+            while True:
+                kind, events = self.watch_queue.get_nowait()
+                if kind == "rescan":
+                    self.log("👁 Too many changes at once, rescanning...")
+                    self.run_scan()
+                    return
+                try:
+                    added, removed, retagged = self.live.apply(events)
+                except Exception as e:
+                    self.log(f"❌ Watch update failed: {e}")
+                    continue
+                if added or removed or retagged:
+                    changed = True
+                    self.log(f"👁 {added} added, {removed} removed, {retagged} retagged.")
+        except queue.Empty:
+            pass
+        if changed:
+            self.index_names()
+            self.build_views()
+            self.display_page()
+        self.after(self.watch_poll_interval, self.poll_watch)
 
-    def display_page(self):
-        self.tree.delete(*self.tree.get_children())
-        self.apply_filters()
-        
-        start = self.page_index * self.page_size
-        end = start + self.page_size
+    # ---------------- Profiling ---------------- #
 
-        total_pages = (len(self.current_filter_results) + self.page_size - 1) // self.page_size
-        current_page = self.page_index + 1 if self.current_filter_results else 0
-        
-        if hasattr(self, 'page_info'):
-            self.page_info.config(text=f"{current_page}/{total_pages}")
+    def start_profile(self):
+        from core.index import DEFAULT_INDEX_PATH
 
-        for item in self.current_filter_results[start:end]:
-            status = "[DUPLICATE]" if item.get("is_duplicate", False) else "UNIQUE"
-            self.tree.insert("", "end", values=(item["ext"].upper(), status, item["path"]))
+        python = self.profile_python.get()
+        self.profile_session = profiler.Profiler(
+            self.folder_path.get(), python_profile=python, trace_memory=python
+        )
+        self.profile_session.__enter__()
+        self.profile_path = os.path.join(
+            os.path.dirname(DEFAULT_INDEX_PATH), "profiles",
+            time.strftime("scan_%Y%m%d_%H%M%S.json")
+        )
 
-    def next_page(self):
+    def stop_profile(self):
+        if self.profile_session is not None:
+            self.profile_session.__exit__(None, None, None)
+            self.profile_session = None
+
+    def report_profile(self):
+        """Log the stats so far and (re)write the JSON dump."""
+        if self.profile_session is None:
+            return
+        self.profile_session.snapshot()
+        stats = self.profile_session.stats
+        for line in stats.summary():
+            self.log(f"⏱ {line}")
+        try:
+            self.log(f"⏱ Profile written to {stats.dump_json(self.profile_path)}")
+        except OSError as e:
+            self.log(f"❌ Could not write profile: {e}")
+
+    def build_views(self):
+        """Precompute row numbers of the duplicate and unique views."""
+        self.view_indices = build_views(self.results_cache)
+        self.view_mask = (None, None)
+        self.sorted_views = {}
+        if self.search_text.get().strip():
+            self.search_rows = self.search_names()
         self.apply_filters()
-        total_pages = (len(self.current_filter_results) + self.page_size - 1) // self.page_size
-        if self.page_index + 1 < total_pages:
-            self.page_index += 1
-            self.display_page()
+
+    def apply_filters(self):
+        """Apply duplicate/unique filters to results (selects a precomputed view)"""
+        if self.show_duplicates_only.get():
+            name = "duplicates"
+        elif self.show_unique_only.get():
+            name = "unique"
+        else:
+            name = "all"
+        view = self.view_indices[name]
+        sort_key = self.sort_key(self.sort_by) if self.sort_by and not self.scanning else None
+        if sort_key is not None and self.search_rows is None:
+            # Sorted views are kept: switching back and forth is a lookup
+            cached = self.sorted_views.get((name, sort_key, self.sort_reverse))
+            if cached is None:
+                cached = self.sorted_rows(view, sort_key)
+                self.sorted_views[(name, sort_key, self.sort_reverse)] = cached
+            view = cached
+        elif self.search_rows is not None and view is not None:
+            # Narrow the view, keeping the search ranking
+            key, mask = self.view_mask
+            if key is not view:
+                mask = bytearray(len(self.results_cache))
+                for i in view:
+                    mask[i] = 1
+                self.view_mask = (view, mask)
+            view = array("L", (i for i in self.search_rows if i < len(mask) and mask[i]))
+        elif self.search_rows is not None:
+            view = self.search_rows
+        if sort_key is not None and self.search_rows is not None:
+            view = self.sorted_rows(view, sort_key)
+        self.current_view = view
+
+    def on_filter_change(self):
+        self.apply_filters()
+        self.display_page(keep_offset=False)
+
+    # ---------------- Sorting ---------------- #
+
+    def sort_key(self, column):
+        """ResultStore.sort_order key of column, None when the results do not have it."""
+        key = SORT_COLUMNS[column]
+        if key == "status" and self.scan_metadata.get("scan_type") == "DIFF":
+            key = "change"
+        if key in SORT_KEYS or key in self.results_cache.extra:
+            return key
+        return None
+
+    def sort_column(self, column):
+        """Heading click: sort the results by column, a second click reverses."""
+        if self.scanning:
+            self.log("⏳ Results can be sorted once the scan is done.")
+            return
+        if self.sort_key(column) is None:
+            self.log(f"ℹ️ {HEADINGS[column]} is not known for these results (see Read details).")
+            return
+        self.sort_reverse = column == self.sort_by and not self.sort_reverse
+        self.sort_by = column
+        for c, text in HEADINGS.items():
+            arrow = (" ▼" if self.sort_reverse else " ▲") if c == column else ""
+            self.tree.heading(c, text=text + arrow)
+        with profiler.phase("sort"):
+            self.apply_filters()
+        self.display_page(keep_offset=False)
+
+    def export_sort(self):
+        """The sorted column as write_export's sort: csv/jsonl rows come out as shown."""
+        key = self.sort_key(self.sort_by) if self.sort_by else None
+        return (key, self.sort_reverse) if key else None
+
+    def sorted_rows(self, rows, key):
+        """rows (None: all) in the store's cached order for key."""
+        order = self.results_cache.sort_order(key, self.sort_reverse)
+        if rows is None or len(rows) == len(order):
+            return order
+        mask = bytearray(len(self.results_cache))
+        for i in rows:
+            mask[i] = 1
+        return array("L", (i for i in order if mask[i]))
+
+    # ---------------- Search ---------------- #
+
+    def index_names(self):
+        """Bring the name index up to date with results_cache on a background thread."""
+        if self.name_index is None or not self.name_index.is_current(self.results_cache):
+            self.name_index = NameIndex(self.results_cache)
+        if self.index_thread is not None and self.index_thread.is_alive():
+            return  # rows it misses are searched one by one until the next call
+        self.index_thread = threading.Thread(target=self.name_index.update, daemon=True)
+        self.index_thread.start()
+
+    def search_names(self):
+        if self.name_index is None or not self.name_index.is_current(self.results_cache):
+            self.index_names()
+        started = time.perf_counter()
+        with profiler.phase("search"):
+            rows = self.name_index.search(self.search_text.get(), fuzzy=self.search_fuzzy.get())
+        if rows is not None:
+            self.search_info.config(
+                text=f"{len(rows)} matches in {(time.perf_counter() - started) * 1000:.0f} ms"
+            )
+        return rows
+
+    def on_search_change(self):
+        # Wait for a pause in typing, one search per burst of keys
+        if self.search_after is not None:
+            self.after_cancel(self.search_after)
+        self.search_after = self.after(150, self.run_search)
+
+    def run_search(self):
+        self.search_after = None
+        self.search_rows = self.search_names()
+        if self.search_rows is None:
+            self.search_info.config(text="text, folder/name or *.glob")
+        self.apply_filters()
+        self.display_page(keep_offset=False)
+
+    def view_len(self):
+        if self.current_view is None:
+            return len(self.results_cache)
+        return len(self.current_view)
+
+    def view_item(self, i):
+        if self.current_view is None:
+            return self.results_cache[i]
+        return self.results_cache[self.current_view[i]]
+
+    def current_records(self):
+        """Records of the view currently shown (all / duplicates / unique)."""
+        return [self.view_item(i) for i in range(self.view_len())]
+
+    def row_values(self, i):
+        item = self.view_item(i)
+        if item["ext"] == "FOLDER":
+            return ("FOLDER", "-", "", self.modified(item), item["name"])
+        if self.scan_metadata.get("scan_type") == "DIFF":
+            return self.diff_values(item)
+        if "is_duplicate" not in item:
+            status = "-"  # not tagged yet, scan still running
+        elif not item["is_duplicate"]:
+            status = "UNIQUE"
+        elif self.scan_metadata.get("duplicate_mode") == "similar":
+            status = f"[SIMILAR #{item['duplicate_group']}]"
+        else:
+            status = "[DUPLICATE]"
+        return (item["ext"].upper(), status, self.details(item), self.modified(item), item["path"])
+
+    def diff_values(self, item):
+        change = item["change"]
+        if change == "moved":
+            value = f"{item['old_path']} → {item['path']}"
+        else:
+            value = item["path"]
+        if change == "changed" and item["old_size"] != item["size"]:
+            details = f"{format_size(item['old_size'])} → {format_size(item['size'])}"
+        else:
+            details = format_size(item["size"])
+        return (item["ext"].upper(), change.upper(), details, self.modified(item), value)
+
+    def details(self, item):
+        """Size, dimensions and duration of enriched records (see core.enricher)."""
+        parts = []
+        size = item.get("size")
+        if size is not None:
+            parts.append(format_size(size))
+        if item.get("width"):
+            parts.append(f"{item['width']}x{item['height']}")
+        duration = item.get("duration")
+        if duration:
+            minutes, seconds = divmod(int(duration), 60)
+            parts.append(f"{minutes // 60}:{minutes % 60:02d}:{seconds:02d}" if minutes >= 60
+                         else f"{minutes}:{seconds:02d}")
+        return "  ".join(parts)
+
+    @staticmethod
+    def modified(item):
+        mtime = item.get("mtime")
+        return datetime.fromtimestamp(mtime / 1e9).strftime("%Y-%m-%d %H:%M") if mtime else ""
+
+    def update_page_info(self):
+        first, last = self.tree.visible_range()
+        total = self.view_len()
+        self.page_info.config(text=f"{first + 1 if total else 0}-{last} of {total}")
+
+    @profiler.instrumented("display")
+    def display_page(self, keep_offset=True):
+        """Point the virtual tree at the current view; only visible rows are built."""
+        self.tree.set_source(self.view_len(), self.row_values, keep_offset=keep_offset)
+
+    def next_page(self):
+        self.tree.scroll(self.tree.visible_rows)
 
     def prev_page(self):
-        if self.page_index > 0:
-            self.page_index -= 1
-            self.display_page()
+        self.tree.scroll(-self.tree.visible_rows)
 
     def export_results(self):
-        if not self.folder_path.get():
+        from tkinter import messagebox
+        from util.file_utils import export_scan_results
+
+        if not self.folder_path.get() and self.scan_metadata.get("scan_type") != "DIFF":
             messagebox.showwarning("Export", "Please scan a folder first.")
             return
 
@@ -289,12 +992,16 @@ class IdentifyTab(tk.Frame):
 
         try:
             filepath = export_scan_results(
-                self.folder_path.get(), 
+                self.scan_metadata.get("folder_path") or self.folder_path.get(),
                 self.results_cache,
-                self.scan_metadata
+                self.scan_metadata,
+                fmt=self.export_format.get(),
+                compress=self.export_gzip.get(),
+                sort=self.export_sort()
             )
-            messagebox.showinfo("Export Success", f"Results exported to:\n{filepath}")
             self.log(f"📁 Results exported to: {filepath}")
+            self.report_profile()
+            messagebox.showinfo("Export Success", f"Results exported to:\n{filepath}")
         except Exception as e:
             messagebox.showerror("Export Error", f"Failed to export: {str(e)}")
             self.log(f"❌ Export failed: {str(e)}")
@@ -1,10 +1,307 @@
 import tkinter as tk
-from tkinter import ttk
+import queue
+import threading
+import time
+from tkinter import ttk, filedialog, messagebox
+from core.dedup import Deduper, DedupError, KEEP_RULES, METHODS, plan_dedup, plan_summary
+from core.migrator import BulkMigrator, plan_migration, CHECKSUM_MODES, DEFAULT_COPY_WORKERS
+from util.file_utils import format_size
 
 class MigrateTab(tk.Frame):
-    def __init__(self, parent):
+    def __init__(self, parent, identify_tab=None):
         super().__init__(parent)
+        # Source records come from the Identify tab's current view
+        self.identify_tab = identify_tab
 
-        # Widgets for migrating
-        ttk.Label(self, text="Migrate functionality here").pack(pady=10)
-        # Add buttons for move, export, etc.
\ No newline at end of file
+        self.dest_path = tk.StringVar()
+        self.mode = tk.StringVar(value="move")
+        self.keep_structure = tk.BooleanVar(value=True)
+        self.workers = tk.StringVar(value=str(DEFAULT_COPY_WORKERS))
+        self.checksum = tk.StringVar(value=CHECKSUM_MODES[0])
+
+        self.dedup_method = tk.StringVar(value=METHODS[0])
+        self.dedup_keep = tk.StringVar(value=KEEP_RULES[0])
+
+        self.plan = []
+        self.progress_queue = queue.Queue()
+        self.migrate_thread = None
+        self.cancel_event = threading.Event()
+        self.poll_interval = 200  # ms
+
+        self.build_ui()
+
+    # ---------------- UI ---------------- #
+
+    def build_ui(self):
+        ttk.Label(self, text="Migrate scan results").pack(pady=10)
+
+        dest = tk.Frame(self)
+        dest.pack(fill="x", padx=5)
+        tk.Button(dest, text="Select Destination", command=self.select_destination).pack(side="left", padx=5)
+        tk.Label(dest, textvariable=self.dest_path).pack(side="left", padx=5)
+
+        opts = tk.LabelFrame(self, text="Options")
+        opts.pack(fill="x", padx=5, pady=5)
+        tk.Radiobutton(opts, text="Move", variable=self.mode, value="move").pack(side="left", padx=5)
+        tk.Radiobutton(opts, text="Copy", variable=self.mode, value="copy").pack(side="left", padx=5)
+        tk.Checkbutton(opts, text="Keep folder structure", variable=self.keep_structure).pack(side="left", padx=5)
+        tk.Label(opts, text="Parallel copies:").pack(side="left", padx=5)
+        ttk.Combobox(opts, values=["1", "2", "4", "8", "16"], textvariable=self.workers,
+                     state="readonly", width=3).pack(side="left")
+        tk.Label(opts, text="Checksums:").pack(side="left", padx=(10, 2))
+        ttk.Combobox(opts, values=list(CHECKSUM_MODES), textvariable=self.checksum,
+                     state="readonly", width=8).pack(side="left")
+
+        buttons = tk.Frame(self)
+        buttons.pack(pady=5)
+        tk.Button(buttons, text="Plan", command=self.make_plan).pack(side="left", padx=5)
+        self.start_button = tk.Button(buttons, text="Start / Resume", command=self.start_migration)
+        self.start_button.pack(side="left", padx=5)
+        self.cancel_button = tk.Button(buttons, text="Cancel", command=self.cancel_migration, state="disabled")
+        self.cancel_button.pack(side="left", padx=5)
+
+        dedup = tk.LabelFrame(self, text="Deduplicate (content duplicates of the Identify tab)")
+        dedup.pack(fill="x", padx=5, pady=5)
+        for method in METHODS:
+            tk.Radiobutton(dedup, text=method.capitalize(), variable=self.dedup_method,
+                           value=method).pack(side="left", padx=5)
+        tk.Label(dedup, text="Keep:").pack(side="left", padx=(10, 2))
+        ttk.Combobox(dedup, values=list(KEEP_RULES), textvariable=self.dedup_keep,
+                     state="readonly", width=7).pack(side="left")
+        tk.Button(dedup, text="Dry Run", command=lambda: self.start_dedup(dry_run=True)).pack(side="left", padx=5)
+        self.dedup_button = tk.Button(dedup, text="Deduplicate", command=self.start_dedup)
+        self.dedup_button.pack(side="left", padx=5)
+        tk.Button(dedup, text="Undo Last", command=self.undo_dedup).pack(side="left", padx=5)
+
+        self.progress = ttk.Progressbar(self, mode="determinate")
+        self.progress.pack(fill="x", padx=5, pady=5)
+        self.throughput = tk.Label(self, text="")
+        self.throughput.pack()
+
+        status = tk.LabelFrame(self, text="Migration Status")
+        status.pack(expand=True, fill="both", padx=5, pady=5)
+        self.status_text = tk.Text(status, height=8, state="disabled")
+        self.status_text.pack(expand=True, fill="both")
+
+    # ---------------- Logic ---------------- #
+
+    def log(self, msg):
+        self.status_text.config(state="normal")
+        self.status_text.insert("end", msg + "\n")
+        self.status_text.see("end")
+        self.status_text.config(state="disabled")
+
+    def select_destination(self):
+        path = filedialog.askdirectory()
+        if path:
+            self.dest_path.set(path)
+
+    def make_plan(self):
+        if self.identify_tab is None or not self.identify_tab.results_cache:
+            messagebox.showwarning("Migrate", "No scan results. Run a scan in the Identify tab first.")
+            return False
+        if not self.dest_path.get():
+            messagebox.showwarning("Migrate", "Please select a destination folder.")
+            return False
+
+        records = self.identify_tab.current_records()
+        base_path = self.identify_tab.folder_path.get() if self.keep_structure.get() else None
+        try:
+            self.plan = plan_migration(records, self.dest_path.get(), self.mode.get(), base_path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Migrate", f"Could not plan migration: {e}")
+            return False
+
+        renames = sum(1 for op in self.plan if op["rename"])
+        total = sum(op["size"] for op in self.plan)
+        self.log(f"📋 Planned {len(self.plan)} files ({total / 1e6:.1f} MB): "
+                 f"{renames} same-device renames, {len(self.plan) - renames} copies.")
+        return True
+
+    def start_migration(self):
+        if self.migrate_thread is not None and self.migrate_thread.is_alive():
+            return
+        if not self.make_plan() or not self.plan:
+            return
+
+        migrator = BulkMigrator(self.mode.get(), workers=int(self.workers.get()), checksum=self.checksum.get())
+        self.cancel_event = threading.Event()
+        self.progress_queue = queue.Queue()
+        self.progress.config(maximum=max(1, len(self.plan)), value=0)
+        self.start_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+
+        self.migrate_thread = threading.Thread(
+            target=self.migrate_worker,
+            args=(migrator, self.plan, self.cancel_event, self.progress_queue),
+            daemon=True
+        )
+        self.migrate_thread.start()
+        self.after(self.poll_interval, self.poll_migration)
+
+    def migrate_worker(self, migrator, plan, cancel_event, out_queue):
+        """Runs on the migration thread, must not touch any widget."""
+        try:
+            stats = migrator.run(plan, progress_cb=lambda s: out_queue.put(("progress", dict(s))),
+                                 cancel_event=cancel_event)
+            out_queue.put(("done", stats))
+        except Exception as e:
+            out_queue.put(("error", e))
+
+    def poll_migration(self):
+        """Show the newest progress snapshot; older ones in the queue are dropped."""
+        latest = None
+        finished = None
+        try:
+            while True:
+                kind, payload = self.progress_queue.get_nowait()
+                if kind == "progress":
+                    latest = payload
+                else:
+                    finished = (kind, payload)
+        except queue.Empty:
+            pass
+
+        if latest:
+            self.show_progress(latest)
+        if finished:
+            self.finish_migration(*finished)
+        else:
+            self.after(self.poll_interval, self.poll_migration)
+
+    def show_progress(self, stats):
+        elapsed = max(time.monotonic() - stats["started"], 1e-6)
+        done = stats["files_done"] + stats["failed"]
+        self.progress.config(value=done)
+        self.throughput.config(
+            text=f"{done}/{stats['files_total']} files  "
+                 f"{stats['files_done'] / elapsed:.1f} files/s  "
+                 f"{stats['bytes_done'] / elapsed / 1e6:.1f} MB/s"
+        )
+
+    def finish_migration(self, kind, payload):
+        self.start_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+        if kind == "error":
+            self.log(f"❌ Migration failed: {payload}")
+            return
+
+        self.show_progress(payload)
+        if payload["skipped"]:
+            self.log(f"↪ {payload['skipped']} files were already done (journal), skipped.")
+        for error in payload["errors"][:20]:
+            self.log(f"❌ {error}")
+        state = "cancelled" if self.cancel_event.is_set() else "complete"
+        self.log(f"✅ Migration {state}: {payload['files_done']} files, "
+                 f"{payload['bytes_done'] / 1e6:.1f} MB in {payload['elapsed']:.1f}s, "
+                 f"{payload['failed']} failed.")
+        if payload["verified"]:
+            self.log(f"🔒 {payload['verified']} copies verified against their source.")
+        if payload["manifest"]:
+            self.log(f"🧾 Checksums: {payload['manifest']}")
+
+    # ---------------- Dedup ---------------- #
+
+    def start_dedup(self, dry_run=False):
+        if self.migrate_thread is not None and self.migrate_thread.is_alive():
+            return
+        tab = self.identify_tab
+        if tab is None or not tab.results_cache or tab.scan_metadata.get("duplicate_mode") != "content":
+            messagebox.showwarning("Deduplicate", "Run a scan with content duplicate matching first.")
+            return
+        if not dry_run and not messagebox.askyesno(
+                "Deduplicate", f"Replace duplicates by {self.dedup_method.get()}s? "
+                               "Run a dry run first to see what changes."):
+            return
+
+        self.cancel_event = threading.Event()
+        self.progress_queue = queue.Queue()
+        self.progress.config(value=0)
+        self.dedup_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        self.migrate_thread = threading.Thread(
+            target=self.dedup_worker,
+            args=(tab.current_records(), self.dedup_method.get(), self.dedup_keep.get(), dry_run,
+                  self.cancel_event, self.progress_queue),
+            daemon=True
+        )
+        self.log("🔑 Checking duplicate groups..." if dry_run else "🔗 Deduplicating...")
+        self.migrate_thread.start()
+        self.after(self.poll_interval, self.poll_dedup)
+
+    def dedup_worker(self, records, method, keep, dry_run, cancel_event, out_queue):
+        """Runs on the migration thread, must not touch any widget."""
+        try:
+            plan = plan_dedup(records, method, keep)
+            out_queue.put(("plan", plan_summary(plan)))
+            stats = Deduper(method).apply(plan, dry_run=dry_run,
+                                          progress_cb=lambda s: out_queue.put(("progress", dict(s))),
+                                          cancel_event=cancel_event)
+            out_queue.put(("done", stats))
+        except Exception as e:
+            out_queue.put(("error", e))
+
+    def poll_dedup(self):
+        finished = None
+        try:
+            while True:
+                kind, payload = self.progress_queue.get_nowait()
+                if kind == "plan":
+                    counts = ", ".join(f"{n} {status}" for status, n in payload["counts"].items())
+                    self.log(f"📋 {payload['files']} duplicates in {payload['groups']} groups, "
+                             f"{format_size(payload['reclaim'])} reclaimable ({counts or 'nothing to do'}).")
+                    self.progress.config(maximum=max(1, payload["files"]))
+                elif kind == "progress":
+                    self.progress.config(value=payload["files_done"] + payload["failed"])
+                else:
+                    finished = (kind, payload)
+        except queue.Empty:
+            pass
+        if finished:
+            self.finish_dedup(*finished)
+        else:
+            self.after(self.poll_interval, self.poll_dedup)
+
+    def finish_dedup(self, kind, payload):
+        self.dedup_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+        if kind == "error":
+            self.log(f"❌ Dedup failed: {payload}")
+            return
+        if kind == "undone":
+            self.log(f"↩ {payload} files restored as independent copies.")
+            return
+        for error in payload["errors"][:20]:
+            self.log(f"❌ {error}")
+        if payload["dry_run"]:
+            self.log(f"🧪 Dry run: {payload['files_done']} files would be linked, "
+                     f"{format_size(payload['bytes_reclaimed'])} reclaimed.")
+            return
+        self.progress.config(value=payload["files_done"] + payload["failed"])
+        self.log(f"✅ Dedup: {payload['files_done']} files linked in {payload['groups_done']} groups, "
+                 f"{format_size(payload['bytes_reclaimed'])} reclaimed, {payload['failed']} failed.")
+        if payload["journal"]:
+            self.log(f"↩ Undo journal: {payload['journal']}")
+
+    def undo_dedup(self):
+        if self.migrate_thread is not None and self.migrate_thread.is_alive():
+            return
+        if not messagebox.askyesno("Deduplicate", "Turn the links of the last dedup run back into copies?"):
+            return
+        self.progress_queue = queue.Queue()
+        self.migrate_thread = threading.Thread(target=self.undo_worker, args=(self.progress_queue,), daemon=True)
+        self.log("↩ Restoring copies...")
+        self.migrate_thread.start()
+        self.after(self.poll_interval, self.poll_dedup)
+
+    def undo_worker(self, out_queue):
+        """Runs on the migration thread: copying files back takes as long as copying them."""
+        try:
+            out_queue.put(("undone", Deduper().undo()))
+        except (OSError, DedupError) as e:
+            out_queue.put(("error", e))
+
+    def cancel_migration(self):
+        if self.migrate_thread is not None and self.migrate_thread.is_alive():
+            self.cancel_event.set()
+            self.log("Cancelling migration (files in flight will finish)...")
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+import unittest
+
+from core.dedup import Deduper, plan_dedup
+from core.hasher import HashCache
+
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class DeduperTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.journals = os.path.join(self.dir, "journals")
+        self.paths = [os.path.join(self.dir, name) for name in ("a", "b", "c")]
+        for path in self.paths:
+            _write(path, b"same bytes" * 100)
+        _write(os.path.join(self.dir, "other"), b"different")
+        self.cache = HashCache(":memory:")
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def plan(self):
+        records = [{"path": p, "is_duplicate": True, "duplicate_group": 1} for p in self.paths]
+        return plan_dedup(records, keep="first", cache=self.cache)
+
+    def inodes(self):
+        return [os.stat(p).st_ino for p in self.paths]
+
+    def test_plan_keeps_one_file(self):
+        plan = self.plan()
+        self.assertEqual([op["status"] for op in plan], ["ok", "ok"])
+        self.assertEqual(set(op["keep"] for op in plan), {self.paths[0]})
+
+    def test_dry_run_changes_nothing(self):
+        before = self.inodes()
+        stats = Deduper(journal_dir=self.journals).apply(self.plan(), dry_run=True)
+        self.assertEqual(stats["files_done"], 2)
+        self.assertIsNone(stats["journal"])
+        self.assertEqual(self.inodes(), before)
+
+    def test_apply_links_and_undo_restores(self):
+        before = self.inodes()
+        deduper = Deduper(journal_dir=self.journals)
+        stats = deduper.apply(self.plan())
+        self.assertEqual((stats["files_done"], stats["failed"]), (2, 0))
+        self.assertEqual(len(set(self.inodes())), 1)
+
+        self.assertEqual(deduper.undo(), 2)
+        inodes = self.inodes()
+        self.assertEqual(len(set(inodes)), 3)
+        self.assertEqual(inodes[0], before[0])
+        for path in self.paths:
+            self.assertEqual(_read(path), b"same bytes" * 100)
+        self.assertTrue(os.path.exists(stats["journal"] + ".undone"))
+
+    def test_changed_group_is_skipped(self):
+        plan = self.plan()
+        _write(self.paths[2], b"same bytes" * 99 + b"edited!!!!")
+        stats = Deduper(journal_dir=self.journals).apply(plan)
+        self.assertEqual((stats["files_done"], stats["failed"]), (0, 2))
+        self.assertEqual(len(set(self.inodes())), 3)
+
+    def test_undo_skips_a_journaled_file_that_was_never_linked(self):
+        deduper = Deduper(journal_dir=self.journals)
+        replace = deduper._replace
+        calls = []
+
+        def crash_on_second(op):
+            calls.append(op)
+            if len(calls) == 2:
+                raise OSError("crash after journaling")
+            replace(op)
+
+        deduper._replace = crash_on_second
+        stats = deduper.apply(self.plan())
+        self.assertEqual((stats["files_done"], stats["failed"]), (1, 1))
+        with open(stats["journal"], encoding="utf-8") as f:
+            self.assertEqual(len([json.loads(line) for line in f]), 2)
+        self.assertEqual(deduper.undo(stats["journal"]), 1)
+        self.assertEqual(len(set(self.inodes())), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+from core.editor import Editor, _order_renames, build_rename_plan
+
+
+def _touch(path, text=""):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+class RenamePlanTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def records(self, *names):
+        for name in names:
+            _touch(os.path.join(self.dir, name))
+        return [{"name": name, "path": os.path.join(self.dir, name)} for name in names]
+
+    def test_two_files_with_one_target_collide(self):
+        plan = build_rename_plan(self.records("a1.txt", "a2.txt"), pattern=r"\d", replacement="")
+        self.assertEqual(sorted(op["status"] for op in plan), ["collision", "ok"])
+
+    def test_target_on_disk_collides(self):
+        records = self.records("old.txt")
+        _touch(os.path.join(self.dir, "new.txt"))
+        plan = build_rename_plan(records, pattern="old", replacement="new")
+        self.assertEqual(plan[0]["status"], "collision")
+
+    def test_target_renamed_away_is_free(self):
+        plan = build_rename_plan(self.records("a.txt", "b.txt"), pattern="^(.)$",
+                                 replacement=lambda m: {"a": "b", "b": "c"}[m.group(1)])
+        self.assertEqual([op["status"] for op in plan], ["ok", "ok"])
+
+    def test_cycle_goes_through_a_temporary_name(self):
+        a, b, c = (os.path.join(self.dir, n) for n in "abc")
+        steps = _order_renames([{"src": a, "dst": b}, {"src": b, "dst": c}, {"src": c, "dst": a}])
+        self.assertEqual(len(steps), 4)
+        self.assertNotIn(steps[0][1], (a, b, c))
+        # Replayed in order, no step overwrites a file that is still there
+        files = {a: "A", b: "B", c: "C"}
+        for src, dst in steps:
+            self.assertNotIn(dst, files)
+            files[dst] = files.pop(src)
+        self.assertEqual(files, {b: "A", c: "B", a: "C"})
+
+    def test_apply_and_undo_a_swap(self):
+        a, b = os.path.join(self.dir, "a"), os.path.join(self.dir, "b")
+        _touch(a, "A")
+        _touch(b, "B")
+        plan = [{"src": a, "dst": b, "status": "ok"}, {"src": b, "dst": a, "status": "ok"}]
+        journals = os.path.join(self.dir, "journals")
+        editor = Editor()
+        journal, renamed = editor.apply_renames(plan, journal_dir=journals)
+        self.assertEqual(renamed, 2)
+        self.assertEqual((_read(a), _read(b)), ("B", "A"))
+        self.assertEqual(editor.undo(journal), 3)
+        self.assertEqual((_read(a), _read(b)), ("A", "B"))
+        self.assertEqual(sorted(os.listdir(self.dir)), ["a", "b", "journals"])
+
+    def test_undo_skips_a_step_that_never_ran(self):
+        a, b = os.path.join(self.dir, "a"), os.path.join(self.dir, "b")
+        _touch(b, "B")
+        journal = os.path.join(self.dir, "rename.jsonl")
+        with open(journal, "w", encoding="utf-8") as f:
+            f.write('{"src": "%s", "dst": "%s"}\n{"src": "%s", "dst": "%s"}\n{"src": "x", "d'
+                    % (a, b, b, os.path.join(self.dir, "c")))
+        self.assertEqual(Editor().undo(journal), 1)
+        self.assertEqual(_read(a), "B")
+
+
+if __name__ == "__main__":
+    unittest.main()
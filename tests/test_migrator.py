@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.migrator import JOURNAL_NAME, BulkMigrator, plan_migration
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(data)
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+class BulkMigratorResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "src")
+        self.dest = os.path.join(self.tmp.name, "dest")
+        os.makedirs(self.dest)
+        # Two files called same.txt: flat plans number the second one
+        self.records = []
+        for folder, name in (("a", "one.txt"), ("a", "same.txt"), ("b", "same.txt"), ("b", "two.txt")):
+            path = os.path.join(self.src, folder, name)
+            _write(path, f"{folder}/{name}")
+            self.records.append({"path": path})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_flat_names_do_not_collide(self):
+        plan = plan_migration(self.records, self.dest, mode="copy")
+        names = sorted(os.path.basename(op["dst"]) for op in plan)
+        self.assertEqual(names, ["one.txt", "same (1).txt", "same.txt", "two.txt"])
+
+    def test_resume_skips_journaled_files(self):
+        plan = plan_migration(self.records, self.dest, mode="copy")
+        first = BulkMigrator(mode="copy", workers=2).run(plan[:2])
+        self.assertEqual((first["files_done"], first["failed"]), (2, 0))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, JOURNAL_NAME)))
+
+        # Planned again after the interruption: same names, done files skipped
+        replan = plan_migration(self.records, self.dest, mode="copy")
+        self.assertEqual([op["dst"] for op in replan], [op["dst"] for op in plan])
+        second = BulkMigrator(mode="copy", workers=2).run(replan)
+        self.assertEqual((second["skipped"], second["files_done"], second["failed"]), (2, 2, 0))
+        for op in plan:
+            self.assertEqual(_read(op["dst"]), _read(op["src"]))
+        self.assertFalse([n for n in os.listdir(self.dest) if n.endswith(".part")])
+
+    def test_copy_finished_before_its_journal_line_is_skipped(self):
+        plan = plan_migration(self.records, self.dest, mode="move")
+        # A crash between the final rename and the journal write
+        shutil.copy2(plan[0]["src"], plan[0]["dst"])
+        stats = BulkMigrator(mode="move").run(plan)
+        self.assertEqual((stats["files_done"], stats["failed"]), (4, 0), stats["errors"])
+        self.assertFalse(any(os.path.exists(op["src"]) for op in plan))
+        self.assertEqual(_read(plan[0]["dst"]), "a/one.txt")
+
+    def test_other_file_at_destination_is_not_overwritten(self):
+        plan = plan_migration(self.records, self.dest, mode="copy")
+        _write(plan[0]["dst"], "someone else's file")
+        stats = BulkMigrator(mode="copy").run(plan)
+        self.assertEqual(stats["failed"], 1)
+        self.assertEqual(_read(plan[0]["dst"]), "someone else's file")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from core.results import ResultStore
+
+
+def _records(names):
+    return [{"name": name, "ext": "txt", "path": f"/data/{name}", "size": i}
+            for i, name in enumerate(names)]
+
+
+class ResultStoreRemoveTest(unittest.TestCase):
+    def setUp(self):
+        self.store = ResultStore(_records(["a.txt", "b.txt", "c.txt", "d.txt"]))
+
+    def test_remove_leaves_a_tombstone(self):
+        self.store.remove(1)
+        self.store.remove(1)  # twice is once
+        self.assertEqual(len(self.store), 4)
+        self.assertEqual(self.store.live_count(), 3)
+        self.assertTrue(self.store.is_removed(1))
+        self.assertEqual([r["name"] for r in self.store], ["a.txt", "c.txt", "d.txt"])
+        self.assertEqual(list(self.store.sort_order("name")), [0, 2, 3])
+
+    def test_compact_drops_tombstones_and_renumbers(self):
+        self.store.remove(0)
+        self.store.remove(2)
+        keep = self.store.compact()
+        self.assertEqual(list(keep), [1, 3])
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(self.store.removed, 0)
+        self.assertEqual(self.store.compactions, 1)
+        self.assertEqual([self.store.path(i) for i in range(2)], ["/data/b.txt", "/data/d.txt"])
+        self.assertEqual([self.store[i]["size"] for i in range(2)], [1, 3])
+        self.assertEqual(list(self.store.sort_order("path", reverse=True)), [1, 0])
+
+    def test_rows_appended_after_compact(self):
+        self.store.remove(3)
+        self.store.compact()
+        self.store.append({"name": "e.txt", "ext": "txt", "path": "/other/e.txt"})
+        self.assertEqual(self.store.path(3), "/other/e.txt")
+        self.assertIsNone(self.store[3].get("size"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+from core.filters import ScanFilter
+from core.scanner import _parallel_walk, scan_files
+
+
+def _walk_files(base, max_depth):
+    """Files os.walk finds in folders at most max_depth levels below base."""
+    found = set()
+    for folder, dirs, files in os.walk(base):
+        depth = 0 if folder == base else os.path.relpath(folder, base).count(os.sep) + 1
+        if depth >= max_depth:
+            dirs[:] = []
+        found.update(os.path.join(folder, name) for name in files)
+    return found
+
+
+class ParallelWalkTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.base = cls.tmp.name
+        # Files at every level of a tree four folders deep, two wide
+        for a in "xy":
+            for b in "xy":
+                for c in "xy":
+                    os.makedirs(os.path.join(cls.base, a, b, c, "d"))
+        for folder, _, _ in os.walk(cls.base):
+            for i in range(3):
+                with open(os.path.join(folder, f"f{i}.txt"), "w") as f:
+                    f.write(folder)
+        os.symlink(os.path.join(cls.base, "x"), os.path.join(cls.base, "y", "link"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_depths_match_os_walk(self):
+        for max_depth in range(6):
+            for workers in (1, 4):
+                with self.subTest(max_depth=max_depth, workers=workers):
+                    results = scan_files(self.base, [], max_depth, workers=workers)
+                    found = [r["path"] for r in results]
+                    self.assertEqual(len(found), len(set(found)))
+                    self.assertEqual(set(found), _walk_files(self.base, max_depth))
+
+    def test_walk_yields_one_batch_per_folder(self):
+        batches = [b for b in _parallel_walk([([self.base], 3)], 1, ScanFilter()) if b]
+        folders = sorted(os.path.dirname(b[0]["path"]) for b in batches)
+        self.assertEqual(folders, sorted([self.base] + [os.path.join(self.base, n) for n in "xy"]))
+
+    def test_worker_error_is_raised(self):
+        class Broken(ScanFilter):
+            def match_name(self, name, ext):
+                raise RuntimeError("bad rule")
+
+        with self.assertRaises(RuntimeError):
+            list(_parallel_walk([([self.base], 2)], 2, Broken()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+from core.snapshot import diff_snapshots, write_snapshot
+
+ROOT = "/data"
+
+
+def _record(rel, size, mtime):
+    return {"ext": "bin", "path": f"{ROOT}/{rel}", "size": size, "mtime": mtime}
+
+
+class DiffSnapshotsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def diff(self, old, new, buffer_rows=2):
+        paths = []
+        for name, records in (("old", old), ("new", new)):
+            path = os.path.join(self.tmp.name, f"{name}.snap.gz")
+            write_snapshot(path, ROOT, records, buffer_rows=buffer_rows)
+            paths.append(path)
+        return list(diff_snapshots(*paths, buffer_rows=buffer_rows))
+
+    def test_moves_are_paired_by_size_and_mtime(self):
+        changes = self.diff(
+            [_record("a/one.bin", 10, 1), _record("a/two.bin", 20, 2), _record("keep.bin", 5, 5)],
+            [_record("b/one.bin", 10, 1), _record("b/renamed.bin", 20, 2), _record("keep.bin", 5, 5)],
+        )
+        moves = sorted((c["old_path"], c["path"]) for c in changes if c["change"] == "moved")
+        self.assertEqual(moves, [("a/one.bin", "b/one.bin"), ("a/two.bin", "b/renamed.bin")])
+        self.assertEqual(len(changes), 2)
+
+    def test_same_name_is_preferred_among_equal_keys(self):
+        changes = self.diff(
+            [_record("x/report.txt", 7, 3), _record("x/notes.txt", 7, 3)],
+            [_record("y/notes.txt", 7, 3), _record("y/report.txt", 7, 3)],
+        )
+        moves = sorted((c["old_path"], c["path"]) for c in changes if c["change"] == "moved")
+        self.assertEqual(moves, [("x/notes.txt", "y/notes.txt"), ("x/report.txt", "y/report.txt")])
+
+    def test_changed_added_removed_and_empty_files(self):
+        changes = self.diff(
+            [_record("same.bin", 1, 1), _record("gone.bin", 2, 2), _record("empty_a", 0, 9)],
+            [_record("same.bin", 3, 4), _record("new.bin", 5, 5), _record("empty_b", 0, 9)],
+        )
+        kinds = sorted((c["change"], c["path"] or c["old_path"]) for c in changes)
+        self.assertEqual(kinds, [("added", "empty_b"), ("added", "new.bin"), ("changed", "same.bin"),
+                                 ("removed", "empty_a"), ("removed", "gone.bin")])
+
+    def test_unmatched_rows_spill_and_still_pair(self):
+        old = [_record(f"old/{i:03d}.bin", 100 + i, i) for i in range(50)]
+        new = [_record(f"new/{i:03d}.bin", 100 + i, i) for i in range(50)]
+        changes = self.diff(old, new, buffer_rows=4)
+        self.assertEqual(len(changes), 50)
+        self.assertTrue(all(c["change"] == "moved" and c["old_path"][4:] == c["path"][4:] for c in changes))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,16 @@
+# Option values shared by the core modules, the GUI tabs and the CLI.
+# No imports: the CLI and the tabs read these without loading the modules
+# that implement them.
+
+# tag_duplicates modes (core.scanner)
+DUPLICATE_MODES = ("name", "content", "similar")
+
+# Perceptual hashes of the "similar" mode (core.similarity)
+HASH_METHODS = ("dhash", "phash")
+
+# Result views, same meaning as the IdentifyTab filter checkboxes
+# (core.pipeline, core.index)
+VIEWS = ("all", "duplicates", "unique")
+
+# Export formats, by file extension (util.exporter)
+EXPORT_FORMATS = ("txt", "csv", "jsonl")
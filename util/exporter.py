@@ -0,0 +1,384 @@
+import csv
+import gzip
+import heapq
+import io
+import json
+import pickle
+import tempfile
+from datetime import datetime
+
+from util.constants import EXPORT_FORMATS
+
+# Rows kept in memory per sort run before spilling to a temp file
+SORT_BUFFER_ROWS = 200_000
+
+# Output buffer for the export file
+WRITE_BUFFER = 1024 * 1024
+
+BASE_COLUMNS = ["name", "ext", "path", "is_duplicate", "duplicate_count", "duplicate_group"]
+
+# Report labels of the extra scan filters (scan_metadata["filters"])
+FILTER_LABELS = {
+    "include": "Include",
+    "exclude": "Exclude",
+    "min_size": "Min Size",
+    "max_size": "Max Size",
+    "newer_than": "Modified After",
+    "older_than": "Modified Before",
+    "prune": "Skipped Folders",
+}
+
+
+class ExternalSorter:
+    """
+    Sort rows that may not fit in memory.
+    Rows are buffered up to buffer_rows, then each sorted run is spilled to a
+    temp file; iterating merges all runs with heapq.merge. Small inputs never
+    touch the disk.
+    """
+
+    def __init__(self, key=None, buffer_rows=SORT_BUFFER_ROWS):
+        self.key = key
+        self.buffer_rows = buffer_rows
+        self.buffer = []
+        self.runs = []
+        self.count = 0
+
+    def add(self, row):
+        self.buffer.append(row)
+        self.count += 1
+        if len(self.buffer) >= self.buffer_rows:
+            self._spill()
+
+    def _spill(self):
+        self.buffer.sort(key=self.key)
+        run = tempfile.TemporaryFile()
+        pickler = pickle.Pickler(run, protocol=pickle.HIGHEST_PROTOCOL)
+        for row in self.buffer:
+            pickler.dump(row)
+            pickler.clear_memo()  # the memo would keep every row alive
+        run.seek(0)
+        self.runs.append(run)
+        self.buffer = []
+
+    def _read_run(self, run):
+        # One load per row: an Unpickler's memo would hold every row of the run
+        reader = io.BufferedReader(run, WRITE_BUFFER)
+        while True:
+            try:
+                yield pickle.load(reader)
+            except EOFError:
+                return
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        self.buffer.sort(key=self.key)
+        if not self.runs:
+            yield from self.buffer
+            return
+        streams = [self._read_run(run) for run in self.runs] + [iter(self.buffer)]
+        try:
+            yield from heapq.merge(*streams, key=self.key)
+        finally:
+            for run in self.runs:
+                run.close()
+            self.runs = []
+
+
+class _RowView:
+    """
+    Fields of ResultStore rows in a given order: sized and iterable like an
+    ExternalSorter, for stores that have the order cached. Yields the value
+    of a single key, else tuples.
+    """
+
+    def __init__(self, results, rows, *keys):
+        self.rows = rows
+        get = results.get_field
+        if len(keys) == 1:
+            key = keys[0]
+            self.fn = lambda i: get(i, key)
+        else:
+            self.fn = lambda i: tuple([get(i, k) for k in keys])
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return map(self.fn, self.rows)
+
+
+def _open_output(filepath, compress):
+    if compress:
+        return gzip.open(filepath, "wt", encoding="utf-8", newline="")
+    return open(filepath, "w", encoding="utf-8", newline="", buffering=WRITE_BUFFER)
+
+
+def _columns(results):
+    """Column names for machine-readable exports: base fields plus any extras."""
+    if hasattr(results, "field_names"):
+        return list(results.field_names())
+    columns = list(BASE_COLUMNS)
+    for item in results[:1]:
+        columns.extend(k for k in item if k not in columns)
+    return columns
+
+
+def _ordered(results, order):
+    """Records of results, in order (row numbers) when given."""
+    return results if order is None else map(results.__getitem__, order)
+
+
+def write_csv(f, results, order=None):
+    columns = _columns(results)
+    writer = csv.writer(f)
+    writer.writerow(columns)
+    writer.writerows([item.get(c, "") for c in columns] for item in _ordered(results, order))
+
+
+def write_jsonl(f, results, order=None):
+    columns = _columns(results)
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    lines = []
+    for item in _ordered(results, order):
+        lines.append(dumps({c: item.get(c) for c in columns}))
+        if len(lines) >= 10_000:
+            f.write("\n".join(lines) + "\n")
+            lines = []
+    if lines:
+        f.write("\n".join(lines) + "\n")
+
+
+def write_txt(f, folder_path, results, scan_metadata, buffer_rows=SORT_BUFFER_ROWS):
+    """
+    Human-readable report. One pass over results feeds three external sorts
+    (scanned names, duplicates, unique files); each section is then streamed
+    out in order. A ResultStore is written in its cached orders instead
+    (ResultStore.sort_order), which the results view may have built already.
+    """
+    scan_type = scan_metadata.get("scan_type", "UNKNOWN")
+    folders_only = scan_type == "FOLDERS_ONLY"
+    scanned_items = scan_metadata.get("scanned_items")
+
+    if hasattr(results, "sort_order") and scanned_items is None:
+        by_name = results.sort_order("name")
+        total = len(by_name)
+        names = _RowView(results, by_name, "name")
+        if folders_only:
+            duplicates = _RowView(results, (), "name")
+            unique = _RowView(results, by_name, "name", "path")
+        else:
+            duplicate_rows, unique_rows = results.duplicate_order("name")
+            duplicates = _RowView(results, duplicate_rows,
+                                  "duplicate_group", "name", "path", "ext", "duplicate_count")
+            unique = _RowView(results, unique_rows, "name", "path", "ext")
+        duplicate_groups = {results.get_field(i, "duplicate_group") or results.get_field(i, "name")
+                            for i in duplicates.rows}
+    else:
+        names, duplicates, unique, duplicate_groups, total = _sort_sections(
+            results, folders_only, scanned_items, buffer_rows)
+
+    _write_txt_report(f, folder_path, scan_metadata, folders_only, names, duplicates, unique,
+                      duplicate_groups, total)
+
+
+def _sort_sections(results, folders_only, scanned_items, buffer_rows):
+    """write_txt's sections of any iterable of records, through external sorts."""
+    names = ExternalSorter(buffer_rows=buffer_rows)
+    duplicates = ExternalSorter(buffer_rows=buffer_rows)
+    unique = ExternalSorter(buffer_rows=buffer_rows)
+    duplicate_groups = set()
+    total = 0
+
+    for item in results:
+        total += 1
+        name = item["name"]
+        if scanned_items is None:
+            names.add(name)
+        if folders_only:
+            unique.add((name, item["path"]))
+        elif item.get("is_duplicate", False):
+            group = item.get("duplicate_group") or name
+            duplicate_groups.add(group)
+            duplicates.add((item.get("duplicate_group", 0), name, item["path"], item["ext"],
+                            item.get("duplicate_count", 0)))
+        else:
+            unique.add((name, item["path"], item["ext"]))
+    if scanned_items is not None:
+        for name in scanned_items:
+            names.add(name)
+    return names, duplicates, unique, duplicate_groups, total
+
+
+def _write_txt_report(f, folder_path, scan_metadata, folders_only, names, duplicates, unique,
+                      duplicate_groups, total):
+    scan_type = scan_metadata.get("scan_type", "UNKNOWN")
+    out = []
+    write = out.append
+
+    def flush(force=False):
+        if force or len(out) >= 4096:
+            f.write("".join(out))
+            out.clear()
+
+    write(f"Scan Results for: {folder_path}\n")
+    write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    write(f"Scan Type: {scan_type}\n")
+    write("=" * 80 + "\n\n")
+
+    # Scan parameters section
+    write("SCAN PARAMETERS:\n")
+    write("-" * 80 + "\n")
+    if scan_metadata.get("roots"):
+        write(f"Scanned Roots: {', '.join(scan_metadata['roots'])}\n")
+    if scan_metadata.get("file_extensions"):
+        write(f"Extensions: {', '.join(scan_metadata['file_extensions'])}\n")
+    if scan_metadata.get("filename_filter"):
+        write(f"Filename Filter: {scan_metadata['filename_filter']}\n")
+    for key, value in (scan_metadata.get("filters") or {}).items():
+        if key in ("newer_than", "older_than"):
+            value = datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M")
+        elif isinstance(value, (list, tuple)):
+            value = ", ".join(value)
+        write(f"{FILTER_LABELS.get(key, key)}: {value}{' bytes' if key.endswith('_size') else ''}\n")
+    write(f"Scan Depth: {scan_metadata.get('depth', 'N/A')}\n")
+    if scan_metadata.get("duplicate_mode"):
+        write(f"Duplicate Match: {scan_metadata['duplicate_mode']}\n")
+    write("\n")
+
+    # Scanned items section
+    write(f"SCANNED ITEMS ({len(names)} total):\n")
+    write("-" * 80 + "\n")
+    tag = "[FOLDER]" if folders_only else "[FILE]"
+    previous = None
+    for name in names:
+        # Files are listed once per distinct name, folders as they are
+        if folders_only or name != previous:
+            write(f"  {tag} {name}\n")
+            flush()
+        previous = name
+    write("\n")
+
+    write(f"Total items: {total}\n")
+    write("=" * 80 + "\n\n")
+
+    if folders_only:
+        # For FOLDERS_ONLY scan, list folders directly
+        write(f"FOLDER LIST:\n")
+        write("-" * 80 + "\n")
+        for name, path in unique:
+            write(f"  [FOLDER] {name}\n")
+            write(f"  Path: {path}\n\n")
+            flush()
+    else:
+        # Duplicates and unique sections for files
+        if len(duplicates):
+            write(f"DUPLICATES FOUND: {len(duplicate_groups)}\n")
+            write("-" * 80 + "\n")
+            for group, name, path, ext, count in duplicates:
+                write(f"[DUPLICATE - {count} total]\n")
+                if group:
+                    write(f"  Group: {group}\n")
+                write(f"  Name: {name}\n")
+                write(f"  Path: {path}\n")
+                write(f"  Type: {ext}\n\n")
+                flush()
+
+        write(f"UNIQUE FILES: {len(unique)}\n")
+        write("-" * 80 + "\n")
+        for name, path, ext in unique:
+            write(f"  Name: {name}\n")
+            write(f"  Path: {path}\n")
+            write(f"  Type: {ext}\n\n")
+            flush()
+    flush(force=True)
+
+
+def write_usage_txt(f, folder_path, results, scan_metadata):
+    """Report of a folder size scan (see core.usage): folders by size, then the largest files."""
+    from util.file_utils import format_size
+
+    folders = sorted((item for item in results if item["ext"] == "FOLDER"),
+                     key=lambda item: item["size"] or 0, reverse=True)
+    files = [item for item in results if item["ext"] != "FOLDER"]
+
+    def when(mtime):
+        return datetime.fromtimestamp(mtime / 1e9).strftime("%Y-%m-%d %H:%M") if mtime else "-"
+
+    f.write(f"Disk Usage for: {folder_path}\n")
+    f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    f.write(f"Folder Depth: {scan_metadata.get('depth', 'N/A')}\n")
+    f.write("=" * 80 + "\n\n")
+
+    f.write(f"FOLDERS BY SIZE ({len(folders)}):\n")
+    f.write("-" * 80 + "\n")
+    f.write(f"{'Size':>12} {'Files':>10}  {'Newest':<16}  Path\n")
+    for item in folders:
+        f.write(f"{format_size(item['size'] or 0):>12} {item['files'] or 0:>10}  "
+                f"{when(item.get('mtime')):<16}  {item['path']}\n")
+    f.write("\n")
+
+    f.write(f"LARGEST FILES ({len(files)}):\n")
+    f.write("-" * 80 + "\n")
+    for item in files:
+        f.write(f"{format_size(item['size'] or 0):>12}  {when(item.get('mtime')):<16}  {item['path']}\n")
+
+
+def write_diff_txt(f, folder_path, results, scan_metadata, buffer_rows=SORT_BUFFER_ROWS):
+    """Report of a snapshot diff (see core.snapshot): counts, then each kind of change by path."""
+    from core.snapshot import CHANGES as order
+    from util.file_utils import format_size
+
+    counts = dict.fromkeys(order, 0)
+    sorter = ExternalSorter(buffer_rows=buffer_rows)
+    for item in results:
+        change = item["change"]
+        counts[change] += 1
+        sorter.add((order.index(change), item["path"], item.get("old_path") or "",
+                    item.get("size") or 0, item.get("old_size") or 0))
+
+    f.write(f"Snapshot Diff for: {folder_path}\n")
+    f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    f.write(f"Old Snapshot: {scan_metadata.get('old_snapshot', 'N/A')} ({scan_metadata.get('old_root', '')})\n")
+    f.write(f"New Snapshot: {scan_metadata.get('new_snapshot', 'N/A')} ({folder_path})\n")
+    f.write("Changes: " + ", ".join(f"{counts[c]} {c}" for c in order) + "\n")
+    f.write("=" * 80 + "\n")
+
+    current = None
+    for kind, path, old_path, size, old_size in sorter:
+        if kind != current:
+            current = kind
+            f.write(f"\n{order[kind].upper()} ({counts[order[kind]]}):\n")
+            f.write("-" * 80 + "\n")
+        if order[kind] == "moved":
+            f.write(f"{format_size(size):>12}  {old_path} -> {path}\n")
+        elif order[kind] == "changed":
+            f.write(f"{format_size(old_size):>12} -> {format_size(size):<12} {path}\n")
+        else:
+            f.write(f"{format_size(size):>12}  {path}\n")
+
+
+def write_export(filepath, folder_path, results, scan_metadata, fmt="txt", compress=False, sort=None):
+    """
+    Write results to filepath in the given format (see EXPORT_FORMATS).
+    sort, (key, reverse) of ResultStore.sort_order, is the row order of
+    csv and jsonl exports (default: scan order); the txt report has its
+    own section order.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    order = results.sort_order(*sort) if sort and hasattr(results, "sort_order") else None
+    with _open_output(filepath, compress) as f:
+        if fmt == "csv":
+            write_csv(f, results, order)
+        elif fmt == "jsonl":
+            write_jsonl(f, results, order)
+        elif scan_metadata.get("scan_type") == "DIFF":
+            write_diff_txt(f, folder_path, results, scan_metadata)
+        elif scan_metadata.get("usage"):
+            write_usage_txt(f, folder_path, results, scan_metadata)
+        else:
+            write_txt(f, folder_path, results, scan_metadata)
+    return filepath
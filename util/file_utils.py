@@ -1,9 +1,18 @@
 import os
 from datetime import datetime
+from util import profiler
 
 def get_file_size(file_path):
     return os.path.getsize(file_path)
 
+def format_size(size):
+    """Human-readable size: 512 B, 1.5 KB, 3.2 MB, ..."""
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return f"{size} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
 def get_file_extension(file_path):
     return os.path.splitext(file_path)[1]
 
@@ -65,7 +74,7 @@ def sanitize_filename(filename):
     return filename
 
 
-def generate_export_filename(folder_path, scan_count):
+def generate_export_filename(folder_path, scan_count, ext="txt"):
     """
     Generate export filename with format:
     drive_foldername_datescan_count.txt
@@ -75,20 +84,25 @@ def generate_export_filename(folder_path, scan_count):
     folder = sanitize_filename(folder)  # Remove invalid characters
     date_str = datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    filename = f"{drive}_{folder}_{date_str}_{scan_count}.txt"
+    filename = f"{drive}_{folder}_{date_str}_{scan_count}.{ext}"
     return filename
 
 
-def export_scan_results(folder_path, results, scan_metadata=None, export_dir="exports"):
+@profiler.instrumented("export")
+def export_scan_results(folder_path, results, scan_metadata=None, export_dir="exports",
+                        fmt="txt", compress=False, sort=None):
     """
-    Export scan results to a text file.
+    Export scan results to a file.
     Includes duplicate tagging, scan parameters, and scanned items list.
     
     Args:
         folder_path: Base folder path that was scanned
-        results: List of result items from scan
+        results: Sequence of result items from scan (list of dicts or ResultStore)
         scan_metadata: Dict with scan type, extensions, filter, etc.
         export_dir: Directory to save export file
+        fmt: "txt" (human-readable report), "csv" or "jsonl"
+        compress: Write gzip-compressed output (adds .gz)
+        sort: (key, reverse) row order of csv/jsonl exports, see ResultStore.sort_order
     """
     # Make export_dir absolute path from script location
     if not os.path.isabs(export_dir):
@@ -99,79 +113,25 @@ def export_scan_results(folder_path, results, scan_metadata=None, export_dir="ex
     if not os.path.exists(export_dir):
         os.makedirs(export_dir)
     
-    filename = generate_export_filename(folder_path, len(results))
+    # ResultStore may hold removed rows (watch mode), count live ones only
+    count = results.live_count() if hasattr(results, "live_count") else len(results)
+    filename = generate_export_filename(folder_path, count, fmt + (".gz" if compress else ""))
     filepath = os.path.join(export_dir, filename)
     
     # Default metadata if not provided
     if not scan_metadata:
         scan_metadata = {
             "scan_type": "FILES",
-            "scanned_items": [r["name"] for r in results],
             "file_extensions": [],
             "filename_filter": None,
             "depth": 0
         }
-    
+
+    from util.exporter import write_export
+
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"Scan Results for: {folder_path}\n")
-            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Scan Type: {scan_metadata.get('scan_type', 'UNKNOWN')}\n")
-            f.write("=" * 80 + "\n\n")
-            
-            # Scan parameters section
-            f.write("SCAN PARAMETERS:\n")
-            f.write("-" * 80 + "\n")
-            if scan_metadata.get("file_extensions"):
-                f.write(f"Extensions: {', '.join(scan_metadata['file_extensions'])}\n")
-            if scan_metadata.get("filename_filter"):
-                f.write(f"Filename Filter: {scan_metadata['filename_filter']}\n")
-            f.write(f"Scan Depth: {scan_metadata.get('depth', 'N/A')}\n")
-            f.write("\n")
-            
-            # Scanned items section
-            f.write(f"SCANNED ITEMS ({len(scan_metadata.get('scanned_items', []))} total):\n")
-            f.write("-" * 80 + "\n")
-            if scan_metadata.get("scan_type") == "FOLDERS_ONLY":
-                for item in sorted(scan_metadata.get('scanned_items', [])):
-                    f.write(f"  [FOLDER] {item}\n")
-            else:
-                for item in sorted(set(scan_metadata.get('scanned_items', []))):
-                    f.write(f"  [FILE] {item}\n")
-            f.write("\n")
-            
-            f.write(f"Total items: {len(results)}\n")
-            f.write("=" * 80 + "\n\n")
-            
-            # For FOLDERS_ONLY scan, list folders directly
-            if scan_metadata.get("scan_type") == "FOLDERS_ONLY":
-                f.write(f"FOLDER LIST:\n")
-                f.write("-" * 80 + "\n")
-                for item in sorted(results, key=lambda x: x["name"]):
-                    f.write(f"  [FOLDER] {item['name']}\n")
-                    f.write(f"  Path: {item['path']}\n\n")
-            else:
-                # Duplicates and unique sections for files
-                duplicates = [r for r in results if r.get("is_duplicate", False)]
-                unique = [r for r in results if not r.get("is_duplicate", False)]
-                
-                if duplicates:
-                    f.write(f"DUPLICATES FOUND: {len(set(r['name'] for r in duplicates))}\n")
-                    f.write("-" * 80 + "\n")
-                    for item in sorted(duplicates, key=lambda x: x["name"]):
-                        dup_tag = f"[DUPLICATE - {item.get('duplicate_count', 0)} total]"
-                        f.write(f"{dup_tag}\n")
-                        f.write(f"  Name: {item['name']}\n")
-                        f.write(f"  Path: {item['path']}\n")
-                        f.write(f"  Type: {item['ext']}\n\n")
-                
-                f.write(f"UNIQUE FILES: {len(unique)}\n")
-                f.write("-" * 80 + "\n")
-                for item in sorted(unique, key=lambda x: x["name"]):
-                    f.write(f"  Name: {item['name']}\n")
-                    f.write(f"  Path: {item['path']}\n")
-                    f.write(f"  Type: {item['ext']}\n\n")
+        write_export(filepath, folder_path, results, scan_metadata, fmt, compress, sort)
     except OSError as e:
         raise OSError(f"Failed to write export file to {filepath}: {e}")
     
-    return filepath
\ No newline at end of file
+    return filepath
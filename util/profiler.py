@@ -0,0 +1,255 @@
+import functools
+import heapq
+import io
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Instrumentation of the scan hot paths.
+#
+# Nothing is recorded unless a ScanStats is active (see Profiler), so the
+# cost for normal runs is one global lookup per directory / phase.
+
+# Slowest directories kept in a report
+SLOWEST_DIRS = 20
+
+# Functions listed from a cProfile capture
+PROFILE_TOP = 25
+
+_active = None
+
+
+def active():
+    """The ScanStats being recorded into, or None."""
+    return _active
+
+
+def _proc_io():
+    """Read/write syscall and byte counters of this process (Linux only)."""
+    try:
+        with open("/proc/self/io") as f:
+            return {k: int(v) for k, v in (line.split(":") for line in f)}
+    except (OSError, ValueError):
+        return None
+
+
+class ScanStats:
+    """
+    Counters and timings of one profiled run.
+
+    phases     name -> {"calls", "wall", "cpu"} (cpu is process CPU time, so
+               it includes worker threads)
+    counters   dirs, entries, stat and open calls, bytes hashed, ...
+    slowest    the SLOWEST_DIRS directories with the longest scandir time
+
+    Together these separate storage latency (high wall, low cpu, slow
+    directories) from Python overhead (cpu close to wall) and GUI overhead
+    (time in the display/log phases).
+    """
+
+    def __init__(self, label=""):
+        self.label = label
+        self.lock = threading.Lock()
+        self.phases = {}
+        self.counters = {}
+        self.slowest = []  # min-heap of (seconds, path, entries)
+        self.started = time.time()
+        self.io_start = _proc_io()
+        self.io_end = None
+        self.profile = None
+        self.memory = None
+
+    @contextmanager
+    def phase(self, name):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield self
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            with self.lock:
+                entry = self.phases.setdefault(name, {"calls": 0, "wall": 0.0, "cpu": 0.0})
+                entry["calls"] += 1
+                entry["wall"] += wall
+                entry["cpu"] += cpu
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record_dir(self, path, seconds, entries, stat_calls=0):
+        """One directory listing: one scandir, plus stat calls made for it."""
+        with self.lock:
+            c = self.counters
+            c["dirs"] = c.get("dirs", 0) + 1
+            c["entries"] = c.get("entries", 0) + entries
+            c["scandir_calls"] = c.get("scandir_calls", 0) + 1
+            c["stat_calls"] = c.get("stat_calls", 0) + stat_calls
+            c["list_seconds"] = c.get("list_seconds", 0.0) + seconds
+            item = (seconds, path, entries)
+            if len(self.slowest) < SLOWEST_DIRS:
+                heapq.heappush(self.slowest, item)
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, item)
+
+    def finish(self):
+        self.io_end = _proc_io()
+
+    def to_dict(self):
+        """Plain dict with derived rates, ready for json.dump."""
+        with self.lock:
+            phases = {k: dict(v) for k, v in self.phases.items()}
+            counters = dict(self.counters)
+            slowest = sorted(self.slowest, reverse=True)
+        scan_wall = phases.get("scan", {}).get("wall", 0.0)
+        rates = {}
+        if scan_wall:
+            rates["dirs_per_s"] = counters.get("dirs", 0) / scan_wall
+            rates["entries_per_s"] = counters.get("entries", 0) / scan_wall
+        if counters.get("dirs"):
+            rates["avg_dir_ms"] = 1000 * counters.get("list_seconds", 0.0) / counters["dirs"]
+        data = {
+            "label": self.label,
+            "started": self.started,
+            "phases": phases,
+            "counters": counters,
+            "rates": rates,
+            "slowest_dirs": [{"path": p, "seconds": s, "entries": n} for s, p, n in slowest],
+        }
+        if self.io_start and self.io_end:
+            data["process_io"] = {k: self.io_end[k] - self.io_start.get(k, 0) for k in self.io_end}
+        if self.profile is not None:
+            data["profile"] = self.profile
+        if self.memory is not None:
+            data["memory"] = self.memory
+        return data
+
+    def summary(self):
+        """Short human-readable lines for logs."""
+        data = self.to_dict()
+        lines = []
+        for name, p in data["phases"].items():
+            lines.append(f"{name}: {p['wall']:.2f}s wall, {p['cpu']:.2f}s cpu, {p['calls']} call(s)")
+        c, r = data["counters"], data["rates"]
+        if c.get("dirs"):
+            lines.append(f"{c['dirs']} dirs, {c.get('entries', 0)} entries, "
+                         f"{r.get('dirs_per_s', 0):.0f} dirs/s, {r.get('entries_per_s', 0):.0f} entries/s, "
+                         f"{r.get('avg_dir_ms', 0):.1f} ms/dir")
+        syscalls = {k: v for k, v in c.items() if k.endswith("_calls")}
+        if syscalls:
+            lines.append("calls: " + ", ".join(f"{k[:-6]}={v}" for k, v in syscalls.items()))
+        if "process_io" in data:
+            io_stats = data["process_io"]
+            lines.append(f"process io: {io_stats.get('syscr', 0)} read syscalls, "
+                         f"{io_stats.get('rchar', 0) / 1e6:.1f} MB read")
+        for d in data["slowest_dirs"][:3]:
+            lines.append(f"slow dir: {d['seconds'] * 1000:.0f} ms, {d['entries']} entries, {d['path']}")
+        if self.memory:
+            lines.append(f"peak traced memory: {self.memory['peak'] / 1e6:.1f} MB")
+        return lines
+
+    def dump_json(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+
+class Profiler:
+    """
+    Context manager that makes a ScanStats active for its duration, with
+    optional cProfile (python_profile) and tracemalloc (trace_memory)
+    captures stored in the stats. Only one can be active at a time.
+
+        with Profiler("cli scan", python_profile=True) as stats:
+            ...
+        stats.dump_json("scan_profile.json")
+    """
+
+    def __init__(self, label="", python_profile=False, trace_memory=False):
+        self.stats = ScanStats(label)
+        self.python_profile = python_profile
+        self.trace_memory = trace_memory
+        self.profiler = None
+
+    def __enter__(self):
+        global _active
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+        if self.python_profile:
+            import cProfile
+            # cProfile only sees the thread it was enabled on
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        _active = self.stats
+        return self.stats
+
+    def __exit__(self, *exc):
+        global _active
+        _active = None
+        self.snapshot(stop=True)
+        return False
+
+    def snapshot(self, stop=False):
+        """Store the captures so far in the stats; captures go on unless stop."""
+        self.stats.finish()
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.stats.profile = _top_functions(self.profiler)
+            if stop:
+                self.profiler = None
+            else:
+                self.profiler.enable()
+        if self.trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                return
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+            if stop:
+                tracemalloc.stop()
+            self.stats.memory = {
+                "current": current,
+                "peak": peak,
+                "top": [{"where": str(s.traceback), "size": s.size, "count": s.count} for s in top],
+            }
+
+
+def _top_functions(profiler):
+    import pstats
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append({"function": f"{os.path.basename(filename)}:{line}({func})",
+                     "calls": nc, "tottime": tt, "cumtime": ct})
+    rows.sort(key=lambda r: r["cumtime"], reverse=True)
+    return rows[:PROFILE_TOP]
+
+
+def phase(name):
+    """Time a block as phase name of the active stats (no-op when inactive)."""
+    stats = _active
+    return stats.phase(name) if stats is not None else nullcontext()
+
+
+def count(name, n=1):
+    stats = _active
+    if stats is not None:
+        stats.count(name, n)
+
+
+def instrumented(name):
+    """Decorator: record every call of the function as phase name."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            stats = _active
+            if stats is None:
+                return fn(*args, **kwargs)
+            with stats.phase(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
@@ -0,0 +1,28 @@
+import os
+import sys
+import time
+
+# Startup milestones of the GUI (imports done, window shown, tabs built,
+# scan index loaded), timed from the import of this module, which is the
+# first thing main.py does. Printed to stderr when PYFILE_STARTUP_REPORT
+# is set. Per-module import costs come from python -X importtime, see
+# benchmarks/bench_startup.py.
+
+REPORT_ENV = "PYFILE_STARTUP_REPORT"
+
+_started = time.perf_counter()
+_marks = []
+
+
+def mark(name):
+    """Record a milestone; returns the seconds since startup."""
+    elapsed = time.perf_counter() - _started
+    _marks.append((name, elapsed))
+    if os.environ.get(REPORT_ENV):
+        print(f"startup: {name:<24} {elapsed * 1000:8.1f} ms", file=sys.stderr)
+    return elapsed
+
+
+def marks():
+    """[(name, seconds since startup)] in the order recorded."""
+    return list(_marks)
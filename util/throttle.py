@@ -0,0 +1,333 @@
+import json
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+# I/O scheduling for scans, hashing and migrations on shared storage.
+#
+# Nothing is throttled unless a Scheduler is active (see set_active); the
+# hot paths then pay one global lookup per directory or read chunk, like
+# util.profiler. An active scheduler bounds the operations in flight (the
+# window) and their rate in ops/s and MB/s. With adaptive on, the window
+# follows the storage's latency AIMD-style: +1 per quiet interval, halved
+# when latency rises well above the best seen, so other users of a busy NAS
+# get their share without anyone tuning by hand. MB/s counts bytes read
+# plus bytes written, as the storage sees them.
+
+# Seconds between window adjustments (and time-of-day profile checks)
+ADJUST_INTERVAL = 0.5
+
+# A kind of operation is congested when its latency average exceeds its
+# baseline (lowest average seen, slowly drifting up) by this factor
+LATENCY_FACTOR = 3.0
+EWMA_ALPHA = 0.2
+BASELINE_DRIFT = 1.02
+DECREASE = 0.5
+
+# Window when no concurrency limit is given
+MAX_WINDOW = 64
+
+# Units an operation's latency is normalized by: a directory of 5000
+# entries or an 8 MB read is not "slower" than a small one
+UNITS = {"dir": 256, "read": 1024 * 1024, "write": 1024 * 1024}
+
+LIMIT_FIELDS = ("ops_per_s", "mb_per_s", "concurrency", "paused")
+
+
+class _Op:
+    __slots__ = ("kind", "units", "started")
+
+    def __init__(self, kind, units):
+        self.kind = kind
+        self.units = units
+        self.started = 0.0
+
+
+# Yielded by io() when nothing is active; writes to it are ignored
+_NULL = nullcontext(_Op("none", 0))
+
+_active = None
+
+
+def active():
+    """The Scheduler in use, or None."""
+    return _active
+
+
+def set_active(scheduler):
+    """Make scheduler (or None) the one io() goes through; returns the previous one."""
+    global _active
+    previous, _active = _active, scheduler
+    return previous
+
+
+def io(kind, units=0):
+    """
+    Wrap one I/O operation: "dir" (a listing), "read" or "write" of units
+    bytes. No-op without an active scheduler. The yielded op's units may be
+    set afterwards (entries of a listing) for latency normalization.
+    """
+    scheduler = _active
+    return scheduler.io(kind, units) if scheduler is not None else _NULL
+
+
+def readinto(f, buf, remaining):
+    """
+    f.readinto(buf) as one "read" of the bytes it will actually get, at
+    most remaining (the file size left): a small file is not charged a
+    whole buffer. The read at EOF (remaining 0) is not charged at all.
+    """
+    if remaining <= 0:
+        return f.readinto(buf)
+    with io("read", min(len(buf), remaining)):
+        return f.readinto(buf)
+
+
+def _minutes(text):
+    hours, minutes = text.split(":")
+    value = int(hours) * 60 + int(minutes)
+    if not 0 <= value <= 24 * 60:
+        raise ValueError(f"Bad time of day: {text}")
+    return value
+
+
+def parse_profile(entries):
+    """
+    Validate a time-of-day profile: a list of {"from": "HH:MM", "to":
+    "HH:MM", and any LIMIT_FIELDS}; ranges may wrap midnight, the first
+    matching range wins, outside all ranges the scheduler's own limits
+    apply. Returns [(start, end, limits)] in minutes of the day.
+    """
+    profile = []
+    for entry in entries:
+        try:
+            start, end = _minutes(entry["from"]), _minutes(entry["to"])
+        except (KeyError, ValueError, AttributeError, TypeError):
+            raise ValueError(f"Profile entry needs from/to as HH:MM: {entry}")
+        unknown = set(entry) - set(LIMIT_FIELDS) - {"from", "to"}
+        if unknown:
+            raise ValueError(f"Unknown profile fields: {', '.join(sorted(unknown))}")
+        profile.append((start, end, {k: entry.get(k) for k in LIMIT_FIELDS}))
+    return profile
+
+
+def load_profile(path):
+    with open(path, encoding="utf-8") as f:
+        return parse_profile(json.load(f))
+
+
+def profile_limits(profile, when=None):
+    """Limits of the profile range containing when (default: now), None outside all ranges."""
+    when = when or datetime.now()
+    minute = when.hour * 60 + when.minute
+    for start, end, limits in profile:
+        inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+        if inside:
+            return limits
+    return None
+
+
+class TokenBucket:
+    """Rate limit with one second of burst; rate None is unlimited."""
+
+    def __init__(self, rate=None):
+        self.lock = threading.Lock()
+        self.rate = rate
+        self.tokens = rate or 0.0
+        self.stamp = time.monotonic()
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.rate = rate
+            self.tokens = min(self.tokens, rate or 0.0)
+
+    def delay(self, n):
+        """Take n tokens; returns how long the caller must sleep to stay within the rate."""
+        with self.lock:
+            rate = self.rate
+            if not rate:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(rate, self.tokens + (now - self.stamp) * rate)
+            self.stamp = now
+            self.tokens -= n  # may go negative: later callers wait for the debt
+            return -self.tokens / rate if self.tokens < 0 else 0.0
+
+
+class Scheduler:
+    """
+    Shared limits for all I/O of the process. ops_per_s and mb_per_s cap
+    the rates, concurrency the window of operations in flight (workers
+    beyond it wait). profile is a parsed time-of-day profile (see
+    parse_profile) overriding those limits while its ranges are current.
+    pause()/resume() hold every operation before it starts.
+    """
+
+    def __init__(self, ops_per_s=None, mb_per_s=None, concurrency=None, adaptive=True, profile=None):
+        self.base_limits = {"ops_per_s": ops_per_s, "mb_per_s": mb_per_s,
+                            "concurrency": concurrency, "paused": False}
+        self.adaptive = adaptive
+        self.profile = profile or []
+        self.cond = threading.Condition()
+        self.ops = TokenBucket()
+        self.bytes = TokenBucket()
+        self.max_window = MAX_WINDOW
+        self.window = float(MAX_WINDOW)
+        self.in_flight = 0
+        self.user_paused = False
+        self.profile_paused = False
+        self.stopped = False
+        self.latency = {}  # kind -> [average, baseline] in seconds per unit
+        self.counters = {"ops": 0, "bytes": 0, "waited": 0.0, "decreases": 0}
+        self.rates = {"ops_per_s": 0.0, "mb_per_s": 0.0}
+        self.limits = None
+        self.last_adjust = time.monotonic()
+        self.last_counts = (0, 0)
+        with self.cond:
+            self._apply_limits()
+
+    # ---------------- Limits ---------------- #
+
+    def _apply_limits(self):
+        """Take the limits of the current profile range (or the base ones). cond held."""
+        limits = dict(self.base_limits)
+        current = profile_limits(self.profile) if self.profile else None
+        if current:
+            limits.update({k: v for k, v in current.items() if v is not None})
+        if limits == self.limits:
+            return
+        self.limits = limits
+        self.ops.set_rate(limits["ops_per_s"])
+        self.bytes.set_rate(limits["mb_per_s"] * 1024 * 1024 if limits["mb_per_s"] else None)
+        self.max_window = limits["concurrency"] or MAX_WINDOW
+        self.window = min(self.window, self.max_window) if self.adaptive else float(self.max_window)
+        self.profile_paused = bool(limits["paused"])
+        self.cond.notify_all()
+
+    def set_limits(self, ops_per_s=None, mb_per_s=None, concurrency=None):
+        with self.cond:
+            self.base_limits.update(ops_per_s=ops_per_s, mb_per_s=mb_per_s, concurrency=concurrency)
+            self.limits = None
+            self._apply_limits()
+
+    def pause(self):
+        with self.cond:
+            self.user_paused = True
+
+    def resume(self):
+        with self.cond:
+            self.user_paused = False
+            self.cond.notify_all()
+
+    @property
+    def paused(self):
+        return self.user_paused or self.profile_paused
+
+    def stop(self):
+        """Let every waiting and future operation through (shutdown, cancel)."""
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+    # ---------------- Operations ---------------- #
+
+    def _tick(self, now):
+        """Once per ADJUST_INTERVAL: profile, observed rates and the AIMD step. cond held."""
+        elapsed = now - self.last_adjust
+        if elapsed < ADJUST_INTERVAL:
+            return
+        ops, nbytes = self.counters["ops"], self.counters["bytes"]
+        self.rates = {"ops_per_s": (ops - self.last_counts[0]) / elapsed,
+                      "mb_per_s": (nbytes - self.last_counts[1]) / elapsed / (1024 * 1024)}
+        self.last_counts = (ops, nbytes)
+        self.last_adjust = now
+        self._apply_limits()
+        if not self.adaptive:
+            return
+        congested = False
+        for stats in self.latency.values():
+            average, baseline = stats
+            if average > baseline * LATENCY_FACTOR:
+                congested = True
+            stats[1] = min(average, baseline * BASELINE_DRIFT)
+        if congested:
+            self.window = max(1.0, self.window * DECREASE)
+            self.counters["decreases"] += 1
+        elif self.in_flight >= int(self.window):
+            # Only grow a window that is actually in use
+            self.window = min(float(self.max_window), self.window + 1)
+
+    def acquire(self, op):
+        waited = time.monotonic()
+        with self.cond:
+            while not self.stopped and (self.paused or self.in_flight >= max(1, int(self.window))):
+                self.cond.wait(ADJUST_INTERVAL)
+                self._tick(time.monotonic())
+            self.in_flight += 1
+        delay = max(self.ops.delay(1), self.bytes.delay(op.units) if op.units else 0.0)
+        if delay and not self.stopped:
+            time.sleep(delay)
+        op.started = time.monotonic()
+        if op.started - waited > 0.001:
+            with self.cond:
+                self.counters["waited"] += op.started - waited
+
+    def release(self, op):
+        now = time.monotonic()
+        per_unit = (now - op.started) / max(1.0, op.units / UNITS.get(op.kind, 1))
+        with self.cond:
+            self.in_flight -= 1
+            self.counters["ops"] += 1
+            if op.kind != "dir":
+                self.counters["bytes"] += op.units
+            stats = self.latency.get(op.kind)
+            if stats is None:
+                self.latency[op.kind] = [per_unit, per_unit]
+            else:
+                stats[0] += EWMA_ALPHA * (per_unit - stats[0])
+            self._tick(now)
+            self.cond.notify()
+
+    def io(self, kind, units=0):
+        return _Scope(self, _Op(kind, units))
+
+    def status(self):
+        """Snapshot for display: window, in flight, limits, observed rates and latencies (ms)."""
+        with self.cond:
+            return {
+                "window": int(self.window),
+                "max_window": self.max_window,
+                "in_flight": self.in_flight,
+                "paused": self.paused,
+                "profile_paused": self.profile_paused,
+                "limits": dict(self.limits),
+                "rates": dict(self.rates),
+                "latency_ms": {k: v[0] * 1000 for k, v in self.latency.items()},
+                "counters": dict(self.counters),
+            }
+
+    def summary(self):
+        s = self.status()
+        state = "paused" if s["paused"] else f"window {s['window']}/{s['max_window']}"
+        latency = ", ".join(f"{k} {v:.1f} ms" for k, v in sorted(s["latency_ms"].items()))
+        return (f"I/O {state}, {s['rates']['ops_per_s']:.0f} ops/s, {s['rates']['mb_per_s']:.1f} MB/s"
+                + (f", {latency}" if latency else ""))
+
+
+class _Scope:
+    """Context manager of one operation (Scheduler.io)."""
+
+    __slots__ = ("scheduler", "op")
+
+    def __init__(self, scheduler, op):
+        self.scheduler = scheduler
+        self.op = op
+
+    def __enter__(self):
+        self.scheduler.acquire(self.op)
+        return self.op
+
+    def __exit__(self, *exc):
+        self.scheduler.release(self.op)
+        return False